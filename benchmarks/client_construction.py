@@ -0,0 +1,58 @@
+"""Time and memory it takes to create a ShopifyClient.
+
+"lazy" creates clients the way they are created now, "eager" also builds
+every endpoint and the GraphQL entrypoint, like clients used to on creation,
+and "orders only" touches the one endpoint a typical webhook worker needs.
+
+    python benchmarks/client_construction.py
+"""
+
+import gc
+import timeit
+import tracemalloc
+
+from shopify_client import ShopifyClient
+
+ROUNDS = 2000
+RESOURCES = ShopifyClient.resource_names()
+
+
+def lazy():
+    return ShopifyClient(api_url="https://shop.myshopify.com", api_token="token")
+
+
+def orders_only():
+    client = lazy()
+    client.orders
+    return client
+
+
+def eager():
+    client = lazy()
+    for name in RESOURCES:
+        getattr(client, name)
+    client.query
+    return client
+
+
+def memory_per_client(build, count=200):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    clients = [build() for _ in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del clients
+    return (after - before) / count
+
+
+def main():
+    print(f"{'':<12}{'time / client':>16}{'memory / client':>18}")
+    for name, build in [("lazy", lazy), ("orders only", orders_only), ("eager", eager)]:
+        seconds = min(timeit.repeat(build, number=ROUNDS, repeat=5)) / ROUNDS
+        memory = memory_per_client(build)
+        print(f"{name:<12}{seconds * 1e6:>13.1f} us{memory / 1024:>15.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Time and peak memory of exporting orders to Parquet.
+
+Compares ``export`` writing record batches as the records arrive with holding
+every record in a list and converting it to a table at the end, the way a
+DataFrame is usually built from a listing.
+
+    python benchmarks/export.py --records 50000
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pyarrow
+import pyarrow.parquet
+from models import order
+
+from shopify_client.export import export, extract, columns_from_spec
+
+COLUMNS = {
+    "id": "id",
+    "name": "name",
+    "email": "email",
+    "total_price": "total_price",
+    "created_at": "created_at",
+    "skus": "line_items[].sku",
+    "city": "shipping_address.city",
+}
+
+
+def measure(function):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=50_000)
+    args = parser.parse_args()
+
+    def records():
+        # Records are generated as they are consumed, like a streamed listing
+        return (order(i) for i in range(args.records))
+
+    def list_then_table(path):
+        rows = list(records())
+        columns = columns_from_spec(COLUMNS)
+        table = pyarrow.table(
+            {name: [extract(row, steps) for row in rows] for name, steps in columns}
+        )
+        pyarrow.parquet.write_table(table, path)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "orders.parquet")
+        print(f"{'':<24}{'seconds':>10}{'peak MB':>10}")
+        for name, function in (
+            ("list, then table", lambda: list_then_table(path)),
+            ("export", lambda: export(records(), COLUMNS, path)),
+        ):
+            elapsed, peak = measure(function)
+            print(f"{name:<24}{elapsed:>10.2f}{peak / 1024 / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Decode and encode times of the JSON codecs on typical Shopify payloads.
+
+Pages hold 250 records, the REST maximum. ``response.json()`` is the decode
+path the client used before codecs: a text decode, then the stdlib parser.
+
+    python benchmarks/json_codecs.py
+"""
+
+import json
+import timeit
+
+from mock_server import record
+
+from shopify_client.codec import CODECS
+
+PAGE_SIZE = 250
+REPEAT = 15
+
+
+def product(index):
+    """A product with three variants, two options and two images."""
+    return {
+        "id": index + 1,
+        "title": f"Grove Hand Soap {index}",
+        "body_html": "<p>Plant-based hand soap with essential oils.</p>" * 3,
+        "vendor": "Grove Co.",
+        "product_type": "Hand Soap",
+        "handle": f"grove-hand-soap-{index}",
+        "status": "active",
+        "tags": "soap, plant-based, refillable",
+        "created_at": "2024-01-01T00:00:00-05:00",
+        "updated_at": "2024-01-02T00:00:00-05:00",
+        "variants": [
+            {
+                "id": index * 10 + variant,
+                "product_id": index + 1,
+                "title": f"{scent} / 12 oz",
+                "sku": f"SOAP-{index}-{variant}",
+                "price": "4.99",
+                "compare_at_price": None,
+                "inventory_quantity": 100 + variant,
+                "option1": scent,
+                "option2": "12 oz",
+                "weight": 0.75,
+                "requires_shipping": True,
+            }
+            for variant, scent in enumerate(["Lavender", "Lemon", "Unscented"])
+        ],
+        "options": [
+            {"name": "Scent", "values": ["Lavender", "Lemon", "Unscented"]},
+            {"name": "Size", "values": ["12 oz"]},
+        ],
+        "images": [
+            {
+                "id": index * 10 + image,
+                "src": f"https://cdn.shopify.com/s/files/soap-{index}-{image}.jpg",
+                "width": 2048,
+                "height": 2048,
+            }
+            for image in range(2)
+        ],
+    }
+
+
+def response_json(content):
+    # What requests' Response.json() does with a UTF-8 body
+    return json.loads(content.decode("utf-8"))
+
+
+def main():
+    payloads = {
+        "order page": {"orders": [record(i) for i in range(PAGE_SIZE)]},
+        "product page": {"products": [product(i) for i in range(PAGE_SIZE)]},
+    }
+    codecs = {}
+    for name, codec in CODECS.items():
+        try:
+            codecs[name] = codec()
+        except ImportError:
+            print(f"{name} is not installed, skipped")
+
+    print(f"{'':<32}{'KB':>7}{'ms':>9}{'speedup':>9}")
+    for payload_name, payload in payloads.items():
+        content = json.dumps(payload).encode()
+        baseline = min(
+            timeit.repeat(lambda: response_json(content), number=20, repeat=REPEAT)
+        )
+        print(
+            f"{payload_name + ' decode':<22}{'baseline':<10}"
+            f"{len(content) / 1024:>7.0f}{baseline / 20 * 1000:>9.2f}{'1.0x':>9}"
+        )
+        for name, codec in codecs.items():
+            elapsed = min(
+                timeit.repeat(lambda: codec.loads(content), number=20, repeat=REPEAT)
+            )
+            print(
+                f"{'':<22}{name:<10}{'':>7}{elapsed / 20 * 1000:>9.2f}"
+                f"{baseline / elapsed:>8.1f}x"
+            )
+
+        baseline = min(
+            timeit.repeat(lambda: json.dumps(payload), number=20, repeat=REPEAT)
+        )
+        print(
+            f"{payload_name + ' encode':<22}{'baseline':<10}"
+            f"{'':>7}{baseline / 20 * 1000:>9.2f}{'1.0x':>9}"
+        )
+        for name, codec in codecs.items():
+            elapsed = min(
+                timeit.repeat(lambda: codec.dumps(payload), number=20, repeat=REPEAT)
+            )
+            print(
+                f"{'':<22}{name:<10}{'':>7}{elapsed / 20 * 1000:>9.2f}"
+                f"{baseline / elapsed:>8.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Lookup latency of a local mirror holding a shop's products and orders.
+
+python benchmarks/mirror.py --records 50000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import timeit
+
+from json_codecs import product
+from models import order
+
+from shopify_client.mirror import Mirror
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=50_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        mirror = Mirror(os.path.join(directory, "mirror.db"))
+        started = time.perf_counter()
+        mirror.upsert("products", (product(i) for i in range(args.records)))
+        mirror.upsert("orders", (order(i) for i in range(args.records)))
+        elapsed = time.perf_counter() - started
+        print(f"stored {args.records} products and orders in {elapsed:.1f}s")
+
+        middle = args.records // 2
+        for name, lookup in (
+            ("variant by SKU", lambda: mirror.variant_by_sku(f"SOAP-{middle}-1")),
+            ("order by name", lambda: mirror.order_by_name(f"#{1000 + middle}")),
+            ("product by id", lambda: mirror.get("products", middle + 1)),
+        ):
+            assert lookup() is not None
+            seconds = timeit.timeit(lookup, number=10_000) / 10_000
+            print(f"{name:<20}{seconds * 1e6:>8.1f} µs")
+        mirror.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Local HTTP server emulating the parts of Shopify the client relies on.
+
+REST listings are paginated with ``Link`` headers and ``page_info`` cursors
+and answer with the ``X-Shopify-Shop-Api-Call-Limit`` header. GraphQL
+connections are paginated with ``pageInfo`` cursors and report their cost in
+``extensions``. Every ``throttle_every``-th request is rejected with a 429
+and a ``Retry-After`` header, to measure retry storms.
+
+The server runs in its own process so it does not compete with the client
+for the GIL:
+
+    with MockShopify(records=10_000) as server:
+        client = ShopifyClient(api_url=server.url, api_token="token")
+"""
+
+import json
+import multiprocessing
+import re
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+API_PREFIX = re.compile(r"^/admin/api/[^/]+/")
+CONNECTION_FIELD = re.compile(r"\{\s*(\w+)")
+
+
+def record(index):
+    """A record about the size and shape of an order."""
+    return {
+        "id": index + 1,
+        "admin_graphql_api_id": f"gid://shopify/Order/{index + 1}",
+        "name": f"#{1000 + index}",
+        "email": f"customer{index}@example.com",
+        "created_at": "2024-01-01T00:00:00-05:00",
+        "updated_at": "2024-01-02T00:00:00-05:00",
+        "currency": "USD",
+        "financial_status": "paid",
+        "fulfillment_status": None,
+        "total_price": f"{index % 500}.99",
+        "note": 'Leave at the door, "please"',
+        "tags": "wholesale, vip",
+        "line_items": [
+            {
+                "id": index * 10 + item,
+                "sku": f"SKU-{item}",
+                "title": "Grove Hand Soap",
+                "quantity": item + 1,
+                "price": "4.99",
+                "properties": [{"name": "scent", "value": "lavender"}],
+            }
+            for item in range(3)
+        ],
+        "shipping_address": {
+            "address1": "1301 Sansome St",
+            "city": "San Francisco",
+            "province_code": "CA",
+            "zip": "94111",
+            "country_code": "US",
+        },
+    }
+
+
+@lru_cache(maxsize=1024)
+def rest_page(resource, start, stop):
+    return json.dumps({resource: [record(i) for i in range(start, stop)]}).encode()
+
+
+@lru_cache(maxsize=1024)
+def graphql_page(connection, start, stop, has_next_page):
+    return json.dumps(
+        {
+            "data": {
+                connection: {
+                    "nodes": [record(i) for i in range(start, stop)],
+                    "pageInfo": {
+                        "hasNextPage": has_next_page,
+                        "endCursor": str(stop),
+                    },
+                }
+            },
+            "extensions": {
+                "cost": {
+                    "requestedQueryCost": stop - start + 2,
+                    "actualQueryCost": stop - start + 2,
+                    "throttleStatus": {
+                        "maximumAvailable": 2000.0,
+                        "currentlyAvailable": 1900,
+                        "restoreRate": 100.0,
+                    },
+                }
+            },
+        }
+    ).encode()
+
+
+class ShopifyHandler(BaseHTTPRequestHandler):
+    # Keep connections alive like Shopify does
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def throttled(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+            count = server.request_count
+        if server.throttle_every and count % server.throttle_every == 0:
+            self.send(
+                429, b'{"errors": "Exceeded 2 calls per second"}', {"Retry-After": "0"}
+            )
+            return True
+        return False
+
+    def send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.throttled():
+            return
+
+        url = urlparse(self.path)
+        resource = API_PREFIX.sub("", url.path).removesuffix(".json")
+        params = parse_qs(url.query)
+        limit = int(params.get("limit", ["50"])[0])
+        start = int(params.get("page_info", ["0"])[0])
+        stop = min(start + limit, self.server.records)
+
+        headers = {"X-Shopify-Shop-Api-Call-Limit": "1/40"}
+        if stop < self.server.records:
+            next_url = f"http://{self.headers['Host']}{url.path}?limit={limit}&page_info={stop}"
+            headers["Link"] = f'<{next_url}>; rel="next"'
+        self.send(200, rest_page(resource, start, stop), headers)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.throttled():
+            return
+
+        payload = json.loads(body)
+        variables = payload.get("variables") or {}
+        connection = CONNECTION_FIELD.search(
+            payload["query"][payload["query"].index("{") :]
+        ).group(1)
+        start = int(variables.get("cursor") or 0)
+        stop = min(start + int(variables.get("page_size", 100)), self.server.records)
+        self.send(
+            200, graphql_page(connection, start, stop, stop < self.server.records)
+        )
+
+
+def serve(records, throttle_every, ready):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ShopifyHandler)
+    server.daemon_threads = True
+    server.records = records
+    server.throttle_every = throttle_every
+    server.request_count = 0
+    server.lock = threading.Lock()
+    ready.put(server.server_port)
+    server.serve_forever()
+
+
+class MockShopify:
+    """Runs the mock server in a child process for the duration of a ``with`` block."""
+
+    def __init__(self, records=10_000, throttle_every=0):
+        self.records = records
+        self.throttle_every = throttle_every
+        self.process = None
+        self.url = None
+
+    def __enter__(self):
+        ready = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=serve, args=(self.records, self.throttle_every, ready), daemon=True
+        )
+        self.process.start()
+        self.url = f"http://127.0.0.1:{ready.get(timeout=10)}"
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.process.terminate()
+        self.process.join()
@@ -0,0 +1,119 @@
+"""Memory and attribute access of records held as dicts and as models.
+
+Records are decoded from JSON the way the client decodes a page, then kept:
+as the dicts of the page, as models, and as models holding a projection.
+Orders carry the price sets and nested objects of a REST order, which models
+drop, and their own timestamps.
+
+    python benchmarks/models.py --records 100000
+"""
+
+import argparse
+import gc
+import json
+import timeit
+import tracemalloc
+
+from json_codecs import product
+from mock_server import record
+
+from shopify_client.models import Order, Product
+
+PROJECTION = frozenset(["id", "name", "email", "total_price", "updated_at"])
+
+
+def money(amount):
+    return {
+        "shop_money": {"amount": amount, "currency_code": "USD"},
+        "presentment_money": {"amount": amount, "currency_code": "USD"},
+    }
+
+
+def order(index):
+    """An order with the fields of a REST order a model does not keep."""
+    data = record(index)
+    timestamp = f"2024-01-01T{index // 3600 % 24:02}:{index // 60 % 60:02}:{index % 60:02}-05:00"
+    data.update(
+        created_at=timestamp,
+        updated_at=timestamp,
+        processed_at=timestamp,
+        order_number=1000 + index,
+        token=f"{index:032x}",
+        cart_token=f"{index:024x}",
+        checkout_token=f"{index:032x}",
+        browser_ip="203.0.113.7",
+        client_details={
+            "accept_language": "en-US",
+            "browser_ip": "203.0.113.7",
+            "user_agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_0)",
+        },
+        note_attributes=[{"name": "gift", "value": "no"}],
+        total_price_set=money(data["total_price"]),
+        subtotal_price_set=money(data["total_price"]),
+        total_tax_set=money("0.00"),
+        total_discounts_set=money("0.00"),
+        total_line_items_price_set=money(data["total_price"]),
+        total_shipping_price_set=money("0.00"),
+        tax_lines=[
+            {"price": "0.00", "rate": 0.0, "title": "Tax", "price_set": money("0.00")}
+        ],
+    )
+    for line_item in data["line_items"]:
+        line_item.update(
+            price_set=money(line_item["price"]),
+            total_discount_set=money("0.00"),
+            discount_allocations=[],
+            duties=[],
+            tax_lines=[],
+            origin_location={"id": 1, "country_code": "US", "province_code": "CA"},
+        )
+    return data
+
+
+def held(decode, content, pages):
+    # Peak of the decode and memory still held once every page is decoded
+    gc.collect()
+    tracemalloc.start()
+    records = [item for _ in range(pages) for item in decode(content)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return records, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=100_000)
+    args = parser.parse_args()
+
+    page_size = 250
+    pages = args.records // page_size
+    print(f"{'':<28}{'held MB':>10}{'bytes/record':>14}{'access ns':>11}")
+    for name, key, sample, model in (
+        ("orders", "orders", order, Order),
+        ("products", "products", product, Product),
+    ):
+        # Distinct pages, as a real listing would not repeat its records
+        content = json.dumps({key: [sample(i) for i in range(page_size)]}).encode()
+        decoders = {
+            "dicts": lambda content: json.loads(content)[key],
+            "models": lambda content: model.decode(json.loads(content)[key]),
+            "models, 5 fields": lambda content: model.decode(
+                json.loads(content)[key], PROJECTION
+            ),
+        }
+        for decoder_name, decode in decoders.items():
+            records, current, _ = held(decode, content, pages)
+            first = records[0]
+            if decoder_name == "dicts":
+                access = timeit.timeit(lambda: first["updated_at"], number=1_000_000)
+            else:
+                access = timeit.timeit(lambda: first.updated_at, number=1_000_000)
+            print(
+                f"{name + ' as ' + decoder_name:<28}{current / 1024 / 1024:>10.1f}"
+                f"{current / len(records):>14.0f}{access * 1000:>11.1f}"
+            )
+            del records
+
+
+if __name__ == "__main__":
+    main()
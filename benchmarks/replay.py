@@ -0,0 +1,61 @@
+"""Record a pagination against the mock server, then replay it offline.
+
+Reports the size of the cassette and the time the same pagination takes live
+and replayed: at recorded speed, without latency, and throttled by a
+simulated 40 requests bucket leaking 2 a second.
+
+    python benchmarks/replay.py --records 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from mock_server import MockShopify
+
+from shopify_client import ShopifyClient
+from shopify_client.replay import Cassette, RecordingAdapter, ReplayAdapter
+from shopify_client.throttle import LeakyBucket
+
+
+def paginate(url, adapter):
+    client = ShopifyClient(api_url=url, api_token="token", adapter=adapter)
+    started = time.perf_counter()
+    records = sum(
+        len(page["orders"]) for page in client.orders.all(paginate=True, limit=250)
+    )
+    return records, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "orders.jsonl.gz")
+        with MockShopify(records=args.records) as server:
+            with Cassette(path) as cassette:
+                records, elapsed = paginate(server.url, RecordingAdapter(cassette))
+        print(f"cassette: {os.path.getsize(path) / 1024:.0f} KB for {records} records")
+
+        url = "https://offline.myshopify.com"
+        cassette = Cassette(path)
+        print(f"{'':<24}{'seconds':>10}{'records/s':>12}")
+        for name, adapter in (
+            ("live (recording)", None),
+            ("replay, recorded speed", ReplayAdapter(cassette)),
+            ("replay, no latency", ReplayAdapter(cassette, latency=0)),
+            (
+                "replay, throttled",
+                ReplayAdapter(cassette, latency=0, throttle=LeakyBucket(40, 2)),
+            ),
+        ):
+            if adapter is not None:
+                records, elapsed = paginate(url, adapter)
+            print(f"{name:<24}{elapsed:>10.2f}{records / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
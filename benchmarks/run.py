@@ -0,0 +1,168 @@
+"""Throughput, latency and memory benchmarks against a local mock Shopify server.
+
+Every scenario runs twice: once to measure records/sec, requests/sec and
+request latency percentiles, then once more under ``tracemalloc`` to measure
+peak memory. Results are written to ``benchmarks/results/<commit>.json``;
+pass a previous result to ``--compare`` to print the change of every metric.
+
+    python benchmarks/run.py
+    python benchmarks/run.py --records 50000 --compare benchmarks/results/abc1234.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+from mock_server import MockShopify
+
+from shopify_client import ShopifyClient
+from shopify_client.instrument import RequestStats
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+GRAPHQL_QUERY = """
+query orders($page_size: Int = 100, $cursor: String) {
+  orders(first: $page_size, after: $cursor) {
+    nodes {
+      id
+      name
+    }
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+  }
+}
+"""
+
+
+def rest_paginate(client):
+    return sum(
+        len(page["orders"]) for page in client.orders.all(paginate=True, limit=250)
+    )
+
+
+def rest_iter_records(client):
+    return sum(1 for _ in client.orders.iter_records(limit=250))
+
+
+def graphql_paginate(client):
+    pages = client.query(query=GRAPHQL_QUERY, paginate=True, page_size=250)
+    return sum(len(page["data"]["orders"]["nodes"]) for page in pages)
+
+
+# name: (scenario, every how many requests the server answers 429)
+SCENARIOS = {
+    "rest_paginate": (rest_paginate, 0),
+    "rest_iter_records": (rest_iter_records, 0),
+    "graphql_paginate": (graphql_paginate, 0),
+    "retry_storm": (rest_paginate, 3),
+}
+
+# Metrics where a higher value is better, for --compare
+HIGHER_IS_BETTER = frozenset(["records_per_sec", "requests_per_sec"])
+
+
+def run_scenario(scenario, url):
+    stats = RequestStats(percentiles=(50, 99))
+    client = ShopifyClient(api_url=url, api_token="token", observers=[stats])
+    started_at = time.perf_counter()
+    records = scenario(client)
+    elapsed = time.perf_counter() - started_at
+
+    (summary,) = stats.summary()
+    requests = summary["count"] + summary["retries"]
+
+    client = ShopifyClient(api_url=url, api_token="token")
+    tracemalloc.start()
+    scenario(client)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "records": records,
+        "requests": requests,
+        "retries": summary["retries"],
+        "seconds": elapsed,
+        "records_per_sec": records / elapsed,
+        "requests_per_sec": requests / elapsed,
+        "p50_ms": summary["p50"] * 1000,
+        "p99_ms": summary["p99"] * 1000,
+        "peak_memory_kb": peak_memory / 1024,
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, baseline):
+    print(f"\nCompared to {baseline['commit']}:")
+    for name, metrics in results["scenarios"].items():
+        previous = baseline["scenarios"].get(name)
+        if previous is None:
+            continue
+        changes = []
+        for metric in ("records_per_sec", "p50_ms", "p99_ms", "peak_memory_kb"):
+            change = (metrics[metric] - previous[metric]) / previous[metric] * 100
+            better = change > 0 if metric in HIGHER_IS_BETTER else change < 0
+            changes.append(f"{metric} {change:+.1f}%{'' if better else ' !'}")
+        print(f"{name:<20}{', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=20_000)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS))
+    parser.add_argument("--output", default=RESULTS_DIR)
+    parser.add_argument("--compare", help="result file of a previous run")
+    args = parser.parse_args()
+
+    results = {
+        "commit": commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "records": args.records,
+        "scenarios": {},
+    }
+
+    print(
+        f"{'':<20}{'records/s':>11}{'requests/s':>12}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'retries':>9}{'peak KB':>10}"
+    )
+    for name in args.scenario or SCENARIOS:
+        scenario, throttle_every = SCENARIOS[name]
+        with MockShopify(records=args.records, throttle_every=throttle_every) as server:
+            metrics = results["scenarios"][name] = run_scenario(scenario, server.url)
+        print(
+            f"{name:<20}{metrics['records_per_sec']:>11.0f}"
+            f"{metrics['requests_per_sec']:>12.1f}{metrics['p50_ms']:>9.2f}"
+            f"{metrics['p99_ms']:>9.2f}{metrics['retries']:>9}"
+            f"{metrics['peak_memory_kb']:>10.0f}"
+        )
+
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{results['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nSaved to {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
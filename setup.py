@@ -20,7 +20,20 @@ setup(
         "requests>=2.25.1",
     ],
     extras_require={
+        "async": [
+            "httpx>=0.23",
+        ],
+        "orjson": [
+            "orjson>=3.6",
+        ],
+        "msgspec": [
+            "msgspec>=0.18",
+        ],
+        "arrow": [
+            "pyarrow>=10",
+        ],
         "dev": [
+            "httpx>=0.23",
             "pytest",
             "pytest-cov",
             "pytest-mock",
@@ -28,7 +41,7 @@ setup(
             "black",
             "sphinx",
             "pre-commit",
-        ]
+        ],
     },
     python_requires=">=3.9",
     classifiers=[
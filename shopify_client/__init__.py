@@ -1,173 +1,246 @@
 import logging
+import time
 from urllib.parse import urljoin
 
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3 import Retry
 
-from .endpoint import DraftOrdersEndpoint, Endpoint, OrdersEndpoint
-from .graphql import GraphQL
+from .codec import get_codec
+from .coalesce import coalescing_key
+from .instrument import RequestEvent, graphql_cost, notify, retry_events
+from .resources import ShopifyResourcesMixin
+from .throttle import CALL_LIMIT_HEADER
 
 logger = logging.getLogger(__name__)
 
 SHOPIFY_API_VERSION = "2024-10"
 
 
-class ShopifyClient(requests.Session):
+# Shared by the blocking and the asyncio clients so both back off identically.
+RETRY_STRATEGY = Retry(
+    total=10,
+    connect=3,
+    read=3,
+    status=5,
+    backoff_factor=0.5,
+    allowed_methods=frozenset(["GET", "POST", "PUT", "PATCH", "DELETE"]),
+    status_forcelist=frozenset([429, 500, 502, 503, 504]),
+    respect_retry_after_header=True,
+)
+
+
+class ShopifyClient(ShopifyResourcesMixin, requests.Session):
     def __init__(
         self,
         api_url,
         api_token,
         api_version=SHOPIFY_API_VERSION,
         graphql_queries_dir=None,
+        rate_limiter=None,
+        cost_limiter=None,
+        cache=None,
+        adapter=None,
+        observers=None,
+        concurrency_limiter=None,
+        circuit_breaker=None,
+        coalescer=None,
+        codec=None,
+        query_registry=None,
     ):
         super().__init__()
         self.api_url = api_url
         self.api_version = api_version
+        # Encodes request bodies and decodes responses, see codec.get_codec
+        self.codec = get_codec(codec)
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.circuit_breaker = circuit_breaker
+        self.cache = cache
+        # Shares identical concurrent reads, see RequestCoalescer
+        self.coalescer = coalescer
+        # Callables receiving a RequestEvent for every request and retry
+        self.observers = list(observers or [])
         self.headers.update(
             {"X-Shopify-Access-Token": api_token, "Content-Type": "application/json"}
         )
 
-        retry_strategy = Retry(
-            total=10,
-            connect=3,
-            read=3,
-            status=5,
-            backoff_factor=0.5,
-            allowed_methods=frozenset(["GET", "POST", "PUT", "PATCH", "DELETE"]),
-            status_forcelist=frozenset([429, 500, 502, 503, 504]),
-            respect_retry_after_header=True,
-        )
-
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # A pool hands every client the same adapter to share its connections
+        adapter = adapter or HTTPAdapter(max_retries=RETRY_STRATEGY)
         self.mount("http://", adapter)
         self.mount("https://", adapter)
 
-        # Access
-        self.storefront_access_tokens = Endpoint(
-            client=self, endpoint="storefront_access_tokens"
-        )
-
-        # Billing
-        self.application_charges = Endpoint(client=self, endpoint="application_charges")
-        self.application_credits = Endpoint(client=self, endpoint="application_credits")
-        self.recurring_application_charges = Endpoint(
-            client=self, endpoint="recurring_application_charges"
-        )
-
-        # Customers
-        self.customers = Endpoint(client=self, endpoint="customers", metafields=True)
-        # self.customer_addresses = ShopifyEndpoint(client=self, endpoint="customer_addresses")
-
-        # Discounts
-        self.price_rules = Endpoint(client=self, endpoint="price_rules")
-        self.discount_codes = Endpoint(client=self, endpoint="discount_codes")
-
-        # Events
-        self.events = Endpoint(client=self, endpoint="events")
-
-        # Gift Cards
-        self.gift_cards = Endpoint(client=self, endpoint="gift_cards")
-
-        # Inventory
-        self.inventory_items = Endpoint(client=self, endpoint="inventory_items")
-        self.inventory_levels = Endpoint(client=self, endpoint="inventory_levels")
-        self.locations = Endpoint(client=self, endpoint="locations", metafields=True)
-
-        # Marketing Event
-        self.marketing_events = Endpoint(client=self, endpoint="marketing_events")
-
-        # Mobile Support
-        self.mobile_platform_applications = Endpoint(
-            client=self, endpoint="mobile_platform_applications"
+        # query_registry replaces the QueryRegistry built for graphql_queries_dir,
+        # e.g. to preload queries, reload changed files or share it between clients
+        self.init_resources(
+            graphql_queries_dir=graphql_queries_dir,
+            cost_limiter=cost_limiter,
+            query_registry=query_registry,
         )
 
-        # Online Store
-        self.articles = Endpoint(client=self, endpoint="articles", metafields=True)
-        self.blogs = Endpoint(client=self, endpoint="blogs", metafields=True)
-        self.pages = Endpoint(client=self, endpoint="pages", metafields=True)
-
-        # Orders
-        self.checkouts = Endpoint(client=self, endpoint="checkouts")
-        self.draft_orders = DraftOrdersEndpoint(
-            client=self, endpoint="draft_orders", metafields=True
-        )
-        self.orders = OrdersEndpoint(client=self, endpoint="orders")
-
-        # Plus
-        self.users = Endpoint(client=self, endpoint="users")
-
-        # Products
-        self.collects = Endpoint(client=self, endpoint="collects")
-        self.collections = Endpoint(
-            client=self, endpoint="collections", metafields=True
-        )
-        self.custom_collections = Endpoint(client=self, endpoint="custom_collections")
-        self.products = Endpoint(client=self, endpoint="products", metafields=True)
-        self.products.images = Endpoint(
-            client=self, endpoint="products", sub_endpoint="images"
-        )
-        self.product_images = Endpoint(
-            client=self, endpoint="product_images", metafields=True
-        )
-        self.smart_collections = Endpoint(
-            client=self, endpoint="smart_collections", metafields=True
-        )
-        self.variants = Endpoint(client=self, endpoint="variants", metafields=True)
-
-        # Sales Channels
-        self.collections_listings = Endpoint(
-            client=self, endpoint="collections_listings"
-        )
-        self.checkouts = Endpoint(client=self, endpoint="checkouts")
-        self.product_listings = Endpoint(client=self, endpoint="product_listings")
-        self.resource_feedback = Endpoint(client=self, endpoint="resource_feedback")
-
-        # Shipping and Fulfillment
-        self.assigned_fulfillment_orders = Endpoint(
-            client=self, endpoint="assigned_fulfillment_orders"
-        )
-        # TODO: Implement Fulfillment
-        self.fulfillment_orders = Endpoint(client=self, endpoint="fulfillment_orders")
-        self.carrier_services = Endpoint(client=self, endpoint="carrier_services")
-        self.fulfillments = Endpoint(client=self, endpoint="fulfillments")
-        self.fulfillment_services = Endpoint(
-            client=self, endpoint="fulfillment_services"
-        )
+    def request(self, method, url, *args, **kwargs):
+        if self.coalescer is not None and not args:
+            key = coalescing_key(method, url, kwargs, self.query.endpoint)
+            if key is not None:
+                return self.coalescer.call(
+                    key, lambda: self.__request(method, url, **kwargs)
+                )
+        return self.__request(method, url, *args, **kwargs)
+
+    def __request(self, method, url, *args, **kwargs):
+        if self.cache is None or kwargs.get("stream"):
+            return self.__send(method, url, *args, **kwargs)
+
+        if method == "GET":
+            return self.__cached_get(url, *args, **kwargs)
+
+        response = self.__send(method, url, *args, **kwargs)
+        if url != self.query.endpoint:
+            self.cache.invalidate(self.__absolute_url(url))
+        return response
 
-        # Shopify Payments
-        self.shopify_payments = Endpoint(client=self, endpoint="shopify_payments")
+    def __absolute_url(self, url):
+        return urljoin(f"{self.api_url}/admin/api/{self.api_version}/", url)
 
-        # Store Properties
-        self.countries = Endpoint(client=self, endpoint="countries")
-        self.currencies = Endpoint(client=self, endpoint="currencies")
-        self.policies = Endpoint(client=self, endpoint="policies")
-        self.shipping_zones = Endpoint(client=self, endpoint="shipping_zones")
-        self.shop = Endpoint(client=self, endpoint="shop", metafields=True)
+    def __cached_get(self, url, *args, **kwargs):
+        absolute_url = self.__absolute_url(url)
+        cached, fresh = self.cache.lookup(absolute_url)
+        if fresh:
+            logger.info(f"Requesting GET {url}: cached")
+            return cached
 
-        # Tender Transactions
-        self.tender_transactions = Endpoint(client=self, endpoint="tender_transactions")
+        if cached is not None:
+            kwargs["headers"] = {
+                **(kwargs.get("headers") or {}),
+                "If-None-Match": cached.headers["ETag"],
+            }
 
-        # Webhooks
-        self.webhooks = Endpoint(client=self, endpoint="webhooks")
+        response = self.__send("GET", url, *args, **kwargs)
+        if cached is not None and response.status_code == 304:
+            return self.cache.revalidated(absolute_url) or cached
 
-        # GraphQL
-        self.query = GraphQL(client=self, graphql_queries_dir=graphql_queries_dir)
+        self.cache.store(absolute_url, response)
+        return response
 
-    def request(self, method, url, *args, **kwargs):
-        response = super().request(
-            method,
-            urljoin(f"{self.api_url}/admin/api/{self.api_version}/", url),
-            *args,
-            **kwargs,
-        )
+    def __send(self, method, url, *args, **kwargs):
+        throttled = self.rate_limiter is not None and url != self.query.endpoint
+        delay = 0.0
+        if throttled:
+            delay = self.rate_limiter.reserve()
+            if delay:
+                logger.debug(f"Throttling {method} {url} for {delay:.2f}s")
+                time.sleep(delay)
+
+        # Encoded before taking a slot, which a body failing to encode would leak
+        if kwargs.get("json") is not None:
+            kwargs["data"] = self.codec.dumps(kwargs.pop("json"))
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.check()
+        token = None
+        if self.concurrency_limiter is not None:
+            token = self.concurrency_limiter.acquire()
+
+        started_at = time.perf_counter()
+        try:
+            response = super().request(
+                method,
+                self.__absolute_url(url),
+                *args,
+                **kwargs,
+            )
+        except requests.exceptions.RequestException as e:
+            self.__adapt(token, failed=True)
+            if self.observers:
+                notify(
+                    self.observers,
+                    RequestEvent(
+                        "request",
+                        method,
+                        url,
+                        error=repr(e),
+                        total_time=time.perf_counter() - started_at,
+                        throttle_delay=delay,
+                    ),
+                )
+            raise
+        except BaseException:
+            # Not an outcome of the shop, e.g. a bug or an interrupt
+            self.__abandon(token)
+            raise
+        total_time = time.perf_counter() - started_at
         logger.info(f"Requesting {method} {url}: {response.status_code}")
+        self.__adapt(token, response=response)
+
+        if throttled:
+            self.rate_limiter.update(response.headers.get(CALL_LIMIT_HEADER))
+        if self.observers:
+            self.__instrument(
+                method, url, response, total_time, delay, kwargs.get("stream")
+            )
         return response
 
+    def __adapt(self, token, response=None, failed=False):
+        # Reports the outcome of a request to the concurrency limiter and breaker
+        if self.concurrency_limiter is None and self.circuit_breaker is None:
+            return
+        statuses = ()
+        if response is not None:
+            retries = getattr(response.raw, "retries", None)
+            history = retries.history if retries is not None else ()
+            statuses = [attempt.status for attempt in history if attempt.status]
+            statuses.append(response.status_code)
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.release(token, statuses, failed=failed)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(not failed and response.status_code < 500)
+
+    def __abandon(self, token):
+        # Frees the slot and the breaker trial of a request that got no outcome
+        if self.concurrency_limiter is not None:
+            self.concurrency_limiter.cancel(token)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.cancel()
+
+    def __instrument(self, method, url, response, total_time, delay, stream):
+        retries = getattr(response.raw, "retries", None)
+        history = retries.history if retries is not None else ()
+        for event in retry_events(method, url, history):
+            notify(self.observers, event)
+
+        body = response.request.body
+        if stream:
+            # Reading the body here would consume the stream
+            response_bytes = int(response.headers.get("Content-Length", 0)) or None
+            cost = None
+        else:
+            response_bytes = len(response.content)
+            cost = (
+                graphql_cost(response.content) if url == self.query.endpoint else None
+            )
+
+        notify(
+            self.observers,
+            RequestEvent(
+                "request",
+                method,
+                url,
+                status=response.status_code,
+                retries=len(history),
+                ttfb=response.elapsed.total_seconds(),
+                total_time=total_time,
+                request_bytes=len(body) if body else 0,
+                response_bytes=response_bytes,
+                call_limit=response.headers.get(CALL_LIMIT_HEADER),
+                graphql_cost=cost,
+                throttle_delay=delay,
+            ),
+        )
+
     def parse_response(self, response):
         try:
             response.raise_for_status()
         except requests.exceptions.HTTPError as e:
             logger.warning(f"Failed to execute request: {response.text}")
             raise e
-        return response.json()
+        return self.codec.loads(response.content)
@@ -0,0 +1,556 @@
+import asyncio
+import json
+import logging
+import time
+from urllib.parse import urljoin
+
+import httpx
+from urllib3 import HTTPResponse
+from urllib3.exceptions import (
+    ConnectTimeoutError,
+    MaxRetryError,
+    ProtocolError,
+    ReadTimeoutError,
+)
+
+from . import RETRY_STRATEGY, SHOPIFY_API_VERSION
+from .batch import AsyncBatchQuery
+from .codec import get_codec
+from .endpoint import (
+    BaseEndpoint,
+    DraftOrdersMixin,
+    FulfillmentOrdersMixin,
+    OrdersMixin,
+)
+from .exceptions import GraphQLError
+from .graphql import MAX_THROTTLED_RETRIES, BaseGraphQL
+from .prefetch import aprefetch
+from .instrument import RequestEvent, graphql_cost, notify, retry_events
+from .registry import validate_pagination
+from .resume import FINISHED, acheckpointed
+from .resources import ShopifyResourcesMixin
+from .throttle import CALL_LIMIT_HEADER
+
+logger = logging.getLogger(__name__)
+
+
+class Trace:
+    """httpx ``trace`` extension recording when each connection step happened.
+
+    Only the last attempt of a retried request is kept.
+    """
+
+    def __init__(self):
+        self.timestamps = {}
+
+    async def __call__(self, event_name, info):
+        self.timestamps[event_name] = time.perf_counter()
+
+    def duration(self, step):
+        started = self.timestamps.get(f"{step}.started")
+        completed = self.timestamps.get(f"{step}.complete")
+        if started is None or completed is None:
+            return None
+        return completed - started
+
+    def ttfb(self, started_at):
+        for event_name in (
+            "http11.receive_response_headers.complete",
+            "http2.receive_response_headers.complete",
+        ):
+            if event_name in self.timestamps:
+                return self.timestamps[event_name] - started_at
+        return None
+
+
+class RetryError(httpx.TransportError):
+    """Status retries ran out, like ``requests.exceptions.RetryError``."""
+
+
+class AsyncRetryTransport(httpx.AsyncBaseTransport):
+    """Applies a urllib3 ``Retry`` policy to an asyncio transport.
+
+    This is the asyncio counterpart of ``HTTPAdapter(max_retries=...)``: the
+    same ``Retry`` object decides what is retried, counts the connect, read
+    and status budgets and computes the backoff, so both clients behave alike.
+    Once status retries run out, ``RetryError`` is raised unless the policy
+    has ``raise_on_status`` unset, in which case the last response is returned.
+    """
+
+    def __init__(self, transport, retry):
+        self.transport = transport
+        self.retry = retry
+
+    async def handle_async_request(self, request):
+        retry = self.retry
+        method = request.method
+        url = str(request.url)
+
+        while True:
+            try:
+                response = await self.transport.handle_async_request(request)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                retry = self.__increment(retry, method, url, e, ConnectTimeoutError(e))
+                await self.__sleep(retry)
+                continue
+            except (httpx.ReadError, httpx.ReadTimeout, httpx.RemoteProtocolError) as e:
+                if isinstance(e, httpx.ReadTimeout):
+                    error = ReadTimeoutError(None, url, str(e))
+                else:
+                    error = ProtocolError(str(e))
+                retry = self.__increment(retry, method, url, e, error)
+                await self.__sleep(retry)
+                continue
+
+            # Exposes the retry history to the client, like urllib3 responses do
+            response.extensions["retries"] = retry
+            has_retry_after = "Retry-After" in response.headers
+            if not retry.is_retry(method, response.status_code, has_retry_after):
+                return response
+
+            try:
+                retry = retry.increment(
+                    method,
+                    url,
+                    response=HTTPResponse(
+                        headers=dict(response.headers), status=response.status_code
+                    ),
+                )
+            except MaxRetryError as e:
+                if retry.raise_on_status:
+                    await response.aclose()
+                    raise RetryError(str(e), request=request)
+                # Out of status retries, hand the last response to the caller
+                return response
+
+            await response.aclose()
+            await self.__sleep(retry, response)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+    def __increment(self, retry, method, url, original, error):
+        try:
+            return retry.increment(method, url, error=error)
+        except (MaxRetryError, type(error)):
+            raise original
+
+    async def __sleep(self, retry, response=None):
+        if response is not None and retry.respect_retry_after_header:
+            retry_after = retry.get_retry_after(response)
+            if retry_after:
+                await asyncio.sleep(retry_after)
+                return
+
+        backoff = retry.get_backoff_time()
+        if backoff > 0:
+            await asyncio.sleep(backoff)
+
+
+class AsyncEndpoint(BaseEndpoint):
+    def _sub_endpoint(self, sub_endpoint):
+        return AsyncEndpoint(
+            client=self.client, endpoint=self.endpoint, sub_endpoint=sub_endpoint
+        )
+
+    async def __get(self, url, decode=None):
+        page = self.client.parse_response(await self.client.get(url))
+        return decode(page) if decode else page
+
+    async def __pages(self, url, decode=None):
+        next_url = None if url == FINISHED else url
+        while next_url:
+            response = await self.client.get(next_url)
+            page = self.client.parse_response(response)
+            next_url = response.links.get("next", {}).get("url")
+            yield decode(page) if decode else page, next_url or FINISHED
+
+    async def __paginate(self, url, decode=None):
+        async for page, _ in self.__pages(url, decode):
+            yield page
+
+    # Public methods
+    async def get(self, resource_id, model=None, **params):
+        url = self._build_url(resource_id=resource_id, **params)
+        return self._decode_record(await self.__get(url), model, params.get("fields"))
+
+    async def create(self, json: dict, **params):
+        url = self._build_url(**params)
+        return self.client.parse_response(await self.client.post(url, json=json))
+
+    async def update(self, resource_id, json, **params):
+        url = self._build_url(resource_id=resource_id, **params)
+        return self.client.parse_response(await self.client.put(url, json=json))
+
+    async def delete(self, resource_id, **params):
+        url = self._build_url(resource_id=resource_id, **params)
+        resp = await self.client.delete(url)
+        return resp.is_success
+
+    def all(
+        self,
+        paginate=False,
+        prefetch=0,
+        resume=None,
+        checkpoint=None,
+        model=None,
+        **params,
+    ):
+        url = resume or self._build_url(**params)
+        decode = self._decoder(model, params.get("fields"))
+        if paginate and checkpoint is not None:
+            pages = self.__pages(url, decode)
+            if prefetch:
+                pages = aprefetch(pages, prefetch)
+            return acheckpointed(pages, checkpoint)
+        elif paginate and prefetch:
+            return aprefetch(self.__paginate(url, decode), prefetch)
+        elif paginate:
+            return self.__paginate(url, decode)
+        else:
+            return self.__get(url, decode)
+
+    async def action(self, action, resource_id, method="GET", **params):
+        options, params = self._request_options(params)
+        url = self._build_url(resource_id=resource_id, action=action, **params)
+        return self.client.parse_response(
+            await self.client.request(method, url, **options)
+        )
+
+
+class AsyncOrdersEndpoint(OrdersMixin, AsyncEndpoint):
+    pass
+
+
+class AsyncDraftOrdersEndpoint(DraftOrdersMixin, AsyncEndpoint):
+    pass
+
+
+class AsyncFulfillmentOrdersEndpoint(FulfillmentOrdersMixin, AsyncEndpoint):
+    pass
+
+
+class AsyncGraphQL(BaseGraphQL):
+    def __call__(self, *args, **kwargs):
+        return self.__query(*args, **kwargs)
+
+    def batch(self, **kwargs):
+        """Start a batch of queries sent together as merged requests."""
+        return AsyncBatchQuery(self, **kwargs)
+
+    def __query(
+        self,
+        query=None,
+        query_name=None,
+        variables=None,
+        operation_name=None,
+        paginate=False,
+        page_size=100,
+        prefetch=0,
+        resume=None,
+        checkpoint=None,
+        model=None,
+    ):
+        assert query or query_name, "Either 'query' or 'query_name' must be provided"
+
+        if query is None and query_name:
+            query = self.query_from_name(query_name)
+        decode = self._decoder(query, model, paginate)
+
+        if paginate and checkpoint is not None:
+            pages = self.__pages(
+                query=query,
+                variables=variables,
+                operation_name=operation_name,
+                page_size=page_size,
+                cursor=resume,
+                decode=decode,
+            )
+            if prefetch:
+                pages = aprefetch(pages, prefetch)
+            return acheckpointed(pages, checkpoint)
+        if paginate:
+            pages = self.__paginate(
+                query=query,
+                variables=variables,
+                operation_name=operation_name,
+                page_size=page_size,
+                cursor=resume,
+                decode=decode,
+            )
+            return aprefetch(pages, prefetch) if prefetch else pages
+        return self.__execute(
+            query=query, variables=variables, operation_name=operation_name
+        )
+
+    async def __execute(self, query, variables=None, operation_name=None):
+        try:
+            parsed_response = await self._send(
+                query=query, variables=variables, operation_name=operation_name
+            )
+            if "errors" in parsed_response:
+                logger.error(f"GraphQL errors: {parsed_response['errors']}")
+                if parsed_response.get("data", None) is None:
+                    raise GraphQLError(f"GraphQL errors: {parsed_response['errors']}")
+            return parsed_response
+        except httpx.HTTPStatusError as e:
+            logger.warning(f"Failed to execute GraphQL query: {repr(e)}")
+            raise e
+        except json.JSONDecodeError as e:
+            logger.warning(f"Failed to parse JSON response: {repr(e)}")
+            raise e
+
+    async def _send(self, query, variables=None, operation_name=None):
+        payload = {
+            "query": query,
+            "variables": variables,
+            "operationName": operation_name,
+        }
+        if self.cost_limiter is None:
+            response = await self.client.post(self._build_url(), json=payload)
+            return self.client.parse_response(response)
+
+        for _ in range(MAX_THROTTLED_RETRIES + 1):
+            reserved, delay = self._reserve_cost(query)
+            if delay:
+                logger.debug(f"Throttling GraphQL query for {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+            try:
+                response = await self.client.post(self._build_url(), json=payload)
+                parsed_response = self.client.parse_response(response)
+            except BaseException:
+                self.cost_limiter.refund(reserved)
+                raise
+            if not self._record_cost(query, parsed_response, reserved):
+                break
+        return parsed_response
+
+    async def __pages(
+        self,
+        query,
+        variables=None,
+        operation_name=None,
+        page_size=100,
+        cursor=None,
+        decode=None,
+    ):
+        validate_pagination(query)
+        connection = self._outer_connection(query)
+
+        variables = variables or {}
+        variables["page_size"] = page_size
+
+        has_next_page = cursor != FINISHED
+
+        while has_next_page:
+            variables["cursor"] = cursor
+            response = await self.__execute(
+                query=query, variables=variables, operation_name=operation_name
+            )
+            page_info = self._page_info(response, connection)
+            has_next_page = page_info.get("hasNextPage", False)
+            cursor = page_info.get("endCursor", None)
+
+            yield (
+                decode(response) if decode else response,
+                (cursor if has_next_page else FINISHED),
+            )
+
+    async def __paginate(
+        self,
+        query,
+        variables=None,
+        operation_name=None,
+        page_size=100,
+        cursor=None,
+        decode=None,
+    ):
+        async for page, _ in self.__pages(
+            query, variables, operation_name, page_size, cursor=cursor, decode=decode
+        ):
+            yield page
+
+
+class AsyncShopifyClient(ShopifyResourcesMixin, httpx.AsyncClient):
+    """Asyncio counterpart of ``ShopifyClient`` built on ``httpx.AsyncClient``.
+
+    Exposes the same endpoint tree, but endpoint methods and queries are
+    coroutines and ``paginate=True`` returns an async iterator. ``transport``
+    replaces the network transport, e.g. with ``httpx.MockTransport`` in tests;
+    the retry policy is applied on top of it.
+    """
+
+    endpoint_class = AsyncEndpoint
+    orders_endpoint_class = AsyncOrdersEndpoint
+    draft_orders_endpoint_class = AsyncDraftOrdersEndpoint
+    graphql_class = AsyncGraphQL
+
+    def __init__(
+        self,
+        api_url,
+        api_token,
+        api_version=SHOPIFY_API_VERSION,
+        graphql_queries_dir=None,
+        transport=None,
+        rate_limiter=None,
+        cost_limiter=None,
+        observers=None,
+        concurrency_limiter=None,
+        circuit_breaker=None,
+        codec=None,
+        query_registry=None,
+    ):
+        super().__init__(
+            headers={
+                "X-Shopify-Access-Token": api_token,
+                "Content-Type": "application/json",
+            },
+            transport=AsyncRetryTransport(
+                transport or httpx.AsyncHTTPTransport(), RETRY_STRATEGY
+            ),
+        )
+        self.api_url = api_url
+        self.api_version = api_version
+        self.codec = get_codec(codec)
+        self.rate_limiter = rate_limiter
+        # An AsyncAdaptiveLimiter, and a CircuitBreaker
+        self.concurrency_limiter = concurrency_limiter
+        self.circuit_breaker = circuit_breaker
+        # Callables receiving a RequestEvent for every request and retry
+        self.observers = list(observers or [])
+
+        self.init_resources(
+            graphql_queries_dir=graphql_queries_dir,
+            cost_limiter=cost_limiter,
+            query_registry=query_registry,
+        )
+
+    async def request(self, method, url, *args, **kwargs):
+        throttled = self.rate_limiter is not None and url != self.query.endpoint
+        delay = 0.0
+        if throttled:
+            delay = self.rate_limiter.reserve()
+            if delay:
+                logger.debug(f"Throttling {method} {url} for {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+        trace = None
+        if self.observers:
+            trace = Trace()
+            kwargs["extensions"] = {**(kwargs.get("extensions") or {}), "trace": trace}
+
+        if kwargs.get("json") is not None:
+            kwargs["content"] = self.codec.dumps(kwargs.pop("json"))
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.check()
+        token = None
+        if self.concurrency_limiter is not None:
+            token = await self.concurrency_limiter.acquire()
+
+        started_at = time.perf_counter()
+        try:
+            response = await super().request(
+                method,
+                urljoin(f"{self.api_url}/admin/api/{self.api_version}/", url),
+                *args,
+                **kwargs,
+            )
+        except httpx.HTTPError as e:
+            await self.__adapt(token, failed=True)
+            if self.observers:
+                notify(
+                    self.observers,
+                    RequestEvent(
+                        "request",
+                        method,
+                        url,
+                        error=repr(e),
+                        total_time=time.perf_counter() - started_at,
+                        throttle_delay=delay,
+                    ),
+                )
+            raise
+        except BaseException:
+            # Not an outcome of the shop, e.g. a bug or a cancellation
+            await self.__abandon(token)
+            raise
+        logger.info(f"Requesting {method} {url}: {response.status_code}")
+        await self.__adapt(token, response=response)
+
+        if throttled:
+            self.rate_limiter.update(response.headers.get(CALL_LIMIT_HEADER))
+        if self.observers:
+            self.__instrument(method, url, response, started_at, trace, delay)
+        return response
+
+    async def __adapt(self, token, response=None, failed=False):
+        # Reports the outcome of a request to the concurrency limiter and breaker
+        if self.concurrency_limiter is None and self.circuit_breaker is None:
+            return
+        statuses = ()
+        if response is not None:
+            retries = response.extensions.get("retries")
+            history = retries.history if retries is not None else ()
+            statuses = [attempt.status for attempt in history if attempt.status]
+            statuses.append(response.status_code)
+        if self.concurrency_limiter is not None:
+            await self.concurrency_limiter.release(token, statuses, failed=failed)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(not failed and response.status_code < 500)
+
+    async def __abandon(self, token):
+        # Frees the slot and the breaker trial of a request that got no outcome
+        if self.concurrency_limiter is not None:
+            await self.concurrency_limiter.cancel(token)
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.cancel()
+
+    def __instrument(self, method, url, response, started_at, trace, delay):
+        retries = response.extensions.get("retries")
+        history = retries.history if retries is not None else ()
+        for event in retry_events(method, url, history):
+            notify(self.observers, event)
+
+        try:
+            request_bytes = len(response.request.content)
+        except httpx.RequestNotRead:
+            request_bytes = 0
+        if response.is_stream_consumed:
+            response_bytes = len(response.content)
+            cost = (
+                graphql_cost(response.content) if url == self.query.endpoint else None
+            )
+        else:
+            # Reading the body here would consume the stream
+            response_bytes = int(response.headers.get("Content-Length", 0)) or None
+            cost = None
+
+        notify(
+            self.observers,
+            RequestEvent(
+                "request",
+                method,
+                url,
+                status=response.status_code,
+                retries=len(history),
+                connect_time=trace.duration("connection.connect_tcp"),
+                tls_time=trace.duration("connection.start_tls"),
+                ttfb=trace.ttfb(started_at),
+                total_time=time.perf_counter() - started_at,
+                request_bytes=request_bytes,
+                response_bytes=response_bytes,
+                call_limit=response.headers.get(CALL_LIMIT_HEADER),
+                graphql_cost=cost,
+                throttle_delay=delay,
+            ),
+        )
+
+    def parse_response(self, response):
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            logger.warning(f"Failed to execute request: {response.text}")
+            raise e
+        return self.codec.loads(response.content)
@@ -0,0 +1,337 @@
+import asyncio
+import itertools
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from .exceptions import GraphQLError
+from .registry import _OPERATION_TYPES, _TOKENS
+
+logger = logging.getLogger(__name__)
+
+
+def prefix_document(document, prefix):
+    """Prefix the variables, fragments and root response keys of a document.
+
+    Returns the operation type, its variable definitions, its root selections
+    and its fragment definitions, rewritten so they can be merged with other
+    documents: ``$id`` becomes ``$<prefix>id`` and a root field ``product``
+    is aliased ``<prefix>product: product``. Root fields must be selected
+    directly, not through fragments, for their response keys to be prefixed.
+    """
+    tokens = [match for match in _TOKENS.finditer(document) if match.group()[0] != "#"]
+    edits = []  # (start, end, replacement) of every rewritten token
+    operation = None
+    variables = ""
+    selections = None
+    fragments = []
+    kind = None  # type of the current top-level definition
+    depth = parens = 0
+    variables_start = body_start = definition_start = None
+    previous = None
+
+    def rewritten(start, end):
+        pieces = []
+        position = start
+        for edit_start, edit_end, replacement in edits:
+            if start <= edit_start < end:
+                pieces.append(document[position:edit_start])
+                pieces.append(replacement)
+                position = edit_end
+        pieces.append(document[position:end])
+        return "".join(pieces).strip()
+
+    for index, match in enumerate(tokens):
+        token = match.group()
+        following = tokens[index + 1].group() if index + 1 < len(tokens) else None
+
+        if token[0] == "$":
+            edits.append((match.start(), match.end(), f"${prefix}{token[1:]}"))
+        elif token[0] == '"':
+            pass
+        elif token == "(":
+            parens += 1
+            if depth == 0 and parens == 1:
+                variables_start = match.end()
+        elif token == ")":
+            parens -= 1
+            if depth == 0 and parens == 0 and kind != "fragment":
+                variables = rewritten(variables_start, match.start())
+        elif parens:
+            pass
+        elif token == "{":
+            if depth == 0:
+                # A document can start with a bare selection, shorthand for a query
+                kind = kind or "query"
+                body_start = match.end()
+            depth += 1
+        elif token == "}":
+            depth -= 1
+            if depth == 0:
+                if kind == "fragment":
+                    fragments.append(rewritten(definition_start, match.end()))
+                else:
+                    assert (
+                        selections is None
+                    ), "Batched queries must contain a single operation"
+                    operation = kind
+                    selections = rewritten(body_start, match.start())
+                kind = None
+        elif depth == 0:
+            if token in _OPERATION_TYPES or token == "fragment":
+                kind = token
+                definition_start = match.start()
+            elif previous == "fragment":
+                edits.append((match.start(), match.end(), f"{prefix}{token}"))
+        elif previous == "...":
+            if token != "on":
+                edits.append((match.start(), match.end(), f"{prefix}{token}"))
+        elif (
+            depth == 1
+            and kind != "fragment"
+            and (token[0].isalpha() or token[0] == "_")
+            and previous not in ("on", "@", ":")
+        ):
+            if following == ":":
+                # Already aliased, prefix the alias
+                edits.append((match.start(), match.end(), f"{prefix}{token}"))
+            else:
+                edits.append((match.start(), match.end(), f"{prefix}{token}: {token}"))
+        previous = token
+
+    assert selections is not None, "Batched queries must contain an operation"
+    return operation, variables, selections, fragments
+
+
+class BatchItem:
+    """A query added to a batch. Its response is set once the batch is sent."""
+
+    def __init__(self, query, variables, cost, prefix):
+        self.query = query
+        self.variables = variables or {}
+        self.cost = cost
+        self.prefix = prefix
+        (
+            self.operation,
+            self.variable_definitions,
+            self.selections,
+            self.fragments,
+        ) = prefix_document(query, prefix)
+        self.response = None
+
+    def result(self):
+        """Return the response of the query, raising like a non-batched query."""
+        assert self.response is not None, "The batch has not been sent yet"
+
+        if "errors" in self.response:
+            logger.error(f"GraphQL errors: {self.response['errors']}")
+            if self.response.get("data", None) is None:
+                raise GraphQLError(f"GraphQL errors: {self.response['errors']}")
+        return self.response
+
+    def split(self, parsed_response):
+        """Extract this query's data and errors from a merged response."""
+        data = parsed_response.get("data", None)
+        if data is not None:
+            data = {
+                key[len(self.prefix) :]: value
+                for key, value in data.items()
+                if key.startswith(self.prefix)
+            }
+
+        errors = []
+        for error in parsed_response.get("errors", []):
+            path = error.get("path")
+            if not path:
+                # Errors about the whole request concern every query in it
+                errors.append(error)
+            elif str(path[0]).startswith(self.prefix):
+                errors.append(
+                    {**error, "path": [path[0][len(self.prefix) :], *path[1:]]}
+                )
+
+        self.response = {"data": data}
+        if errors:
+            self.response["errors"] = errors
+        if "extensions" in parsed_response:
+            self.response["extensions"] = parsed_response["extensions"]
+
+
+class BaseBatchQuery:
+    """What the blocking and the asyncio batches share: adding queries,
+    grouping them into requests and splitting the responses back.
+    """
+
+    def __init__(self, graphql, max_cost=1000, default_cost=10, workers=1):
+        self.graphql = graphql
+        self.max_cost = max_cost
+        self.default_cost = default_cost
+        self.workers = workers
+        self.items = []
+        self.__prefixes = (f"b{index}__" for index in itertools.count())
+
+    def add(self, query=None, query_name=None, variables=None, cost=None):
+        assert query or query_name, "Either 'query' or 'query_name' must be provided"
+
+        if query is None and query_name:
+            query = self.graphql.query_from_name(query_name)
+        if cost is None:
+            cost = self.graphql.query_costs.get(query, self.default_cost)
+
+        item = BatchItem(query, variables, cost, next(self.__prefixes))
+        self.items.append(item)
+        return item
+
+    def chunks(self, items):
+        chunk = []
+        total_cost = 0
+        for item in items:
+            if chunk and (
+                total_cost + item.cost > self.max_cost
+                or item.operation != chunk[0].operation
+            ):
+                yield chunk
+                chunk = []
+                total_cost = 0
+            chunk.append(item)
+            total_cost += item.cost
+        if chunk:
+            yield chunk
+
+    def _merge(self, chunk):
+        # The merged document of a chunk and its variables
+        variable_definitions = ", ".join(
+            item.variable_definitions for item in chunk if item.variable_definitions
+        )
+        document = "\n".join(
+            [
+                f"{chunk[0].operation}"
+                + (f"({variable_definitions})" if variable_definitions else "")
+                + " {",
+                *(item.selections for item in chunk),
+                "}",
+                *(fragment for item in chunk for fragment in item.fragments),
+            ]
+        )
+        variables = {
+            f"{item.prefix}{name}": value
+            for item in chunk
+            for name, value in item.variables.items()
+        }
+
+        logger.debug(f"Sending {len(chunk)} batched GraphQL {chunk[0].operation}s")
+        # Book the estimated cost up front, senders forget the document once sent
+        self.graphql.query_costs[document] = sum(item.cost for item in chunk)
+        return document, variables
+
+    def _split(self, chunk, parsed_response):
+        for item in chunk:
+            item.split(parsed_response)
+        self._record_costs(chunk, parsed_response)
+
+    def _record_costs(self, chunk, parsed_response):
+        # Remembers what each query of a sent chunk cost, for later batches
+        cost = parsed_response.get("extensions", {}).get("cost")
+        if not cost or not cost.get("requestedQueryCost"):
+            return
+
+        costs = {item.prefix: 0 for item in chunk}
+        for field in cost.get("fields") or ():
+            # With the debug header, every root field has its own cost
+            path = field.get("path") or ()
+            if len(path) == 1:
+                prefix = str(path[0]).split("__", 1)[0] + "__"
+                if prefix in costs:
+                    costs[prefix] += field.get("requestedTotalCost") or 0
+        if not any(costs.values()):
+            total = cost["requestedQueryCost"]
+            estimated = sum(item.cost for item in chunk)
+            costs = {
+                item.prefix: math.ceil(total * item.cost / estimated) for item in chunk
+            }
+
+        for item in chunk:
+            self.graphql.query_costs[item.query] = max(1, costs[item.prefix])
+
+
+class BatchQuery(BaseBatchQuery):
+    """Sends many small queries as a few merged requests.
+
+    Queries are added with ``add()``, which returns a ``BatchItem``, and sent
+    together by ``send()`` or on leaving a ``with`` block. Each request merges
+    as many queries as fit in ``max_cost``, renaming their variables and
+    aliasing their root fields so they cannot collide, and the response is
+    split back into one response per query. A query's cost is the last one
+    Shopify reported for it, or ``default_cost`` until it is known. Shopify
+    reports the cost of a merged request as a whole, which is shared between
+    its queries in proportion to their estimates, unless the request was sent
+    with the ``Shopify-GraphQL-Cost-Debug`` header, whose breakdown by root
+    field gives the cost of each query exactly. Queries and mutations are
+    never merged into the same request. With ``workers`` above one, the
+    requests are sent concurrently.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.send()
+
+    def send(self):
+        """Send every pending query and return their responses, in order."""
+        items, self.items = self.items, []
+        chunks = list(self.chunks(items))
+        if self.workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                # Consume the results to raise the first error
+                list(executor.map(self.__send, chunks))
+        else:
+            for chunk in chunks:
+                self.__send(chunk)
+        return [item.response for item in items]
+
+    def __send(self, chunk):
+        document, variables = self._merge(chunk)
+        try:
+            parsed_response = self.graphql._send(query=document, variables=variables)
+        finally:
+            self.graphql.query_costs.pop(document, None)
+        self._split(chunk, parsed_response)
+
+
+class AsyncBatchQuery(BaseBatchQuery):
+    """Asyncio counterpart of ``BatchQuery``.
+
+    Queries are sent by ``await send()`` or on leaving an ``async with``
+    block, with up to ``workers`` requests in flight at once.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.send()
+
+    async def send(self):
+        """Send every pending query and return their responses, in order."""
+        items, self.items = self.items, []
+        slots = asyncio.Semaphore(self.workers)
+
+        async def send_chunk(chunk):
+            async with slots:
+                await self.__send(chunk)
+
+        await asyncio.gather(*(send_chunk(chunk) for chunk in self.chunks(items)))
+        return [item.response for item in items]
+
+    async def __send(self, chunk):
+        document, variables = self._merge(chunk)
+        try:
+            parsed_response = await self.graphql._send(
+                query=document, variables=variables
+            )
+        finally:
+            self.graphql.query_costs.pop(document, None)
+        self._split(chunk, parsed_response)
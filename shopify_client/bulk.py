@@ -0,0 +1,193 @@
+import json
+import logging
+import time
+from urllib.parse import unquote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .exceptions import BulkOperationError, GraphQLError
+
+logger = logging.getLogger(__name__)
+
+RUN_QUERY_MUTATION = """
+mutation bulkOperationRunQuery($query: String!) {
+  bulkOperationRunQuery(query: $query) {
+    bulkOperation {
+      id
+      status
+    }
+    userErrors {
+      field
+      message
+    }
+  }
+}
+"""
+
+CURRENT_OPERATION_QUERY = """
+query currentBulkOperation {
+  currentBulkOperation {
+    id
+    status
+    errorCode
+    objectCount
+    url
+    partialDataUrl
+  }
+}
+"""
+
+FINISHED_STATUSES = frozenset(["COMPLETED", "FAILED", "CANCELED", "EXPIRED"])
+
+# Connect and read timeouts of result downloads, in seconds
+DOWNLOAD_TIMEOUT = (10, 60)
+
+
+def read_lines(url):
+    """Stream the lines of a bulk operation result without loading it whole.
+
+    ``file://`` URLs are read from disk, anything else is downloaded over HTTP
+    without the Shopify access token, since results are served from storage,
+    retried like the client's requests.
+    """
+    # Imported here as the package imports this module before defining it
+    from . import RETRY_STRATEGY
+
+    parsed_url = urlparse(url)
+    if parsed_url.scheme == "file":
+        with open(unquote(parsed_url.path), "rb") as f:
+            yield from f
+        return
+
+    with requests.Session() as session:
+        session.mount("https://", HTTPAdapter(max_retries=RETRY_STRATEGY))
+        session.mount("http://", HTTPAdapter(max_retries=RETRY_STRATEGY))
+        with session.get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            yield from response.iter_lines()
+
+
+def child_key(record):
+    """Key a child record is nested under on its parent.
+
+    Uses ``__typename`` when the query selects it, otherwise the resource type
+    of the record's global id, e.g. ``ProductVariant`` for
+    ``gid://shopify/ProductVariant/1``.
+    """
+    if "__typename" in record:
+        return record["__typename"]
+    if isinstance(record.get("id"), str) and record["id"].startswith("gid://"):
+        return record["id"].split("/")[3]
+    return "children"
+
+
+def reassemble(lines, key=child_key):
+    """Nest JSONL child records onto their ``__parentId`` and yield top-level records.
+
+    Shopify writes every top-level record before its children, so a record is
+    complete as soon as the next top-level record starts and only one record
+    tree is held in memory at a time.
+    """
+    current = None
+    records_by_id = {}
+
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        parent_id = record.pop("__parentId", None)
+
+        if parent_id is None:
+            if current is not None:
+                yield current
+            current = record
+            records_by_id = {}
+        else:
+            parent = records_by_id.get(parent_id)
+            assert parent is not None, f"Parent {parent_id} must precede its children"
+            parent.setdefault(key(record), []).append(record)
+
+        if "id" in record:
+            records_by_id[record["id"]] = record
+
+    if current is not None:
+        yield current
+
+
+class BulkQuery:
+    """Runs a query through the Bulk Operations API and streams its results.
+
+    Submits the query with ``bulkOperationRunQuery``, polls
+    ``currentBulkOperation`` with exponential backoff until it finishes, then
+    streams the JSONL result and yields fully reassembled records.
+    """
+
+    def __init__(
+        self,
+        graphql,
+        poll_interval=1,
+        max_poll_interval=30,
+        reader=read_lines,
+        key=child_key,
+    ):
+        self.graphql = graphql
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.reader = reader
+        self.key = key
+
+    def run(self, query):
+        response = self.graphql(
+            query=RUN_QUERY_MUTATION,
+            variables={"query": query},
+            operation_name="bulkOperationRunQuery",
+        )
+        result = response["data"]["bulkOperationRunQuery"]
+        if result["userErrors"]:
+            raise GraphQLError(f"Bulk operation errors: {result['userErrors']}")
+        return result["bulkOperation"]
+
+    def wait(self, operation_id):
+        interval = self.poll_interval
+        while True:
+            response = self.graphql(
+                query=CURRENT_OPERATION_QUERY, operation_name="currentBulkOperation"
+            )
+            operation = response["data"]["currentBulkOperation"]
+            # Another bulk query started on the store would replace ours
+            assert (
+                operation and operation["id"] == operation_id
+            ), f"Bulk operation {operation_id} is no longer the current one"
+            if operation["status"] in FINISHED_STATUSES:
+                break
+
+            logger.debug(
+                f"Bulk operation {operation['id']} is {operation['status']}, "
+                f"checking again in {interval}s"
+            )
+            time.sleep(interval)
+            interval = min(interval * 2, self.max_poll_interval)
+
+        if operation["status"] != "COMPLETED":
+            raise BulkOperationError(
+                f"Bulk operation {operation['id']} {operation['status']}: "
+                f"{operation['errorCode']}"
+            )
+        return operation
+
+    def records(self, url):
+        if url is None:
+            # Shopify does not produce a file when the query matched nothing
+            return
+        yield from reassemble(self.reader(url), key=self.key)
+
+    def __call__(self, query):
+        operation = self.run(query)
+        logger.info(f"Started bulk operation {operation['id']}")
+        operation = self.wait(operation["id"])
+        logger.info(
+            f"Bulk operation {operation['id']} completed: "
+            f"{operation['objectCount']} objects"
+        )
+        yield from self.records(operation["url"])
@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+
+def resource_name(url):
+    """Top-level REST resource of an Admin API URL, e.g. ``products``."""
+    path = urlparse(url).path
+    if "/admin/api/" in path:
+        # Drop the API version that follows the prefix
+        path = path.split("/admin/api/", 1)[1].split("/", 1)[-1]
+    return path.lstrip("/").split("/", 1)[0].removesuffix(".json")
+
+
+class CacheEntry:
+    __slots__ = ("response", "expires_at")
+
+    def __init__(self, response, expires_at):
+        self.response = response
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of successful GET responses.
+
+    Entries live for ``ttl`` seconds, or the value given for their resource in
+    ``ttls`` (``{"shop": 3600, "locations": 600}``); a TTL of 0 disables
+    caching for that resource. Expired entries that carry an ``ETag`` are kept
+    to revalidate them with a conditional request. Any write to a resource
+    invalidates every cached response of that resource.
+    """
+
+    def __init__(self, max_entries=1000, ttl=60, ttls=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @property
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "revalidations": self.revalidations,
+            "size": len(self.__entries),
+        }
+
+    def ttl_for(self, url):
+        return self.ttls.get(resource_name(url), self.ttl)
+
+    def lookup(self, url):
+        """Return ``(response, fresh)`` for a cached URL, or ``(None, False)``.
+
+        A stale response is only returned when it can be revalidated.
+        """
+        with self.__lock:
+            entry = self.__entries.get(url)
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            self.__entries.move_to_end(url)
+            if entry.expires_at > self.clock():
+                self.hits += 1
+                return entry.response, True
+
+            self.misses += 1
+            if "ETag" not in entry.response.headers:
+                del self.__entries[url]
+                return None, False
+
+            return entry.response, False
+
+    def store(self, url, response):
+        ttl = self.ttl_for(url)
+        if not ttl or response.status_code != 200:
+            return
+
+        with self.__lock:
+            self.__entries[url] = CacheEntry(response, self.clock() + ttl)
+            self.__entries.move_to_end(url)
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def revalidated(self, url):
+        """Extend the life of a stale entry confirmed by a 304 response."""
+        with self.__lock:
+            entry = self.__entries.get(url)
+            if entry is not None:
+                entry.expires_at = self.clock() + self.ttl_for(url)
+                self.revalidations += 1
+                self.hits += 1
+                self.misses -= 1
+                return entry.response
+
+    def invalidate(self, url):
+        """Drop every cached response of the resource ``url`` belongs to."""
+        resource = resource_name(url)
+        with self.__lock:
+            for cached_url in list(self.__entries):
+                if resource_name(cached_url) == resource:
+                    del self.__entries[cached_url]
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
@@ -0,0 +1,86 @@
+import json
+import re
+import threading
+
+# A false positive, e.g. in a string argument, only means the query isn't coalesced
+_MUTATION = re.compile(r"\bmutation\b")
+
+
+def coalescing_key(method, url, kwargs, graphql_endpoint):
+    """Identify a read request, or return None for a request that must be sent.
+
+    GET requests and GraphQL queries are reads; GraphQL mutations, other
+    methods and streamed requests are not.
+    """
+    if kwargs.get("stream"):
+        return None
+    if method == "POST" and url == graphql_endpoint:
+        payload = kwargs.get("json") or {}
+        if _MUTATION.search(payload.get("query") or ""):
+            return None
+    elif method != "GET":
+        return None
+    return method, url, json.dumps(kwargs, sort_keys=True, default=str)
+
+
+class Flight:
+    """A call in progress, and its outcome once it is done."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """Shares one in-flight call between the threads making the same request.
+
+    The first caller of ``call()`` for a key makes the call; callers arriving
+    with the same key while it is in flight wait for it and get the same
+    result, or the same exception raised. Once the call returns, the next
+    caller makes a new one: nothing is cached. ``stats`` tells how many calls
+    were made and how many callers were spared one.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.deduplicated = 0
+        self.__flights = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "deduplicated": self.deduplicated,
+            "in_flight": len(self.__flights),
+        }
+
+    def call(self, key, function):
+        with self.__lock:
+            flight = self.__flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.__flights[key] = Flight()
+                self.calls += 1
+            else:
+                self.deduplicated += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__flights[key]
+            flight.done.set()
@@ -0,0 +1,82 @@
+import json
+
+
+class JSONCodec:
+    """Encodes and decodes JSON with the standard library."""
+
+    name = "json"
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"), allow_nan=False).encode()
+
+    def loads(self, data):
+        # Bytes are decoded as UTF-8, there is no text decode step to do first
+        return json.loads(data)
+
+
+class OrjsonCodec:
+    """Encodes and decodes JSON with ``orjson``, several times faster than stdlib."""
+
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self.__orjson = orjson
+
+    def dumps(self, obj):
+        return self.__orjson.dumps(obj)
+
+    def loads(self, data):
+        # orjson.JSONDecodeError already is a json.JSONDecodeError
+        return self.__orjson.loads(data)
+
+
+class MsgspecCodec:
+    """Encodes and decodes JSON with ``msgspec``."""
+
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self.__error = msgspec.DecodeError
+        self.__encoder = msgspec.json.Encoder()
+        self.__decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj):
+        return self.__encoder.encode(obj)
+
+    def loads(self, data):
+        try:
+            return self.__decoder.decode(data)
+        except self.__error as e:
+            # Raise what callers of the other codecs expect
+            raise json.JSONDecodeError(str(e), "", 0) from e
+
+
+CODECS = {codec.name: codec for codec in (JSONCodec, OrjsonCodec, MsgspecCodec)}
+
+# Tried in order by get_codec("auto")
+FASTEST_FIRST = ("orjson", "msgspec", "json")
+
+
+def get_codec(codec=None):
+    """Return a codec from its name, or the fastest one installed for ``"auto"``.
+
+    ``None`` is the standard library codec, and codec instances, any object
+    with ``dumps()`` returning bytes and ``loads()`` accepting them, are
+    returned as they are.
+    """
+    if codec is None:
+        return JSONCodec()
+    if codec == "auto":
+        for name in FASTEST_FIRST:
+            try:
+                return CODECS[name]()
+            except ImportError:
+                continue
+    if isinstance(codec, str):
+        assert codec in CODECS, f"codec must be one of {sorted(CODECS)} or 'auto'"
+        return CODECS[codec]()
+    return codec
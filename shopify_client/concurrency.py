@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import threading
+import time
+
+from .exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Statuses telling a shop is overloaded, rather than the request being wrong
+OVERLOAD_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+
+def overloaded(statuses):
+    """Whether any attempt of a request, retries included, hit an overload status."""
+    return any(status in OVERLOAD_STATUSES for status in statuses)
+
+
+class AdaptiveLimiter:
+    """Caps the requests in flight to a shop, adapting the cap to how it copes.
+
+    Works like TCP congestion control (AIMD). Every healthy response raises
+    the limit by ``increase / limit``, about ``increase`` per round of
+    requests, up to ``maximum``. A 429, a 5xx or a latency spike, a response
+    slower than ``latency_tolerance`` times the smoothed latency, multiplies
+    the limit by ``decrease`` down to ``minimum``. Requests already in flight
+    when the limit was lowered don't lower it again, so one overload event
+    backs off once. ``acquire()`` blocks until a slot is free and returns a
+    token to hand to ``release()`` with the outcome of the request.
+
+    One limiter can be shared by every client talking to the same shop.
+    """
+
+    def __init__(
+        self,
+        initial=4,
+        minimum=1,
+        maximum=64,
+        increase=1.0,
+        decrease=0.5,
+        latency_tolerance=3.0,
+        warmup=10,
+        clock=time.monotonic,
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.warmup = warmup
+        self.clock = clock
+        self.in_flight = 0
+        self.latency = None
+        self.__limit = float(initial)
+        self.__samples = 0
+        self.__backed_off_at = None
+        self.__lock = threading.Lock()
+        self.__available = threading.Condition(self.__lock)
+
+    @property
+    def limit(self):
+        """How many requests may currently be in flight."""
+        return max(self.minimum, int(self.__limit))
+
+    def _try_acquire(self):
+        if self.in_flight < self.limit:
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        """Wait for a slot, returning the token to pass to ``release()``."""
+        with self.__available:
+            self.__available.wait_for(self._try_acquire)
+        return self.clock()
+
+    def release(self, token, statuses=(), failed=False):
+        """Free the slot of a request and adapt the limit to its outcome.
+
+        ``statuses`` are those of every attempt, retries included, and
+        ``failed`` tells the request never got a response.
+        """
+        with self.__available:
+            self._completed(token, overloaded(statuses) or failed)
+            self.__available.notify_all()
+
+    def cancel(self, token):
+        """Free the slot of a request that ended without an outcome, e.g. interrupted.
+
+        The limit is left as is, the shop having told nothing about its load.
+        """
+        with self.__available:
+            self.in_flight -= 1
+            self.__available.notify_all()
+
+    def _completed(self, token, overload):
+        # Must be called holding the lock
+        self.in_flight -= 1
+        now = self.clock()
+        latency = now - token
+
+        spike = (
+            self.__samples >= self.warmup
+            and latency > self.latency_tolerance * self.latency
+        )
+        if not overload:
+            # Smoothed over the last ~20 responses, spikes included so a lasting
+            # slowdown becomes the new normal instead of backing off forever
+            self.latency = (
+                latency
+                if self.latency is None
+                else 0.95 * self.latency + 0.05 * latency
+            )
+            self.__samples += 1
+
+        if overload or spike:
+            if self.__backed_off_at is None or token >= self.__backed_off_at:
+                self.__limit = max(float(self.minimum), self.__limit * self.decrease)
+                self.__backed_off_at = now
+                logger.debug(
+                    f"Backing off to {self.limit} requests in flight "
+                    f"({'overloaded' if overload else f'{latency:.2f}s latency'})"
+                )
+        else:
+            self.__limit = min(
+                float(self.maximum), self.__limit + self.increase / self.__limit
+            )
+
+
+class AsyncAdaptiveLimiter(AdaptiveLimiter):
+    """Asyncio counterpart of ``AdaptiveLimiter``, waiting without blocking the loop."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__available = None
+
+    def __condition(self):
+        # Created on first use so it belongs to the running loop
+        if self.__available is None:
+            self.__available = asyncio.Condition()
+        return self.__available
+
+    async def acquire(self):
+        available = self.__condition()
+        async with available:
+            await available.wait_for(self._try_acquire)
+        return self.clock()
+
+    async def release(self, token, statuses=(), failed=False):
+        available = self.__condition()
+        async with available:
+            self._completed(token, overloaded(statuses) or failed)
+            available.notify_all()
+
+    async def cancel(self, token):
+        available = self.__condition()
+        async with available:
+            self.in_flight -= 1
+            available.notify_all()
+
+
+class CircuitBreaker:
+    """Fails fast while a shop, or Shopify, keeps failing.
+
+    After ``failure_threshold`` failed requests in a row (no response, or a
+    5xx once retries are exhausted) the circuit opens and ``check()`` raises
+    ``CircuitOpenError`` without sending anything. After ``reset_timeout``
+    seconds a single trial request is let through: the circuit closes again
+    if it succeeds and stays open for another ``reset_timeout`` otherwise.
+
+    One breaker can be shared by every client talking to the same shop.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.__opened_at = None
+        self.__trial = False
+        self.__lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.__lock:
+            return self.__state(self.clock())
+
+    def __state(self, now):
+        if self.__opened_at is None:
+            return self.CLOSED
+        if now - self.__opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def check(self):
+        """Raise ``CircuitOpenError`` unless a request may be sent now."""
+        with self.__lock:
+            now = self.clock()
+            state = self.__state(now)
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self.__trial:
+                self.__trial = True
+                return
+            retry_in = max(0.0, self.__opened_at + self.reset_timeout - now)
+        raise CircuitOpenError(
+            f"Circuit open after {self.failures} failed requests, "
+            f"retry in {retry_in:.1f}s"
+        )
+
+    def cancel(self):
+        """Forget a request let through by ``check()`` that ended without an outcome.
+
+        Neither a success nor a failure is counted, and a trial request being
+        cancelled lets the next request be the trial.
+        """
+        with self.__lock:
+            self.__trial = False
+
+    def record(self, success):
+        """Record the outcome of a request let through by ``check()``."""
+        with self.__lock:
+            trial, self.__trial = self.__trial, False
+            if success:
+                self.failures = 0
+                self.__opened_at = None
+                return
+
+            self.failures += 1
+            if trial or self.failures >= self.failure_threshold:
+                if self.__opened_at is None or trial:
+                    logger.warning(
+                        f"Opening circuit after {self.failures} failed requests"
+                    )
+                self.__opened_at = self.clock()
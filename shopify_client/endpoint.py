@@ -1,21 +1,35 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlencode
 
+from .export import export as export_records
+from .models import projection
+from .partition import balance_windows, id_ranges, merge, time_windows
+from .prefetch import prefetch as prefetch_pages
+from .resume import FINISHED, checkpointed
+from .stream import CHUNK_SIZE, ArrayStream
+from .writes import write_many
+
 logger = logging.getLogger(__name__)
 
+# Keyword arguments of actions sent as request options, the others being filters
+REQUEST_OPTIONS = ("json", "data", "headers")
+
+
+class BaseEndpoint(object):
+    """What the blocking and the asyncio endpoints share: building URLs and
+    decoding records. Subclasses send the requests and provide ``_sub_endpoint``.
+    """
 
-class Endpoint(object):
     def __init__(self, client, endpoint, sub_endpoint=None, metafields=False):
         self.client = client
         self.endpoint = endpoint
         self.sub_endpoint = sub_endpoint
 
         if metafields:
-            self.metafields = Endpoint(
-                client=client, endpoint=self.endpoint, sub_endpoint="metafields"
-            )
+            self.metafields = self._sub_endpoint("metafields")
 
-    def __prepare_params(self, **params):
+    def _prepare_params(self, **params):
         flatted_params = []
         for key, value in params.items():
             if isinstance(value, dict):
@@ -29,9 +43,7 @@ class Endpoint(object):
 
         return flatted_params
 
-    def __build_url(
-        self, resource_id=None, sub_resource_id=None, action=None, **params
-    ):
+    def _build_url(self, resource_id=None, sub_resource_id=None, action=None, **params):
         url = self.endpoint
 
         if resource_id:
@@ -48,61 +60,312 @@ class Endpoint(object):
         if action:
             url = f"{url}/{action}"
 
-        flatted_params = self.__prepare_params(**params)
+        flatted_params = self._prepare_params(**params)
 
         return f"{url}.json{'?' + urlencode(flatted_params) if flatted_params else ''}"
 
-    def __paginate(self, url):
-        next_url = url
+    def _decoder(self, model, fields):
+        # Turns a listing page into the list of its records decoded as models
+        if model is None:
+            return None
+        key = self.sub_endpoint or self.endpoint
+        fields = projection(fields)
+        return lambda page: model.decode(page.get(key, []), fields)
+
+    @staticmethod
+    def _decode_record(page, model, fields):
+        # Unwraps the single record of a page like {"order": {...}} into a model
+        if model is None:
+            return page
+        return model.from_dict(next(iter(page.values())), projection(fields))
+
+    @staticmethod
+    def _request_options(params):
+        # Splits the request options of an action from its query string filters
+        options = {key: params.pop(key) for key in REQUEST_OPTIONS if key in params}
+        return options, params
+
+    def count(self, resource_id=None, **params):
+        return self.action("count", resource_id=resource_id, **params)
+
+
+class Endpoint(BaseEndpoint):
+    def _sub_endpoint(self, sub_endpoint):
+        return Endpoint(
+            client=self.client, endpoint=self.endpoint, sub_endpoint=sub_endpoint
+        )
+
+    def __pages(self, url, decode=None):
+        # Yields every page with the URL of the next one, FINISHED after the last
+        next_url = None if url == FINISHED else url
         while next_url:
             response = self.client.get(next_url)
-            yield self.client.parse_response(response)
+            page = self.client.parse_response(response)
             next_url = response.links.get("next", {}).get("url")
+            yield decode(page) if decode else page, next_url or FINISHED
+
+    def __paginate(self, url, decode=None):
+        for page, _ in self.__pages(url, decode):
+            yield page
+
+    def __paginate_until(self, url, max_id):
+        # Listings filtered by since_id come sorted by id, so stop at the range end
+        key = self.sub_endpoint or self.endpoint
+        pages = self.__paginate(url)
+        for page in pages:
+            records = page.get(key, [])
+            in_range = [record for record in records if record["id"] <= max_id]
+            if len(in_range) < len(records):
+                yield {**page, key: in_range}
+                pages.close()
+                return
+            yield page
+
+    def __time_partitions(self, partitions, balance, workers, **params):
+        windows = time_windows(
+            params.pop("created_at_min"), params.pop("created_at_max"), partitions
+        )
+        if balance:
+            windows = time_windows(windows[0][0], windows[-1][1], partitions * 4)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                counts = executor.map(
+                    lambda window: self.count(
+                        created_at_min=window[0].isoformat(),
+                        created_at_max=window[1].isoformat(),
+                        **params,
+                    )["count"],
+                    windows,
+                )
+                windows = balance_windows(windows, list(counts), partitions)
+
+        return [
+            self.__paginate(
+                self._build_url(
+                    created_at_min=window_start.isoformat(),
+                    created_at_max=window_end.isoformat(),
+                    **params,
+                )
+            )
+            for window_start, window_end in windows
+        ]
+
+    def __id_partitions(self, partitions, max_id, **params):
+        ranges = id_ranges(params.pop("since_id", 0), max_id, partitions)
+        return [
+            self.__paginate_until(self._build_url(since_id=since_id, **params), upper)
+            for since_id, upper in ranges
+        ]
 
     # Public methods
-    def get(self, resource_id, **params):
-        url = self.__build_url(resource_id=resource_id, **params)
-        return self.client.parse_response(self.client.get(url))
+    def get(self, resource_id, model=None, **params):
+        """Get a resource, decoded as a ``model`` from ``models`` if one is given.
+
+        With a model, ``fields`` selects the fields both Shopify returns and
+        the model holds.
+        """
+        url = self._build_url(resource_id=resource_id, **params)
+        page = self.client.parse_response(self.client.get(url))
+        return self._decode_record(page, model, params.get("fields"))
 
     def create(self, json: dict, **params):
-        url = self.__build_url(**params)
+        url = self._build_url(**params)
         return self.client.parse_response(self.client.post(url, json=json))
 
     def update(self, resource_id, json, **params):
-        url = self.__build_url(resource_id=resource_id, **params)
+        url = self._build_url(resource_id=resource_id, **params)
         return self.client.parse_response(self.client.put(url, json=json))
 
     def delete(self, resource_id, **params):
-        url = self.__build_url(resource_id=resource_id, **params)
+        url = self._build_url(resource_id=resource_id, **params)
         resp = self.client.delete(url)
         return resp.ok
 
-    def all(self, paginate=False, **params):
-        url = self.__build_url(**params)
-        if paginate:
-            return self.__paginate(url)
+    def create_many(
+        self,
+        payloads,
+        workers=4,
+        ordered=True,
+        on_error="stop",
+        progress=None,
+        **params,
+    ):
+        """Create a resource per payload concurrently, see ``write_many``.
+
+        Returns an iterator of ``WriteResult``; nothing is created until it is
+        iterated.
+        """
+        return write_many(
+            lambda json: self.create(json, **params),
+            payloads,
+            workers=workers,
+            ordered=ordered,
+            on_error=on_error,
+            progress=progress,
+        )
+
+    def update_many(
+        self, updates, workers=4, ordered=True, on_error="stop", progress=None, **params
+    ):
+        """Apply ``(resource_id, json)`` updates concurrently, see ``write_many``.
+
+        Returns an iterator of ``WriteResult``; nothing is updated until it is
+        iterated.
+        """
+        return write_many(
+            lambda update: self.update(*update, **params),
+            updates,
+            workers=workers,
+            ordered=ordered,
+            on_error=on_error,
+            progress=progress,
+        )
+
+    def delete_many(
+        self,
+        resource_ids,
+        workers=4,
+        ordered=True,
+        on_error="stop",
+        progress=None,
+        **params,
+    ):
+        """Delete resources concurrently, see ``write_many``.
+
+        Unlike ``delete()``, a failed deletion is reported as an error.
+        Returns an iterator of ``WriteResult``; nothing is deleted until it is
+        iterated.
+        """
+
+        def delete(resource_id):
+            url = self._build_url(resource_id=resource_id, **params)
+            self.client.delete(url).raise_for_status()
+            return True
+
+        return write_many(
+            delete,
+            resource_ids,
+            workers=workers,
+            ordered=ordered,
+            on_error=on_error,
+            progress=progress,
+        )
+
+    def all(
+        self,
+        paginate=False,
+        prefetch=0,
+        resume=None,
+        checkpoint=None,
+        model=None,
+        **params,
+    ):
+        """List resources, page by page with ``paginate``.
+
+        ``checkpoint`` is called with a resume token once each page is
+        processed; passing the last token as ``resume`` carries on from the
+        next page, e.g. after the process died, and yields no page once the
+        token is ``resume.FINISHED``. With a ``model`` from
+        ``models``, each page is the list of its records decoded as models,
+        holding only the ``fields`` asked for if any.
+        """
+        url = resume or self._build_url(**params)
+        decode = self._decoder(model, params.get("fields"))
+        if paginate and checkpoint is not None:
+            pages = self.__pages(url, decode)
+            if prefetch:
+                pages = prefetch_pages(pages, prefetch)
+            return checkpointed(pages, checkpoint)
+        elif paginate and prefetch:
+            return prefetch_pages(self.__paginate(url, decode), prefetch)
+        elif paginate:
+            return self.__paginate(url, decode)
+        else:
+            page = self.client.parse_response(self.client.get(url))
+            return decode(page) if decode else page
+
+    def partitioned(
+        self,
+        partitions,
+        by="created_at",
+        max_id=None,
+        ordered=False,
+        workers=None,
+        balance=False,
+        **params,
+    ):
+        """Paginate disjoint slices of a listing concurrently and merge their pages.
+
+        With ``by="created_at"`` the ``created_at_min``/``created_at_max`` range
+        is split into time windows, evenly or, with ``balance``, into windows of
+        similar size according to ``count()``. With ``by="id"`` the
+        ``(since_id, max_id]`` range is split into id ranges. Any other filter
+        applies to every slice. Requests go through the client, so they share
+        its rate limiter.
+        """
+        workers = workers or partitions
+        if by == "created_at":
+            assert (
+                "created_at_min" in params and "created_at_max" in params
+            ), "'created_at_min' and 'created_at_max' are required to partition by time"
+            pages = self.__time_partitions(partitions, balance, workers, **params)
+        elif by == "id":
+            assert max_id is not None, "'max_id' is required to partition by id"
+            pages = self.__id_partitions(partitions, max_id, **params)
         else:
-            return self.client.parse_response(self.client.get(url))
+            raise ValueError(f"Cannot partition by {by!r}")
 
-    def action(self, action, resource_id, method="GET", **params):
-        url = self.__build_url(resource_id=resource_id, action=action, **params)
-        return self.client.parse_response(self.client.request(method, url, **params))
+        return merge(pages, workers=workers, ordered=ordered)
 
-    def count(self, resource_id=None, **params):
-        return self.action("count", resource_id=resource_id, **params)
+    def iter_records(self, **params):
+        """Yield the records of a listing one by one, following pagination.
+
+        Each page is streamed and parsed incrementally, so only about one
+        record is held in memory instead of the whole page, and records come
+        already unwrapped from the top-level key (``orders``, ``products``...).
+        """
+        key = self.sub_endpoint or self.endpoint
+        next_url = self._build_url(**params)
+        while next_url:
+            with self.client.get(next_url, stream=True) as response:
+                response.raise_for_status()
+                yield from ArrayStream(
+                    response.iter_content(chunk_size=CHUNK_SIZE), paths=[(key,)]
+                )
+            next_url = response.links.get("next", {}).get("url")
+
+    def export(
+        self, columns, sink, format=None, batch_size=10_000, schema=None, **params
+    ):
+        """Write the records of a listing to CSV, Arrow IPC or Parquet.
+
+        Records are streamed with ``iter_records`` and written ``batch_size``
+        at a time, so the listing is never held whole. See ``export.export``
+        for ``columns``, ``sink``, ``format`` and ``schema``.
+        """
+        return export_records(
+            self.iter_records(**params),
+            columns,
+            sink,
+            format=format,
+            batch_size=batch_size,
+            schema=schema,
+        )
+
+    def action(self, action, resource_id, method="GET", **params):
+        options, params = self._request_options(params)
+        url = self._build_url(resource_id=resource_id, action=action, **params)
+        return self.client.parse_response(self.client.request(method, url, **options))
 
 
-class OrdersEndpoint(Endpoint):
+class OrdersMixin:
+    # Actions of the orders endpoints, blocking or asyncio depending on the
+    # endpoint class mixed in
     def __init__(self, client, endpoint):
         super().__init__(client, endpoint, metafields=True)
 
-        self.transactions = Endpoint(
-            client=client, endpoint=endpoint, sub_endpoint="transactions"
-        )
-        self.risks = Endpoint(client=client, endpoint=endpoint, sub_endpoint="risks")
-        self.refunds = Endpoint(
-            client=client, endpoint=endpoint, sub_endpoint="refunds"
-        )
+        self.transactions = self._sub_endpoint("transactions")
+        self.risks = self._sub_endpoint("risks")
+        self.refunds = self._sub_endpoint("refunds")
 
     def cancel(self, resource_id, **params):
         return self.action("cancel", resource_id=resource_id, method="POST", **params)
@@ -114,7 +377,11 @@ class OrdersEndpoint(Endpoint):
         return self.action("open", resource_id=resource_id, method="POST", **params)
 
 
-class DraftOrdersEndpoint(Endpoint):
+class OrdersEndpoint(OrdersMixin, Endpoint):
+    pass
+
+
+class DraftOrdersMixin:
     def complete(self, resource_id, **params):
         return self.action("complete", resource_id=resource_id, method="PUT", **params)
 
@@ -124,13 +391,19 @@ class DraftOrdersEndpoint(Endpoint):
         )
 
 
-class FulfillmentOrdersEndpoint(Endpoint):
+class DraftOrdersEndpoint(DraftOrdersMixin, Endpoint):
+    pass
+
+
+class FulfillmentOrdersMixin:
     def __init__(self, client, endpoint):
         super().__init__(client, endpoint, metafields=True)
 
-        self.fulfillment_request = Endpoint(
-            client=client, endpoint=endpoint, sub_endpoint="fulfillment_request"
-        )
+        self.fulfillment_request = self._sub_endpoint("fulfillment_request")
 
     def cancel(self, resource_id, **params):
         return self.action("cancel", resource_id=resource_id, method="POST", **params)
+
+
+class FulfillmentOrdersEndpoint(FulfillmentOrdersMixin, Endpoint):
+    pass
@@ -1,2 +1,22 @@
 class GraphQLError(Exception):
     pass
+
+
+class BulkOperationError(GraphQLError):
+    pass
+
+
+class BatchWriteError(Exception):
+    def __init__(self, failures):
+        super().__init__(
+            f"{len(failures)} writes failed, the first with {failures[0].error!r}"
+        )
+        self.failures = failures
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CassetteMissError(LookupError):
+    pass
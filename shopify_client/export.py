@@ -0,0 +1,182 @@
+import csv
+import json
+import os
+
+FORMATS = ("csv", "arrow", "parquet")
+
+# Format of an export written to a path with one of these suffixes
+SUFFIXES = {
+    ".csv": "csv",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+def parse_path(path):
+    """Steps of a dotted column path such as ``"line_items[].sku"``.
+
+    Each step is a key and whether it holds a list whose items the rest of the
+    path is read from: ``[("line_items", True), ("sku", False)]``.
+    """
+    steps = []
+    for key in path.split("."):
+        each = key.endswith("[]")
+        steps.append((key[:-2] if each else key, each))
+    return steps
+
+
+def extract(record, steps):
+    """Value at the path ``steps`` of a record, a list for paths through ``[]``.
+
+    Records are dicts or models; missing keys and attributes read as None,
+    and GraphQL connections (``nodes``/``edges``) as the list of their nodes.
+    """
+    value = record
+    for index, (key, each) in enumerate(steps):
+        if value is None:
+            return None
+        value = value.get(key) if isinstance(value, dict) else getattr(value, key, None)
+        if each and value is not None:
+            if isinstance(value, dict):
+                value = value.get("nodes") or [
+                    edge["node"] for edge in value.get("edges", [])
+                ]
+            rest = steps[index + 1 :]
+            return [extract(item, rest) for item in value]
+    return value
+
+
+def columns_from_spec(columns):
+    """(name, steps) of the columns of a list of paths or a dict of names to paths."""
+    if isinstance(columns, dict):
+        return [(name, parse_path(path)) for name, path in columns.items()]
+    return [(path, parse_path(path)) for path in columns]
+
+
+class CSVWriter:
+    """Writes rows to CSV, lists and objects as JSON text."""
+
+    def __init__(self, sink, names):
+        self.__file = None
+        if isinstance(sink, (str, os.PathLike)):
+            sink = self.__file = open(sink, "w", newline="", encoding="utf-8")
+        self.__writer = csv.writer(sink)
+        self.__writer.writerow(names)
+
+    def write(self, data):
+        for row in zip(*data.values()):
+            self.__writer.writerow(
+                [
+                    json.dumps(value) if isinstance(value, (list, dict)) else value
+                    for value in row
+                ]
+            )
+
+    def close(self):
+        if self.__file is not None:
+            self.__file.close()
+
+
+class ArrowWriter:
+    """Writes record batches to an Arrow IPC or a Parquet file.
+
+    Without a ``schema``, the types are inferred from the first batch, with
+    columns holding only nulls there typed as strings; every later batch is
+    converted to that schema.
+    """
+
+    def __init__(self, sink, format, schema=None):
+        import pyarrow
+
+        self.__pyarrow = pyarrow
+        self.__sink = sink
+        self.__format = format
+        self.__schema = schema
+        self.__writer = None
+
+    def write(self, data):
+        pa = self.__pyarrow
+        if self.__writer is None:
+            if self.__schema is None:
+                inferred = pa.RecordBatch.from_pydict(data).schema
+                self.__schema = pa.schema(
+                    [
+                        field.with_type(self.__fill_nulls(field.type))
+                        for field in inferred
+                    ]
+                )
+            self.__writer = self.__open(self.__schema)
+        self.__writer.write_batch(
+            pa.RecordBatch.from_pydict(data, schema=self.__schema)
+        )
+
+    def close(self):
+        if self.__writer is not None:
+            self.__writer.close()
+
+    def __open(self, schema):
+        if self.__format == "parquet":
+            import pyarrow.parquet
+
+            return pyarrow.parquet.ParquetWriter(self.__sink, schema)
+        import pyarrow.ipc
+
+        return pyarrow.ipc.new_file(self.__sink, schema)
+
+    def __fill_nulls(self, type):
+        pa = self.__pyarrow
+        if pa.types.is_null(type):
+            return pa.string()
+        if pa.types.is_list(type):
+            return pa.list_(self.__fill_nulls(type.value_type))
+        return type
+
+
+def export(records, columns, sink, format=None, batch_size=10_000, schema=None):
+    """Write ``records`` to ``sink`` as CSV, Arrow IPC or Parquet, batch by batch.
+
+    ``records`` is any iterable of dicts or models, e.g. ``iter_records()`` of
+    an endpoint or ``iter_nodes()`` of a GraphQL query, and ``columns`` the
+    paths to write, as a list or as a dict of column names to paths. Paths are
+    dotted, with ``[]`` after keys holding lists, e.g. ``"line_items[].sku"``
+    for the list of SKUs of an order. Only the column values of ``batch_size``
+    rows are held at a time, each batch written as one record batch (one row
+    group in Parquet). ``sink`` is a path, whose suffix gives the format
+    unless ``format`` (``"csv"``, ``"arrow"`` or ``"parquet"``) is given, or a
+    file object. Arrow and Parquet need ``pyarrow``, and take an optional
+    ``pyarrow.Schema``. Returns the number of rows written.
+    """
+    if format is None:
+        assert isinstance(
+            sink, (str, os.PathLike)
+        ), "format is required for file objects"
+        format = SUFFIXES.get(os.path.splitext(sink)[1].lower())
+    assert format in FORMATS, f"format must be one of {FORMATS}"
+
+    columns = columns_from_spec(columns)
+    names = [name for name, _ in columns]
+    if format == "csv":
+        writer = CSVWriter(sink, names)
+    else:
+        writer = ArrowWriter(sink, format, schema)
+
+    rows = 0
+    data = {name: [] for name in names}
+    try:
+        for record in records:
+            # Only the values of the columns are kept, not the records
+            for name, steps in columns:
+                data[name].append(extract(record, steps))
+            rows += 1
+            if rows % batch_size == 0:
+                writer.write(data)
+                data = {name: [] for name in names}
+        # The last batch, written even when empty for the header or schema
+        if rows % batch_size or not rows:
+            writer.write(data)
+    finally:
+        writer.close()
+    return rows
@@ -1,32 +1,139 @@
 import json
 import logging
-import os
+import time
 
 import requests
 
+from .batch import BatchQuery
+from .bulk import BulkQuery
 from .exceptions import GraphQLError
+from .export import export as export_records
+from .nested import NestedConnections
+from .prefetch import prefetch as prefetch_pages
+from .resume import FINISHED, checkpointed
+from .registry import QueryRegistry, connection_paths, validate_pagination
+from .stream import CHUNK_SIZE, ArrayStream
 
 logger = logging.getLogger(__name__)
 
+# How many times a query rejected as THROTTLED is resent when a cost limiter is set
+MAX_THROTTLED_RETRIES = 3
+
+
+class BaseGraphQL:
+    """What the blocking and the asyncio GraphQL entrypoints share: loading
+    queries, booking their cost and finding their connections.
+    """
+
+    def __init__(
+        self, client, graphql_queries_dir=None, cost_limiter=None, query_registry=None
+    ):
+        if query_registry is not None:
+            assert graphql_queries_dir in (
+                None,
+                query_registry.queries_dir,
+            ), "The query registry reads another queries directory"
+            graphql_queries_dir = query_registry.queries_dir
 
-class GraphQL:
-    def __init__(self, client, graphql_queries_dir=None):
         self.client = client
         self.endpoint = "graphql.json"
         self.graphql_queries_dir = graphql_queries_dir
+        self.cost_limiter = cost_limiter
+        # Last requested cost seen for each query, used to book points up front
+        self.query_costs = {}
+        self.__registry = query_registry
 
-    def __build_url(self, **params):
+    def _build_url(self, **params):
         return self.endpoint
 
+    @property
+    def registry(self):
+        assert self.graphql_queries_dir, "GraphQL queries directory is not set"
+
+        if self.__registry is None or (
+            self.__registry.queries_dir != self.graphql_queries_dir
+        ):
+            self.__registry = QueryRegistry(self.graphql_queries_dir)
+        return self.__registry
+
+    def query_from_name(self, name):
+        return self.registry.get(name).document
+
+    def _reserve_cost(self, query):
+        reserved = self.query_costs.get(query, 0)
+        return reserved, self.cost_limiter.reserve(reserved)
+
+    def _record_cost(self, query, parsed_response, reserved):
+        """Sync the cost limiter with a response, returning whether it was throttled."""
+        cost = parsed_response.get("extensions", {}).get("cost")
+        if cost:
+            self.query_costs[query] = cost["requestedQueryCost"]
+            self.cost_limiter.update(cost, reserved=reserved)
+        return any(
+            error.get("extensions", {}).get("code") == "THROTTLED"
+            for error in parsed_response.get("errors", [])
+        )
+
+    def _decoder(self, query, model, paginate):
+        # Turns a page into the nodes of the paginated connection decoded as models
+        if model is None:
+            return None
+        assert paginate, "Decoding into a model requires 'paginate'"
+        connection = self._outer_connection(query)
+        assert connection is not None, "Query must select a connection"
+
+        def decode(response):
+            nodes = response["data"]
+            for key in connection:
+                nodes = nodes[key]
+            return model.decode(nodes)
+
+        return decode
+
+    def _outer_connection(self, query):
+        # The shortest connection path is the one being paginated
+        paths = connection_paths(query)
+        return paths[0] if paths else None
+
+    def _page_info(self, response, connection):
+        # Looks the pageInfo up at the connection path, which is resolved once per
+        # query, falling back to a search for connections selected in fragments
+        page_info = response.get("data") if connection is not None else None
+        for key in connection or ():
+            page_info = page_info.get(key) if isinstance(page_info, dict) else None
+        if isinstance(page_info, dict) and "pageInfo" in page_info:
+            return page_info["pageInfo"]
+        return self.__find_page_info(response)
+
+    def __find_page_info(self, response):
+        # Recursively search for the pageInfo object in the response
+        result = response.get("pageInfo")
+        if result:
+            return result
+
+        for k, v in response.items():
+            if isinstance(v, dict):
+                result = self.__find_page_info(v)
+                if result:
+                    return result
+
+
+class GraphQL(BaseGraphQL):
     def __call__(self, *args, **kwargs):
         return self.__query(*args, **kwargs)
 
-    def query_from_name(self, name):
-        assert self.graphql_queries_dir, "GraphQL queries directory is not set"
+    def batch(self, **kwargs):
+        """Start a batch of queries sent together as merged requests."""
+        return BatchQuery(self, **kwargs)
 
-        query_path = os.path.join(self.graphql_queries_dir, f"{name}.graphql")
-        with open(query_path, "r") as f:
-            return f.read()
+    def bulk(self, query=None, query_name=None, **kwargs):
+        """Run a query as a bulk operation and yield its reassembled records."""
+        assert query or query_name, "Either 'query' or 'query_name' must be provided"
+
+        if query is None and query_name:
+            query = self.query_from_name(query_name)
+
+        return BulkQuery(self, **kwargs)(query)
 
     def __query(
         self,
@@ -36,33 +143,63 @@ class GraphQL:
         operation_name=None,
         paginate=False,
         page_size=100,
+        prefetch=0,
+        resume=None,
+        checkpoint=None,
+        complete_nested=False,
+        nested_page_size=100,
+        model=None,
     ):
         assert query or query_name, "Either 'query' or 'query_name' must be provided"
 
         if query is None and query_name:
             query = self.query_from_name(query_name)
+        decode = self._decoder(query, model, paginate)
+
+        nested = None
+        if complete_nested:
+            nested = NestedConnections(
+                self,
+                query,
+                variables,
+                root=self._outer_connection(query) if paginate else (),
+                page_size=nested_page_size,
+            )
 
+        if paginate and checkpoint is not None:
+            pages = self.__pages(
+                query=query,
+                variables=variables,
+                operation_name=operation_name,
+                page_size=page_size,
+                cursor=resume,
+                nested=nested,
+                decode=decode,
+            )
+            if prefetch:
+                pages = prefetch_pages(pages, prefetch)
+            return checkpointed(pages, checkpoint)
         if paginate:
-            return self.__paginate(
+            pages = self.__paginate(
                 query=query,
                 variables=variables,
                 operation_name=operation_name,
                 page_size=page_size,
+                cursor=resume,
+                nested=nested,
+                decode=decode,
             )
+            return prefetch_pages(pages, prefetch) if prefetch else pages
         try:
-            response = self.client.post(
-                self.__build_url(),
-                json={
-                    "query": query,
-                    "variables": variables,
-                    "operationName": operation_name,
-                },
+            parsed_response = self._send(
+                query=query, variables=variables, operation_name=operation_name
             )
-            parsed_response = self.client.parse_response(response)
             if "errors" in parsed_response:
                 logger.error(f"GraphQL errors: {parsed_response['errors']}")
                 if parsed_response.get("data", None) is None:
                     raise GraphQLError(f"GraphQL errors: {parsed_response['errors']}")
+            if nested is not None:
+                nested.complete(parsed_response)
             return parsed_response
         except requests.exceptions.HTTPError as e:
             logger.warning(f"Failed to execute GraphQL query: {repr(e)}")
@@ -71,42 +208,199 @@ class GraphQL:
             logger.warning(f"Failed to parse JSON response: {repr(e)}")
             raise e
 
-    def __paginate(self, query, variables=None, operation_name=None, page_size=100):
-        assert (
-            "pageInfo" in query
-        ), "Query must contain a 'pageInfo' object to be paginated"
-        assert (
-            "hasNextPage" in query[query.find("pageInfo") :]
-        ), "Query must contain a 'hasNextPage' field in 'pageInfo' object"
-        assert (
-            "endCursor" in query[query.find("pageInfo") :]
-        ), "Query must contain a 'endCursor' field in 'pageInfo' object"
+    def _send(self, query, variables=None, operation_name=None):
+        payload = {
+            "query": query,
+            "variables": variables,
+            "operationName": operation_name,
+        }
+        if self.cost_limiter is None:
+            response = self.client.post(self._build_url(), json=payload)
+            return self.client.parse_response(response)
+
+        for _ in range(MAX_THROTTLED_RETRIES + 1):
+            reserved, delay = self._reserve_cost(query)
+            if delay:
+                logger.debug(f"Throttling GraphQL query for {delay:.2f}s")
+                time.sleep(delay)
+
+            try:
+                response = self.client.post(self._build_url(), json=payload)
+                parsed_response = self.client.parse_response(response)
+            except BaseException:
+                self.cost_limiter.refund(reserved)
+                raise
+            if not self._record_cost(query, parsed_response, reserved):
+                break
+        return parsed_response
+
+    def __pages(
+        self,
+        query,
+        variables=None,
+        operation_name=None,
+        page_size=100,
+        cursor=None,
+        nested=None,
+        decode=None,
+    ):
+        # Yields every page with the cursor of the next one, FINISHED after the last
+        validate_pagination(query)
+        connection = self._outer_connection(query)
 
         variables = variables or {}
         variables["page_size"] = page_size
 
-        has_next_page = True
-        cursor = None
+        has_next_page = cursor != FINISHED
 
         while has_next_page:
             variables["cursor"] = cursor
             response = self.__query(
                 query=query, variables=variables, operation_name=operation_name
             )
-            page_info = self.__find_page_info(response)
+            page_info = self._page_info(response, connection)
             has_next_page = page_info.get("hasNextPage", False)
             cursor = page_info.get("endCursor", None)
+            if nested is not None:
+                nested.complete(response)
 
-            yield response
+            yield (
+                decode(response) if decode else response,
+                (cursor if has_next_page else FINISHED),
+            )
 
-    def __find_page_info(self, response):
-        # Recursively search for the pageInfo object in the response
-        result = response.get("pageInfo")
-        if result:
-            return result
+    def __paginate(
+        self,
+        query,
+        variables=None,
+        operation_name=None,
+        page_size=100,
+        cursor=None,
+        nested=None,
+        decode=None,
+    ):
+        for page, _ in self.__pages(
+            query,
+            variables,
+            operation_name,
+            page_size,
+            cursor=cursor,
+            nested=nested,
+            decode=decode,
+        ):
+            yield page
 
-        for k, v in response.items():
-            if isinstance(v, dict):
-                result = self.__find_page_info(v)
-                if result:
-                    return result
+    def iter_nodes(
+        self,
+        connection,
+        query=None,
+        query_name=None,
+        variables=None,
+        operation_name=None,
+        page_size=100,
+    ):
+        """Yield the nodes of a paginated connection one by one.
+
+        ``connection`` is the path of the connection under ``data``, dotted for
+        nested ones (``"products"``, ``"customer.orders"``). Each page is
+        streamed and parsed incrementally, so only about one node is held in
+        memory instead of the whole page. Both ``nodes`` and ``edges`` are
+        supported; edges are unwrapped to their node.
+        """
+        assert query or query_name, "Either 'query' or 'query_name' must be provided"
+
+        if query is None and query_name:
+            query = self.query_from_name(query_name)
+        validate_pagination(query)
+
+        path = ["data", *connection.split(".")]
+        variables = variables or {}
+        variables["page_size"] = page_size
+
+        has_next_page = True
+        cursor = None
+
+        while has_next_page:
+            variables["cursor"] = cursor
+            page = yield from self.__stream_nodes(
+                query, variables, operation_name, path
+            )
+
+            if "errors" in page:
+                logger.error(f"GraphQL errors: {page['errors']}")
+                if page.get("data", None) is None:
+                    raise GraphQLError(f"GraphQL errors: {page['errors']}")
+
+            page_info = page["data"]
+            for key in path[1:]:
+                page_info = page_info[key]
+            has_next_page = page_info["pageInfo"].get("hasNextPage", False)
+            cursor = page_info["pageInfo"].get("endCursor", None)
+
+    def export(
+        self,
+        connection,
+        columns,
+        sink,
+        query=None,
+        query_name=None,
+        variables=None,
+        operation_name=None,
+        page_size=100,
+        **options,
+    ):
+        """Write the nodes of a paginated connection to CSV, Arrow IPC or Parquet.
+
+        Nodes are streamed with ``iter_nodes`` and written in batches, so the
+        connection is never held whole. ``options`` (``format``,
+        ``batch_size``, ``schema``) are passed to ``export.export``.
+        """
+        nodes = self.iter_nodes(
+            connection,
+            query=query,
+            query_name=query_name,
+            variables=variables,
+            operation_name=operation_name,
+            page_size=page_size,
+        )
+        return export_records(nodes, columns, sink, **options)
+
+    def __stream_nodes(self, query, variables, operation_name, path):
+        # Yields the nodes of one page and returns the rest of the page
+        payload = {
+            "query": query,
+            "variables": variables,
+            "operationName": operation_name,
+        }
+        for _ in range(MAX_THROTTLED_RETRIES + 1):
+            if self.cost_limiter is not None:
+                reserved, delay = self._reserve_cost(query)
+                if delay:
+                    logger.debug(f"Throttling GraphQL query for {delay:.2f}s")
+                    time.sleep(delay)
+
+            try:
+                with self.client.post(
+                    self._build_url(), json=payload, stream=True
+                ) as response:
+                    response.raise_for_status()
+                    nodes = ArrayStream(
+                        response.iter_content(chunk_size=CHUNK_SIZE),
+                        paths=[path + ["nodes"], path + ["edges"]],
+                    )
+                    for node in nodes:
+                        yield (
+                            node["node"] if nodes.matched_path[-1] == "edges" else node
+                        )
+            except Exception:
+                # Not GeneratorExit: a page dropped halfway was still spent
+                if self.cost_limiter is not None:
+                    self.cost_limiter.refund(reserved)
+                raise
+
+            page = nodes.rest
+            if self.cost_limiter is None or not self._record_cost(
+                query, page, reserved
+            ):
+                break
+        return page
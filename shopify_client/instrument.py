@@ -0,0 +1,283 @@
+import json
+import logging
+import math
+import re
+import threading
+from collections import Counter
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Numeric path segments, replaced so requests group by endpoint and not by id
+_ID_SEGMENT = re.compile(r"/\d+(?=/|\.json|$)")
+
+# Histogram buckets start at 0.1ms and grow by 10%, so percentiles are
+# accurate to about 5% whatever the number of samples
+_HISTOGRAM_MIN = 1e-4
+_HISTOGRAM_GROWTH = 1.1
+
+
+def endpoint_name(url):
+    """Path of a request with ids replaced, e.g. ``orders/:id/refunds``."""
+    path = urlparse(url).path
+    if "/admin/api/" in path:
+        # Drop the API version that follows the prefix
+        path = path.split("/admin/api/", 1)[1].split("/", 1)[-1]
+    path = _ID_SEGMENT.sub("/:id", "/" + path.lstrip("/"))
+    return path.lstrip("/").removesuffix(".json")
+
+
+def graphql_cost(content):
+    """The ``extensions.cost`` block of a GraphQL response body, or ``None``.
+
+    Shopify writes ``extensions`` last, so the block is found from the end of
+    the body instead of parsing the whole response again.
+    """
+    start = content.rfind(b'"cost"')
+    if start == -1:
+        return None
+    start = content.find(b"{", start)
+    try:
+        cost, _ = json.JSONDecoder().raw_decode(content[start:].decode())
+    except ValueError:
+        return None
+    return cost if isinstance(cost, dict) and "requestedQueryCost" in cost else None
+
+
+def retry_reason(history):
+    """Why an attempt was retried, from a urllib3 ``RequestHistory`` entry."""
+    if history.status:
+        return f"status {history.status}"
+    return type(history.error).__name__
+
+
+class RequestEvent:
+    """What happened during one request, or one retried attempt of it.
+
+    ``kind`` is ``"request"`` once per request, as the caller sees it, and
+    ``"retry"`` for every attempt that was retried before it. Timings are in
+    seconds, ``None`` when they are unknown: ``connect_time`` (DNS and TCP)
+    and ``tls_time`` are only measured by the asyncio client, ``ttfb`` runs
+    from sending the request to receiving the response headers and
+    ``total_time`` until the body was read, both including retries.
+    """
+
+    __slots__ = (
+        "kind",
+        "method",
+        "url",
+        "endpoint",
+        "status",
+        "retries",
+        "retry_reason",
+        "error",
+        "connect_time",
+        "tls_time",
+        "ttfb",
+        "total_time",
+        "request_bytes",
+        "response_bytes",
+        "call_limit",
+        "graphql_cost",
+        "throttle_delay",
+    )
+
+    def __init__(
+        self,
+        kind,
+        method,
+        url,
+        status=None,
+        retries=0,
+        retry_reason=None,
+        error=None,
+        connect_time=None,
+        tls_time=None,
+        ttfb=None,
+        total_time=None,
+        request_bytes=0,
+        response_bytes=None,
+        call_limit=None,
+        graphql_cost=None,
+        throttle_delay=0.0,
+    ):
+        self.kind = kind
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint_name(url)
+        self.status = status
+        self.retries = retries
+        self.retry_reason = retry_reason
+        self.error = error
+        self.connect_time = connect_time
+        self.tls_time = tls_time
+        self.ttfb = ttfb
+        self.total_time = total_time
+        self.request_bytes = request_bytes
+        self.response_bytes = response_bytes
+        self.call_limit = call_limit
+        self.graphql_cost = graphql_cost
+        self.throttle_delay = throttle_delay
+
+    def __repr__(self):
+        return (
+            f"<RequestEvent {self.kind} {self.method} {self.endpoint}: {self.status}>"
+        )
+
+
+def notify(observers, event):
+    """Hand an event to every observer. A failing observer never fails the request."""
+    for observer in observers:
+        try:
+            observer(event)
+        except Exception:
+            logger.exception(f"Instrumentation observer {observer!r} failed")
+
+
+def retry_events(method, url, history):
+    """Events for the retried attempts of a request, from its urllib3 retry history."""
+    return [
+        RequestEvent(
+            "retry",
+            method,
+            url,
+            status=entry.status,
+            retries=attempt,
+            retry_reason=retry_reason(entry),
+        )
+        for attempt, entry in enumerate(history)
+    ]
+
+
+class Histogram:
+    """Log-bucketed histogram of durations with bounded memory."""
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        if value <= _HISTOGRAM_MIN:
+            index = 0
+        else:
+            index = math.ceil(
+                math.log(value / _HISTOGRAM_MIN) / math.log(_HISTOGRAM_GROWTH)
+            )
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        if not self.count:
+            return None
+
+        rank = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                # Upper bound of the bucket, never above what was observed
+                return min(_HISTOGRAM_MIN * _HISTOGRAM_GROWTH**index, self.max)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+
+class EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.retry_reasons = Counter()
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.throttle_delay = 0.0
+        self.graphql_cost = 0
+        self.min_headroom = None
+        self.latency = Histogram()
+        self.ttfb = Histogram()
+
+    def add(self, event):
+        if event.kind == "retry":
+            self.retry_reasons[event.retry_reason] += 1
+            return
+
+        self.count += 1
+        if event.status is None or event.status >= 400:
+            self.errors += 1
+        self.retries += event.retries
+        self.request_bytes += event.request_bytes
+        self.response_bytes += event.response_bytes or 0
+        self.throttle_delay += event.throttle_delay
+        if event.total_time is not None:
+            self.latency.add(event.total_time)
+        if event.ttfb is not None:
+            self.ttfb.add(event.ttfb)
+        if event.graphql_cost:
+            self.graphql_cost += event.graphql_cost.get("actualQueryCost") or 0
+        if event.call_limit:
+            used, size = (int(value) for value in event.call_limit.split("/"))
+            if self.min_headroom is None or size - used < self.min_headroom:
+                self.min_headroom = size - used
+
+
+class RequestStats:
+    """In-memory aggregate of request events, per method and endpoint.
+
+    Register it as an observer of a client, then ``summary()`` lists every
+    endpoint with its request, error and retry counts, bytes, time spent
+    throttled, lowest REST call-limit headroom, GraphQL cost and latency
+    percentiles, slowest first.
+    """
+
+    def __init__(self, percentiles=(50, 95, 99)):
+        self.percentiles = percentiles
+        self.__endpoints = {}
+        self.__lock = threading.Lock()
+
+    def __call__(self, event):
+        key = (event.method, event.endpoint)
+        with self.__lock:
+            stats = self.__endpoints.get(key)
+            if stats is None:
+                stats = self.__endpoints[key] = EndpointStats()
+            stats.add(event)
+
+    def __getitem__(self, key):
+        return self.__endpoints[key]
+
+    def summary(self):
+        with self.__lock:
+            rows = [
+                {
+                    "method": method,
+                    "endpoint": endpoint,
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "retry_reasons": dict(stats.retry_reasons),
+                    "request_bytes": stats.request_bytes,
+                    "response_bytes": stats.response_bytes,
+                    "throttle_delay": stats.throttle_delay,
+                    "min_headroom": stats.min_headroom,
+                    "graphql_cost": stats.graphql_cost,
+                    "mean": stats.latency.mean,
+                    **{
+                        f"p{percent}": stats.latency.percentile(percent)
+                        for percent in self.percentiles
+                    },
+                    "ttfb_p50": stats.ttfb.percentile(50),
+                }
+                for (method, endpoint), stats in self.__endpoints.items()
+            ]
+
+        slowest = f"p{max(self.percentiles)}"
+        return sorted(rows, key=lambda row: row[slowest] or 0, reverse=True)
+
+    def reset(self):
+        with self.__lock:
+            self.__endpoints.clear()
@@ -0,0 +1,241 @@
+import json
+import sqlite3
+import threading
+from datetime import timezone
+
+from .export import extract, parse_path
+from .partition import parse_datetime
+from .sync import IncrementalSync, SQLiteCheckpointStore
+
+# Indexed key columns of every mirrored table, as paths into its records
+TABLES = {
+    "orders": {"name": "name", "email": "email", "customer_id": "customer.id"},
+    "customers": {"email": "email", "phone": "phone"},
+    "products": {"handle": "handle"},
+    "variants": {"product_id": "product_id", "sku": "sku", "barcode": "barcode"},
+}
+
+# Records nested in those of a table: (field, table they are kept in, parent column)
+NESTED = {"products": ("variants", "variants", "product_id")}
+
+# Webhook actions whose payload is the whole record, by resource. Others, like
+# orders/edited or customers/marketing_consent_update, carry only a part of it.
+FULL_RECORD_ACTIONS = {
+    "orders": frozenset(
+        [
+            "create",
+            "updated",
+            "paid",
+            "cancelled",
+            "fulfilled",
+            "partially_fulfilled",
+        ]
+    ),
+    "customers": frozenset(["create", "update"]),
+    "products": frozenset(["create", "update"]),
+}
+
+
+def utc(timestamp):
+    # Timestamps come with the shop's offset; in UTC they compare as strings
+    if timestamp is None:
+        return None
+    return parse_datetime(timestamp).astimezone(timezone.utc).isoformat()
+
+
+class Mirror:
+    """Local copy of shop resources in a SQLite database, for lookups without the API.
+
+    Orders, customers and products (with their variants in a table of their
+    own) are kept as their raw JSON next to a few indexed key columns, see
+    ``TABLES``. ``sync()`` pulls what was created or updated since the last
+    sync from the endpoints of ``client``, with an ``IncrementalSync`` whose
+    checkpoints live in the same database, and ``apply_webhook()`` applies
+    webhook payloads, deletions included. A record is never replaced by an
+    older version of itself, or one without ``updated_at``, so syncs and
+    webhooks can arrive in any order.
+
+    ``path`` is the database file. Every thread keeps its own connection to
+    it open, so a lookup is a single indexed query.
+    """
+
+    def __init__(self, path, client=None):
+        self.path = path
+        self.client = client
+        self.store = SQLiteCheckpointStore(path)
+        self.__local = threading.local()
+        self.__columns = {
+            table: [(column, parse_path(path)) for column, path in keys.items()]
+            for table, keys in TABLES.items()
+        }
+
+        connection = self.__connection()
+        # Readers are not blocked while a sync writes
+        connection.execute("PRAGMA journal_mode=WAL")
+        with connection:
+            for table, columns in self.__columns.items():
+                keys = "".join(f", {column}" for column, _ in columns)
+                connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {table} "
+                    f"(id INTEGER PRIMARY KEY, updated_at TEXT{keys}, data TEXT NOT NULL)"
+                )
+                for column, _ in columns:
+                    connection.execute(
+                        f"CREATE INDEX IF NOT EXISTS {table}_{column} "
+                        f"ON {table} ({column})"
+                    )
+
+    def __connection(self):
+        # Kept open per thread, so lookups do not pay for connecting
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            connection = self.__local.connection = sqlite3.connect(self.path)
+        return connection
+
+    def close(self):
+        """Close the connection of the calling thread."""
+        connection = getattr(self.__local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.__local.connection = None
+
+    def __upsert(self, connection, table, record, updated_at=None):
+        # Returns whether the record was stored, i.e. was not older than the stored
+        # one. Nested records without an updated_at are as recent as their parent.
+        names = ["id", "updated_at", *(column for column, _ in self.__columns[table])]
+        names.append("data")
+        values = (
+            record["id"],
+            utc(record.get("updated_at", updated_at)),
+            *(extract(record, steps) for _, steps in self.__columns[table]),
+            json.dumps(record),
+        )
+        cursor = connection.execute(
+            f"INSERT INTO {table} ({', '.join(names)}) "
+            f"VALUES ({', '.join('?' * len(names))}) "
+            f"ON CONFLICT (id) DO UPDATE SET "
+            f"{', '.join(f'{name} = excluded.{name}' for name in names[1:])} "
+            # A record of unknown version never replaces a stored one
+            f"WHERE excluded.updated_at IS NOT NULL AND ({table}.updated_at IS NULL "
+            f"OR excluded.updated_at >= {table}.updated_at)",
+            values,
+        )
+        if not cursor.rowcount:
+            return False
+
+        if table in NESTED:
+            field, nested, parent = NESTED[table]
+            children = record.get(field) or []
+            for child in children:
+                self.__upsert(
+                    connection,
+                    nested,
+                    {parent: record["id"], **child},
+                    updated_at=record.get("updated_at"),
+                )
+            # Children no longer listed on their parent were deleted
+            ids = [child["id"] for child in children]
+            connection.execute(
+                f"DELETE FROM {nested} WHERE {parent} = ? "
+                f"AND id NOT IN ({', '.join('?' * len(ids))})",
+                (record["id"], *ids),
+            )
+        return True
+
+    def __delete(self, connection, table, resource_id):
+        connection.execute(f"DELETE FROM {table} WHERE id = ?", (resource_id,))
+        if table in NESTED:
+            _, nested, parent = NESTED[table]
+            connection.execute(
+                f"DELETE FROM {nested} WHERE {parent} = ?", (resource_id,)
+            )
+
+    def upsert(self, resource, records):
+        """Store ``records`` of a resource, keeping newer versions already stored."""
+        assert resource in TABLES, f"resource must be one of {sorted(TABLES)}"
+        connection = self.__connection()
+        with connection:
+            return sum(
+                self.__upsert(connection, resource, record) for record in records
+            )
+
+    def sync(self, resource, overlap=300, **params):
+        """Pull the records of a resource created or updated since the last sync.
+
+        The first sync lists every record. ``params`` filter the listing, e.g.
+        ``status="any"`` for orders, and each filter set has its own
+        checkpoint. Deletions are not listed by Shopify, apply the ``delete``
+        webhooks for those. Returns the number of records stored.
+        """
+        assert resource in TABLES, f"resource must be one of {sorted(TABLES)}"
+        assert all(
+            resource != nested for _, nested, _ in NESTED.values()
+        ), f"{resource} are synced with their parent"
+        endpoint = getattr(self.client, resource)
+        sync = IncrementalSync(
+            endpoint,
+            self.store,
+            key=f"mirror:{IncrementalSync.default_key(endpoint, params)}",
+            overlap=overlap,
+            **params,
+        )
+        stored = 0
+        for batch in sync:
+            stored += self.upsert(resource, batch.records)
+            batch.ack()
+        return stored
+
+    def apply_webhook(self, topic, payload):
+        """Apply a webhook, e.g. ``"orders/updated"``, and return whether it was.
+
+        ``*/delete`` topics remove the record, the topics of
+        ``FULL_RECORD_ACTIONS`` store their payload unless a newer version is
+        stored, and other topics are ignored.
+        """
+        resource, _, action = topic.partition("/")
+        if resource not in FULL_RECORD_ACTIONS:
+            return False
+        if action == "delete":
+            connection = self.__connection()
+            with connection:
+                self.__delete(connection, resource, payload["id"])
+            return True
+        if action not in FULL_RECORD_ACTIONS[resource]:
+            return False
+        return bool(self.upsert(resource, [payload]))
+
+    def get(self, resource, resource_id, model=None):
+        """The stored record of a resource by id, or None."""
+        records = self.__select(resource, "id = ?", (resource_id,), model)
+        return records[0] if records else None
+
+    def find(self, resource, model=None, **keys):
+        """Stored records of a resource matching every key column, e.g. ``sku="A"``.
+
+        Records are dicts, or decoded as ``model`` from ``models``.
+        """
+        columns = TABLES.get(resource, ())
+        assert keys and all(
+            key in columns for key in keys
+        ), f"{resource} can be found by {sorted(columns)}"
+        where = " AND ".join(f"{key} = ?" for key in keys)
+        return self.__select(resource, where, tuple(keys.values()), model)
+
+    def __select(self, resource, where, values, model):
+        assert resource in TABLES, f"resource must be one of {sorted(TABLES)}"
+        rows = self.__connection().execute(
+            f"SELECT data FROM {resource} WHERE {where}", values
+        )
+        records = [json.loads(data) for (data,) in rows]
+        if model is not None:
+            return [model.from_dict(record) for record in records]
+        return records
+
+    def variant_by_sku(self, sku, model=None):
+        return next(iter(self.find("variants", model, sku=sku)), None)
+
+    def customer_by_email(self, email, model=None):
+        return next(iter(self.find("customers", model, email=email)), None)
+
+    def order_by_name(self, name, model=None):
+        return next(iter(self.find("orders", model, name=name)), None)
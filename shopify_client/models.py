@@ -0,0 +1,280 @@
+import re
+import sys
+
+_CAMEL_BOUNDARY = re.compile(r"_([a-z0-9])")
+
+
+def camel_case(name):
+    """GraphQL name of a REST field, e.g. ``created_at`` -> ``createdAt``."""
+    return _CAMEL_BOUNDARY.sub(lambda match: match.group(1).upper(), name)
+
+
+def projection(fields):
+    """Field names from ``"id,name"`` or ``["id", "name"]``, None for all fields."""
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    return frozenset(field.strip() for field in fields)
+
+
+class Model:
+    """Compact record decoded from a REST or GraphQL response.
+
+    Subclasses list their fields in ``__slots__``, so a record holds one
+    pointer per field instead of a whole dict, declare in ``nested`` the model
+    of fields holding other records and in ``interned`` the fields with a
+    handful of distinct values, like statuses and currencies, whose strings
+    are shared by every record instead of held once per record. Fields such as
+    titles, SKUs or prices are not interned: interned strings are kept for the
+    life of the process, however many distinct values come by. Fields are read
+    under their REST name or its GraphQL camel case, connections
+    (``nodes``/``edges``) are unwrapped to lists, unknown fields are dropped
+    and missing ones are None. With ``fields`` only those are decoded, the
+    others are None.
+    """
+
+    __slots__ = ()
+    nested = {}
+    interned = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # (field, GraphQL name, nested model, interned) of every field, worked out once
+        cls._fields = tuple(
+            (name, camel_case(name), cls.nested.get(name), name in cls.interned)
+            for klass in reversed(cls.__mro__)
+            for name in vars(klass).get("__slots__", ())
+        )
+
+    @classmethod
+    def from_dict(cls, data, fields=None):
+        record = cls.__new__(cls)
+        for name, graphql_name, model, interned in cls._fields:
+            if fields is not None and name not in fields:
+                value = None
+            else:
+                value = data.get(name)
+                if value is None:
+                    value = data.get(graphql_name)
+                if model is not None and value is not None:
+                    value = model.decode(value)
+                elif interned and type(value) is str:
+                    value = sys.intern(value)
+            setattr(record, name, value)
+        return record
+
+    @classmethod
+    def decode(cls, value, fields=None):
+        """Decode a record, a list of records or a connection of records."""
+        if isinstance(value, list):
+            return [cls.from_dict(item, fields) for item in value]
+        if "nodes" in value:
+            return [cls.from_dict(node, fields) for node in value["nodes"]]
+        if "edges" in value:
+            return [cls.from_dict(edge["node"], fields) for edge in value["edges"]]
+        return cls.from_dict(value, fields)
+
+    def as_dict(self):
+        result = {}
+        for name, _, model, _ in self._fields:
+            value = getattr(self, name)
+            if model is not None and isinstance(value, list):
+                value = [item.as_dict() for item in value]
+            elif model is not None and value is not None:
+                value = value.as_dict()
+            result[name] = value
+        return result
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name)
+            for name, _, _, _ in self._fields
+        )
+
+    def __hash__(self):
+        # Equal records have the same id, so hashing it is consistent with __eq__
+        return hash((type(self), getattr(self, "id", None)))
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {getattr(self, 'id', None)}>"
+
+
+class LineItem(Model):
+    __slots__ = (
+        "id",
+        "admin_graphql_api_id",
+        "product_id",
+        "variant_id",
+        "title",
+        "variant_title",
+        "name",
+        "sku",
+        "vendor",
+        "quantity",
+        "current_quantity",
+        "fulfillable_quantity",
+        "fulfillment_status",
+        "price",
+        "total_discount",
+        "grams",
+        "requires_shipping",
+        "taxable",
+        "gift_card",
+        "properties",
+        "tax_lines",
+    )
+    interned = frozenset(["fulfillment_status"])
+
+
+class Customer(Model):
+    __slots__ = (
+        "id",
+        "admin_graphql_api_id",
+        "email",
+        "phone",
+        "first_name",
+        "last_name",
+        "state",
+        "tags",
+        "note",
+        "verified_email",
+        "tax_exempt",
+        "currency",
+        "orders_count",
+        "total_spent",
+        "last_order_id",
+        "default_address",
+        "created_at",
+        "updated_at",
+    )
+    interned = frozenset(["state", "currency"])
+
+
+class Order(Model):
+    __slots__ = (
+        "id",
+        "admin_graphql_api_id",
+        "name",
+        "order_number",
+        "email",
+        "phone",
+        "customer",
+        "currency",
+        "financial_status",
+        "fulfillment_status",
+        "cancel_reason",
+        "total_price",
+        "subtotal_price",
+        "total_tax",
+        "total_discounts",
+        "total_weight",
+        "taxes_included",
+        "tags",
+        "note",
+        "source_name",
+        "line_items",
+        "shipping_address",
+        "billing_address",
+        "shipping_lines",
+        "discount_codes",
+        "created_at",
+        "updated_at",
+        "processed_at",
+        "closed_at",
+        "cancelled_at",
+    )
+    interned = frozenset(
+        [
+            "currency",
+            "financial_status",
+            "fulfillment_status",
+            "cancel_reason",
+            "source_name",
+        ]
+    )
+    nested = {"customer": Customer, "line_items": LineItem}
+
+
+class Variant(Model):
+    __slots__ = (
+        "id",
+        "admin_graphql_api_id",
+        "product_id",
+        "title",
+        "sku",
+        "barcode",
+        "price",
+        "compare_at_price",
+        "position",
+        "option1",
+        "option2",
+        "option3",
+        "inventory_item_id",
+        "inventory_quantity",
+        "inventory_policy",
+        "inventory_management",
+        "fulfillment_service",
+        "weight",
+        "weight_unit",
+        "grams",
+        "requires_shipping",
+        "taxable",
+        "image_id",
+        "created_at",
+        "updated_at",
+    )
+    interned = frozenset(
+        [
+            "inventory_policy",
+            "inventory_management",
+            "fulfillment_service",
+            "weight_unit",
+        ]
+    )
+
+
+class Product(Model):
+    __slots__ = (
+        "id",
+        "admin_graphql_api_id",
+        "title",
+        "handle",
+        "body_html",
+        "vendor",
+        "product_type",
+        "status",
+        "tags",
+        "template_suffix",
+        "published_scope",
+        "variants",
+        "options",
+        "images",
+        "image",
+        "created_at",
+        "updated_at",
+        "published_at",
+    )
+    interned = frozenset(["product_type", "status", "published_scope"])
+    nested = {"variants": Variant}
+
+
+class InventoryLevel(Model):
+    __slots__ = (
+        "inventory_item_id",
+        "location_id",
+        "available",
+        "admin_graphql_api_id",
+        "updated_at",
+    )
+
+    def __hash__(self):
+        return hash((type(self), self.inventory_item_id, self.location_id))
+
+    def __repr__(self):
+        return (
+            f"<InventoryLevel {self.inventory_item_id}@{self.location_id}: "
+            f"{self.available}>"
+        )
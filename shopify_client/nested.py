@@ -0,0 +1,305 @@
+import logging
+import re
+from functools import lru_cache
+
+from .batch import BatchQuery
+from .registry import _OPERATION_TYPES, _TOKENS, connection_paths
+
+logger = logging.getLogger(__name__)
+
+_VARIABLE = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)")
+_VARIABLE_DEFINITION = re.compile(r"\$([A-Za-z_][A-Za-z0-9_]*)\s*:")
+_SPREAD = re.compile(r"\.\.\.\s*(?!on\b)([A-Za-z_][A-Za-z0-9_]*)")
+_PAGINATION_ARGUMENT = re.compile(
+    r'\b(?:first|after)\s*:\s*(?:"(?:\\.|[^"\\])*"|\$?[A-Za-z0-9_]+)\s*,?\s*'
+)
+_GLOBAL_ID = re.compile(r"^gid://shopify/([A-Za-z0-9_]+)/")
+
+
+class Connection:
+    """A connection of a query, extracted so it can be queried on its own."""
+
+    __slots__ = (
+        "path",
+        "field",
+        "arguments",
+        "selections",
+        "variable_definitions",
+        "fragments",
+    )
+
+    def __init__(
+        self, path, field, arguments, selections, variable_definitions, fragments
+    ):
+        self.path = path
+        self.field = field
+        self.arguments = arguments
+        self.selections = selections
+        self.variable_definitions = variable_definitions
+        self.fragments = fragments
+
+    def query(self, type_name):
+        """Return a query for the next page of this connection on a ``type_name`` node."""
+        variable_definitions = ", ".join(
+            [
+                "$nested_id: ID!",
+                "$nested_page_size: Int!",
+                "$nested_cursor: String",
+                *self.variable_definitions.values(),
+            ]
+        )
+        arguments = ", ".join(
+            argument
+            for argument in (
+                self.arguments,
+                "first: $nested_page_size",
+                "after: $nested_cursor",
+            )
+            if argument
+        )
+        return "\n".join(
+            [
+                f"query nestedConnection({variable_definitions}) {{",
+                "  node(id: $nested_id) {",
+                f"    ... on {type_name} {{",
+                f"      connection: {self.field}({arguments}) {{{self.selections}}}",
+                "    }",
+                "  }",
+                "}",
+                *self.fragments,
+            ]
+        )
+
+
+def split_variable_definitions(definitions):
+    """Map the variable names of an operation to their definitions."""
+    starts = list(_VARIABLE_DEFINITION.finditer(definitions))
+    return {
+        match.group(1): definitions[match.start() : end].strip().rstrip(",").strip()
+        for match, end in zip(
+            starts, [match.start() for match in starts[1:]] + [len(definitions)]
+        )
+    }
+
+
+@lru_cache(maxsize=256)
+def parse_connection(document, path):
+    """Extract the connection at ``path``, its response keys, from a document.
+
+    The connection must be selected directly in the operation, not through a
+    fragment. Its ``first`` and ``after`` arguments are left out, to be
+    replaced by the page size and cursor of the follow-up queries, and only
+    the variables and fragments it uses are kept.
+    """
+    tokens = [match for match in _TOKENS.finditer(document) if match.group()[0] != "#"]
+    stack = []  # response key of every open selection, None for definitions
+    pending = field = arguments = None
+    kind = None  # type of the current top-level definition
+    definition_start = fragment_name = None
+    operation_variables = ""
+    fragments = {}
+    found = None  # (field, arguments, selections start, depth) of the connection
+    selections = None
+    after_field = skip_name = False
+    previous = None
+
+    index = 0
+    while index < len(tokens):
+        match = tokens[index]
+        token = match.group()
+        index += 1
+
+        if token[0] == '"':
+            continue
+        if token == "(":
+            # Skip to the matching parenthesis, keeping what is between them
+            parens = 1
+            while parens:
+                parens += {"(": 1, ")": -1}.get(tokens[index].group(), 0)
+                index += 1
+            text = document[match.end() : tokens[index - 1].start()]
+            if not stack and kind != "fragment":
+                operation_variables = text
+            elif after_field:
+                arguments = text
+            after_field = False
+            previous = ")"
+            continue
+
+        if not stack:
+            if token in _OPERATION_TYPES or token == "fragment":
+                kind = token
+                definition_start = match.start()
+            elif previous == "fragment":
+                fragment_name = token
+
+        if token == "{":
+            if not stack:
+                kind = kind or "query"
+                stack.append(None)
+            else:
+                stack.append(pending)
+                if (
+                    found is None
+                    and kind != "fragment"
+                    and tuple(key for key in stack if key) == path
+                ):
+                    found = (field, arguments, match.end(), len(stack))
+            pending = None
+        elif token == "}":
+            if found and selections is None and len(stack) == found[3]:
+                selections = document[found[2] : match.start()]
+            stack.pop()
+            if not stack:
+                if kind == "fragment":
+                    fragments[fragment_name] = document[definition_start : match.end()]
+                kind = None
+            pending = None
+        elif not stack:
+            pass
+        elif token == "...":
+            pending = None
+        elif token == "@" or (token == "on" and previous == "..."):
+            skip_name = True
+        elif token == ":":
+            pass
+        elif skip_name:
+            skip_name = False
+        elif previous == ":":
+            # "alias: field", the alias already is the pending response key
+            field = token
+        else:
+            pending = field = token
+            arguments = None
+        after_field = stack and token == field and previous != "..."
+        previous = token
+
+    assert selections is not None, f"Connection {'.'.join(path)} must be selected"
+    field, arguments, _, _ = found
+    arguments = _PAGINATION_ARGUMENT.sub("", arguments or "").strip().rstrip(",")
+
+    # Fragments spread in the connection, and in those fragments
+    used_fragments = []
+    spreads = _SPREAD.findall(selections)
+    while spreads:
+        name = spreads.pop()
+        if name in fragments and fragments[name] not in used_fragments:
+            used_fragments.append(fragments[name])
+            spreads.extend(_SPREAD.findall(fragments[name]))
+
+    used_variables = set(
+        _VARIABLE.findall(" ".join([arguments, selections, *used_fragments]))
+    )
+    variable_definitions = {
+        name: definition
+        for name, definition in split_variable_definitions(operation_variables).items()
+        if name in used_variables
+    }
+    return Connection(
+        path, field, arguments, selections, variable_definitions, used_fragments
+    )
+
+
+def find_connections(value, path):
+    """Yield every ``(parent, connection)`` found at ``path``, across lists."""
+    if isinstance(value, list):
+        for item in value:
+            yield from find_connections(item, path)
+    elif isinstance(value, dict) and path:
+        child = value.get(path[0])
+        if len(path) > 1:
+            yield from find_connections(child, path[1:])
+        elif isinstance(child, dict):
+            yield value, child
+
+
+def truncated(connection):
+    return bool((connection.get("pageInfo") or {}).get("hasNextPage"))
+
+
+class NestedConnections:
+    """Fills in the inner connections of responses to a query.
+
+    A page of ``orders { nodes { id lineItems(first: 5) { ... } } }`` only
+    holds the first five line items of every order. ``complete()`` fetches the
+    rest of every truncated connection under ``root`` with follow-up queries
+    on the ``node`` of its parent, which must select its ``id``. Follow-ups
+    are merged into as few requests as fit in ``max_cost``, sent on
+    ``workers`` threads, and repeated until every connection is complete, so
+    the response reads as if each connection had been fetched whole.
+    Connections nested deeper are completed once their parents are. Top-level
+    connections have no parent node and are left to pagination.
+    """
+
+    def __init__(
+        self, graphql, query, variables=None, root=(), page_size=100, workers=4
+    ):
+        self.graphql = graphql
+        self.query = query
+        self.variables = variables or {}
+        self.page_size = page_size
+        self.workers = workers
+        self.connections = [
+            parse_connection(query, path)
+            for path in connection_paths(query)
+            # Top-level connections hang off data, not a node to query from
+            if len(path) > max(len(root), 1) and path[: len(root)] == root
+        ]
+
+    def complete(self, response):
+        data = response.get("data") or {}
+        for connection in self.connections:
+            pending = [
+                (parent, value)
+                for parent, value in find_connections(data, connection.path)
+                if truncated(value)
+            ]
+            while pending:
+                pending = self.__fetch(connection, pending)
+        return response
+
+    def __fetch(self, connection, pending):
+        # Fetches the next page of every pending connection, returns those still truncated
+        batch = BatchQuery(self.graphql, workers=self.workers)
+        items = []
+        for parent, value in pending:
+            match = _GLOBAL_ID.match(str(parent.get("id", "")))
+            assert match, (
+                f"The parents of '{connection.field}' must select their 'id' "
+                "for the connection to be completed"
+            )
+            variables = {
+                name: self.variables.get(name)
+                for name in connection.variable_definitions
+            }
+            variables["nested_id"] = parent["id"]
+            variables["nested_page_size"] = self.page_size
+            variables["nested_cursor"] = value["pageInfo"].get("endCursor")
+            items.append(
+                batch.add(
+                    query=connection.query(match.group(1)),
+                    variables=variables,
+                    # A connection costs about one point per node, plus the node lookup
+                    cost=self.page_size + 2,
+                )
+            )
+        logger.debug(
+            f"Completing {len(items)} truncated '{connection.field}' connections"
+        )
+        batch.send()
+
+        still_truncated = []
+        for (parent, value), item in zip(pending, items):
+            node = item.result()["data"]["node"]
+            if node is None:
+                # The parent was deleted since the page was fetched, leave the
+                # connection as Shopify returned it
+                continue
+            following = node["connection"]
+            for key in ("nodes", "edges"):
+                if key in value:
+                    value[key].extend(following.get(key) or [])
+            value["pageInfo"].update(following.get("pageInfo") or {})
+            if truncated(value):
+                still_truncated.append((parent, value))
+        return still_truncated
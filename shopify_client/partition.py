@@ -0,0 +1,112 @@
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from .prefetch import DONE, put_until_stopped
+
+
+def parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    # datetime.fromisoformat only understands a trailing "Z" from Python 3.11
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def time_windows(start, end, partitions):
+    """Split ``[start, end]`` into up to ``partitions`` disjoint windows.
+
+    Shopify's ``*_min``/``*_max`` filters are inclusive and have a one second
+    resolution, so consecutive windows are one second apart.
+    """
+    start, end = parse_datetime(start), parse_datetime(end)
+    seconds = int((end - start).total_seconds())
+    partitions = max(1, min(partitions, seconds))
+    bounds = [
+        start + timedelta(seconds=seconds * i // partitions) for i in range(partitions)
+    ]
+
+    return [
+        (window_start, window_end - timedelta(seconds=1))
+        for window_start, window_end in zip(bounds, bounds[1:])
+    ] + [(bounds[-1], end)]
+
+
+def id_ranges(since_id, max_id, partitions):
+    """Split ``(since_id, max_id]`` into up to ``partitions`` disjoint ranges."""
+    span = max_id - since_id
+    partitions = max(1, min(partitions, span))
+    bounds = [since_id + span * i // partitions for i in range(partitions + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def balance_windows(windows, counts, partitions):
+    """Merge adjacent ``windows`` into ``partitions`` holding similar record counts."""
+    target = sum(counts) / partitions
+    balanced = []
+    start, total = None, 0
+    for (window_start, window_end), count in zip(windows, counts):
+        start = window_start if start is None else start
+        total += count
+        if total >= target * (len(balanced) + 1) and len(balanced) < partitions - 1:
+            balanced.append((start, window_end))
+            start = None
+
+    if start is not None:
+        balanced.append((start, windows[-1][1]))
+    return balanced
+
+
+def merge(partitions, workers, ordered=False):
+    """Iterate the pages of several page iterators fetched on a worker pool.
+
+    Pages are yielded as they arrive, or partition by partition when
+    ``ordered`` is set, in which case pages of later partitions are held in
+    memory until the earlier partitions are exhausted.
+    """
+    buffer = queue.Queue(maxsize=2 * workers)
+    stopped = threading.Event()
+
+    def produce(index, pages):
+        if stopped.is_set():
+            return
+        try:
+            for page in pages:
+                if not put_until_stopped(buffer, (index, page, None), stopped):
+                    pages.close()
+                    return
+            put_until_stopped(buffer, (index, DONE, None), stopped)
+        except Exception as e:
+            put_until_stopped(buffer, (index, None, e), stopped)
+
+    pending = [deque() for _ in partitions]
+    finished = set()
+    current = 0
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    for index, pages in enumerate(partitions):
+        executor.submit(produce, index, pages)
+
+    try:
+        while len(finished) < len(partitions):
+            index, page, error = buffer.get()
+            if error is not None:
+                raise error
+
+            if page is DONE:
+                finished.add(index)
+            elif ordered:
+                pending[index].append(page)
+            else:
+                yield page
+
+            while ordered and current < len(partitions):
+                while pending[current]:
+                    yield pending[current].popleft()
+                if current not in finished:
+                    break
+                current += 1
+    finally:
+        stopped.set()
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,198 @@
+import threading
+from collections import OrderedDict
+
+from requests.adapters import HTTPAdapter
+
+from . import RETRY_STRATEGY, SHOPIFY_API_VERSION, ShopifyClient
+from .concurrency import AdaptiveLimiter, CircuitBreaker
+from .registry import QueryRegistry
+from .throttle import CostBucket, LeakyBucket
+
+
+def shop_domain(shop):
+    """Normalise ``https://shop.myshopify.com/`` and ``shop.myshopify.com`` alike."""
+    return shop.split("://", 1)[-1].strip("/").lower()
+
+
+class Shop:
+    __slots__ = (
+        "domain",
+        "api_token",
+        "api_version",
+        "rate_limiter",
+        "cost_limiter",
+        "concurrency_limiter",
+        "circuit_breaker",
+    )
+
+    def __init__(
+        self,
+        domain,
+        api_token,
+        api_version,
+        rate_limiter,
+        cost_limiter,
+        concurrency_limiter=None,
+        circuit_breaker=None,
+    ):
+        self.domain = domain
+        self.api_token = api_token
+        self.api_version = api_version
+        self.rate_limiter = rate_limiter
+        self.cost_limiter = cost_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.circuit_breaker = circuit_breaker
+
+
+class ShopifyClientPool:
+    """Hands out ``ShopifyClient`` instances for many shops.
+
+    Every client mounts the same ``HTTPAdapter``, so TLS connections to a shop
+    are kept alive across jobs: ``pool_connections`` is how many shops keep
+    their connections open and ``pool_maxsize`` how many connections each of
+    them may use concurrently. Shops are registered once with ``add()``; their
+    token, API version and rate limiters outlive their client, which is built
+    on first use and dropped when more than ``max_clients`` shops are in use,
+    least recently used first. With ``throttle`` set each shop gets its own
+    ``LeakyBucket`` and ``CostBucket``, and with ``adaptive`` set its own
+    ``AdaptiveLimiter`` and ``CircuitBreaker``. Every client reads its GraphQL
+    queries from the same ``QueryRegistry``, ``query_registry`` if given, so
+    each query file is parsed once for the whole pool.
+
+    The pool is safe to use from many threads. A client is shared by every
+    caller asking for the same shop.
+    """
+
+    def __init__(
+        self,
+        max_clients=100,
+        pool_connections=100,
+        pool_maxsize=10,
+        graphql_queries_dir=None,
+        throttle=True,
+        adaptive=False,
+        codec=None,
+        query_registry=None,
+    ):
+        self.max_clients = max_clients
+        if query_registry is None and graphql_queries_dir:
+            query_registry = QueryRegistry(graphql_queries_dir)
+        self.query_registry = query_registry
+        self.graphql_queries_dir = graphql_queries_dir
+        self.throttle = throttle
+        self.adaptive = adaptive
+        self.codec = codec
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=RETRY_STRATEGY,
+        )
+        self.__shops = {}
+        self.__clients = OrderedDict()
+        self.__lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.__clients)
+
+    def __contains__(self, shop):
+        return shop_domain(shop) in self.__shops
+
+    def __getitem__(self, shop):
+        return self.get(shop)
+
+    def add(self, shop, api_token, api_version=SHOPIFY_API_VERSION):
+        """Register the credentials of a shop, replacing any previous ones."""
+        domain = shop_domain(shop)
+        with self.__lock:
+            previous = self.__shops.get(domain)
+            if previous is not None and self.throttle:
+                rate_limiter = previous.rate_limiter
+                cost_limiter = previous.cost_limiter
+            elif self.throttle:
+                rate_limiter = LeakyBucket()
+                cost_limiter = CostBucket()
+            else:
+                rate_limiter = cost_limiter = None
+
+            if previous is not None and self.adaptive:
+                concurrency_limiter = previous.concurrency_limiter
+                circuit_breaker = previous.circuit_breaker
+            elif self.adaptive:
+                concurrency_limiter = AdaptiveLimiter()
+                circuit_breaker = CircuitBreaker()
+            else:
+                concurrency_limiter = circuit_breaker = None
+
+            self.__shops[domain] = Shop(
+                domain,
+                api_token,
+                api_version,
+                rate_limiter,
+                cost_limiter,
+                concurrency_limiter,
+                circuit_breaker,
+            )
+            # Credentials changed, the next get() builds a fresh client
+            self.__clients.pop(domain, None)
+
+    def get(self, shop, api_token=None, api_version=None):
+        """Return the client of a shop, registering it first if a token is given."""
+        domain = shop_domain(shop)
+        with self.__lock:
+            if api_token is not None:
+                registered = self.__shops.get(domain)
+                if (
+                    registered is None
+                    or registered.api_token != api_token
+                    or (api_version and registered.api_version != api_version)
+                ):
+                    if api_version is None:
+                        api_version = (
+                            registered.api_version
+                            if registered
+                            else SHOPIFY_API_VERSION
+                        )
+                    self.add(domain, api_token, api_version)
+
+            client = self.__clients.get(domain)
+            if client is not None:
+                self.__clients.move_to_end(domain)
+                return client
+
+            registered = self.__shops.get(domain)
+            if registered is None:
+                raise KeyError(f"Shop {domain} is not registered")
+
+            client = self.__clients[domain] = self.__build(registered)
+            while len(self.__clients) > self.max_clients:
+                # Evicted clients are not closed, their connections belong
+                # to the shared adapter
+                self.__clients.popitem(last=False)
+            return client
+
+    def __build(self, shop):
+        return ShopifyClient(
+            api_url=f"https://{shop.domain}",
+            api_token=shop.api_token,
+            api_version=shop.api_version,
+            graphql_queries_dir=self.graphql_queries_dir,
+            query_registry=self.query_registry,
+            rate_limiter=shop.rate_limiter,
+            cost_limiter=shop.cost_limiter,
+            concurrency_limiter=shop.concurrency_limiter,
+            circuit_breaker=shop.circuit_breaker,
+            adapter=self.adapter,
+            codec=self.codec,
+        )
+
+    def remove(self, shop):
+        """Forget a shop, e.g. after its app was uninstalled."""
+        domain = shop_domain(shop)
+        with self.__lock:
+            self.__shops.pop(domain, None)
+            self.__clients.pop(domain, None)
+
+    def close(self):
+        with self.__lock:
+            self.__clients.clear()
+        self.adapter.close()
@@ -0,0 +1,87 @@
+import asyncio
+import queue
+import threading
+
+# Marks the end of the pages in the buffer
+DONE = object()
+
+# How often a blocked producer checks whether the consumer went away
+_POLL_INTERVAL = 0.1
+
+
+def put_until_stopped(buffer, item, stopped):
+    """Put ``item`` on a bounded queue unless ``stopped`` is set while waiting.
+
+    Returns whether the item was queued, letting producers bail out once the
+    consumer has gone away instead of blocking forever on a full queue.
+    """
+    while not stopped.is_set():
+        try:
+            buffer.put(item, timeout=_POLL_INTERVAL)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def prefetch(pages, size):
+    """Iterate ``pages`` while a background thread fetches ahead.
+
+    The next page is requested as soon as the previous one arrives, so network
+    latency overlaps with the caller's processing. At most ``size`` fetched
+    pages are buffered; the producer blocks until the caller catches up.
+    ``pages`` is expected to be a generator so it can be closed early.
+    """
+    buffer = queue.Queue(maxsize=size)
+    stopped = threading.Event()
+
+    def put(item):
+        return put_until_stopped(buffer, item, stopped)
+
+    def produce():
+        try:
+            for page in pages:
+                if not put((page, None)):
+                    pages.close()
+                    return
+            put((DONE, None))
+        except Exception as e:
+            put((None, e))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            page, error = buffer.get()
+            if error is not None:
+                raise error
+            if page is DONE:
+                return
+            yield page
+    finally:
+        stopped.set()
+
+
+async def aprefetch(pages, size):
+    """Asyncio counterpart of ``prefetch`` fetching ahead in a background task."""
+    buffer = asyncio.Queue(maxsize=size)
+
+    async def produce():
+        try:
+            async for page in pages:
+                await buffer.put((page, None))
+            await buffer.put((DONE, None))
+        except Exception as e:
+            await buffer.put((None, e))
+
+    task = asyncio.ensure_future(produce())
+    try:
+        while True:
+            page, error = await buffer.get()
+            if error is not None:
+                raise error
+            if page is DONE:
+                return
+            yield page
+    finally:
+        task.cancel()
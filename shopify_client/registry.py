@@ -0,0 +1,139 @@
+import glob
+import os
+import re
+import threading
+from functools import lru_cache
+
+# GraphQL tokens, shared by every module reading documents
+_TOKENS = re.compile(
+    r'#[^\n]*|"""(?:.|\n)*?"""|"(?:\\.|[^"\\])*"|\.\.\.|\$?[A-Za-z_][A-Za-z0-9_]*|[{}():@]'
+)
+_OPERATION_TYPES = frozenset(["query", "mutation", "subscription"])
+
+
+@lru_cache(maxsize=256)
+def validate_pagination(query):
+    """Check a query can be paginated. Cached, so a query is only scanned once."""
+    assert "pageInfo" in query, "Query must contain a 'pageInfo' object to be paginated"
+    assert (
+        "hasNextPage" in query[query.find("pageInfo") :]
+    ), "Query must contain a 'hasNextPage' field in 'pageInfo' object"
+    assert (
+        "endCursor" in query[query.find("pageInfo") :]
+    ), "Query must contain a 'endCursor' field in 'pageInfo' object"
+
+
+@lru_cache(maxsize=256)
+def connection_paths(query):
+    """Return the connection paths of a query, outermost first. Cached."""
+    return tuple(sorted(parse_document(query)[1], key=len))
+
+
+def parse_document(document):
+    """Return the operation names and the connection paths of a GraphQL document.
+
+    Connection paths are the response keys leading to every selection that
+    contains ``pageInfo``, e.g. ``("products",)`` or
+    ``("products", "variants")``. Aliases are used over field names since
+    that is how the connection appears in the response.
+    """
+    operations = []
+    connections = []
+    stack = []  # response key of every open selection, None for operations
+    pending = None  # response key of the last field, opened by a following "{"
+    previous = None
+    skip_name = False  # the next name is a fragment type condition or a directive
+    parens = 0
+
+    for token in _TOKENS.findall(document):
+        if token.startswith(("#", '"')):
+            continue
+        if parens:
+            parens += {"(": 1, ")": -1}.get(token, 0)
+            continue
+
+        if token == "(":
+            parens = 1
+        elif token == "{":
+            stack.append(pending if stack else None)
+            pending = None
+        elif token == "}":
+            stack.pop()
+            pending = None
+        elif token == "...":
+            pending = None
+        elif token == "@" or (token == "on" and previous == "..."):
+            skip_name = True
+        elif token == ":":
+            # "alias: field", the alias already is the pending response key
+            skip_name = True
+        elif skip_name:
+            skip_name = False
+        elif not stack:
+            if previous in _OPERATION_TYPES:
+                operations.append(token)
+            pending = None
+        else:
+            if token == "pageInfo":
+                connections.append(tuple(key for key in stack if key))
+            pending = token
+        previous = token
+
+    return operations, connections
+
+
+class CompiledQuery:
+    __slots__ = ("name", "path", "document", "mtime", "operations", "connections")
+
+    def __init__(self, name, path, document, mtime=None):
+        self.name = name
+        self.path = path
+        self.document = document
+        self.mtime = mtime
+        self.operations, self.connections = parse_document(document)
+
+    @property
+    def paginated(self):
+        return bool(self.connections)
+
+
+class QueryRegistry:
+    """In-memory cache of the ``.graphql`` documents of a queries directory.
+
+    Documents are read and parsed once, on first use or all at once with
+    ``preload()``. With ``reload`` set, a document is read again whenever its
+    file changes, which is meant for development.
+    """
+
+    def __init__(self, queries_dir, reload=False):
+        self.queries_dir = queries_dir
+        self.reload = reload
+        self.__queries = {}
+        self.__lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self.__queries
+
+    def __load(self, name):
+        path = os.path.join(self.queries_dir, f"{name}.graphql")
+        mtime = os.stat(path).st_mtime if self.reload else None
+        with open(path, "r") as f:
+            document = f.read()
+        return CompiledQuery(name, path, document, mtime)
+
+    def get(self, name):
+        query = self.__queries.get(name)
+        if query is not None and (
+            not self.reload or os.stat(query.path).st_mtime == query.mtime
+        ):
+            return query
+
+        with self.__lock:
+            query = self.__queries[name] = self.__load(name)
+        return query
+
+    def preload(self):
+        """Read every query of the directory up front."""
+        for path in glob.glob(os.path.join(self.queries_dir, "*.graphql")):
+            self.get(os.path.splitext(os.path.basename(path))[0])
+        return self
@@ -0,0 +1,230 @@
+import gzip
+import hashlib
+import io
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import RetryError
+from urllib3 import HTTPResponse
+from urllib3.exceptions import MaxRetryError
+
+from . import RETRY_STRATEGY
+from .exceptions import CassetteMissError
+from .throttle import CALL_LIMIT_HEADER
+
+# Response headers kept in a cassette. Request headers, the access token
+# among them, are never written.
+RECORDED_HEADERS = ("Content-Type", "Link", CALL_LIMIT_HEADER, "Retry-After")
+
+THROTTLED_BODY = (
+    b'{"errors":"Exceeded 2 calls per second for api client. '
+    b'Reduce request rates to resume uninterrupted service."}'
+)
+
+
+def interaction_key(method, url, body):
+    """What a replayed request is matched on: method, path and query, and body digest.
+
+    The host is left out so a cassette replays against any shop, and bodies,
+    which tell GraphQL queries and their cursors apart, are kept as a digest.
+    """
+    parts = urlsplit(url)
+    path = f"{parts.path}?{parts.query}" if parts.query else parts.path
+    if isinstance(body, str):
+        body = body.encode()
+    digest = hashlib.sha1(body).hexdigest() if body else None
+    return method.upper(), path, digest
+
+
+class Cassette:
+    """Request/response pairs in a JSON lines file, gzipped if ``path`` ends in ``.gz``.
+
+    Recorded interactions are appended one per line as they happen, so a
+    recording interrupted half way still replays what it got.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.__file = None
+        self.__lock = threading.Lock()
+
+    def __open(self, mode):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def load(self):
+        """Interactions recorded so far, in order."""
+        with self.__open("r") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def record(self, interaction):
+        with self.__lock:
+            if self.__file is None:
+                self.__file = self.__open("a")
+            self.__file.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+            self.__file.flush()
+
+    def close(self):
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Sends requests to Shopify and records each response in a ``Cassette``.
+
+    Mount it with ``ShopifyClient(..., adapter=RecordingAdapter(cassette))``.
+    Retries behave as with the default adapter and only the final response of
+    a request is recorded, along with the time it took to its headers. Bodies
+    are read whole to be recorded, streamed responses included.
+    """
+
+    def __init__(self, cassette, max_retries=RETRY_STRATEGY, **kwargs):
+        super().__init__(max_retries=max_retries, **kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        started_at = time.monotonic()
+        response = super().send(request, **kwargs)
+        elapsed = time.monotonic() - started_at
+
+        method, url, body = interaction_key(request.method, request.url, request.body)
+        self.cassette.record(
+            {
+                "method": method,
+                "url": url,
+                "body": body,
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": {
+                    name: response.headers[name]
+                    for name in RECORDED_HEADERS
+                    if name in response.headers
+                },
+                # Lossless for any bytes, and plain text for JSON
+                "content": response.content.decode("utf-8", "surrogateescape"),
+                "elapsed": round(elapsed, 4),
+            }
+        )
+        return response
+
+
+class ReplayAdapter(HTTPAdapter):
+    """Answers requests from a ``Cassette`` instead of the network.
+
+    Requests are matched on ``interaction_key``; several recordings of the
+    same request are replayed in turn, starting over once all were used, and
+    a request never recorded raises ``CassetteMissError``. Each response
+    arrives after its recorded latency divided by ``speed``, or after
+    ``latency`` seconds if given (0 for none), with at most ``concurrency``
+    responses in the works at once like a server with that many workers.
+
+    With a ``throttle``, a ``LeakyBucket`` standing for the shop's REST
+    bucket, REST requests fill it and get its level in their call-limit
+    header, and are rejected with a 429 and ``Retry-After`` while it is full.
+    Retries, of those and of recorded errors, follow ``max_retries`` like the
+    default adapter, so clients replay exactly as they ran.
+    """
+
+    def __init__(
+        self,
+        cassette,
+        speed=1.0,
+        latency=None,
+        concurrency=None,
+        throttle=None,
+        max_retries=RETRY_STRATEGY,
+        sleep=time.sleep,
+        **kwargs,
+    ):
+        super().__init__(max_retries=max_retries, **kwargs)
+        self.speed = speed
+        self.latency = latency
+        self.throttle = throttle
+        self.sleep = sleep
+        self.__interactions = defaultdict(list)
+        for interaction in cassette.load():
+            key = (interaction["method"], interaction["url"], interaction["body"])
+            self.__interactions[key].append(interaction)
+        self.__replayed = defaultdict(int)
+        self.__lock = threading.Lock()
+        self.__slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+
+    def send(self, request, stream=False, **kwargs):
+        retries = self.max_retries
+        while True:
+            response = self.__replay(request)
+            has_retry_after = bool(response.headers.get("Retry-After"))
+            if not retries.is_retry(request.method, response.status, has_retry_after):
+                break
+            try:
+                retries = retries.increment(request.method, request.url, response)
+            except MaxRetryError as e:
+                if retries.raise_on_status:
+                    raise RetryError(e, request=request)
+                break
+            delay = None
+            if retries.respect_retry_after_header:
+                delay = retries.get_retry_after(response)
+            self.sleep(delay if delay is not None else retries.get_backoff_time())
+        response.retries = retries
+        return self.build_response(request, response)
+
+    def __replay(self, request):
+        key = interaction_key(request.method, request.url, request.body)
+        with self.__lock:
+            recorded = self.__interactions.get(key)
+            if not recorded:
+                raise CassetteMissError(f"No recorded response for {' '.join(key[:2])}")
+            interaction = recorded[self.__replayed[key] % len(recorded)]
+            self.__replayed[key] += 1
+
+        headers = dict(interaction["headers"])
+        status, reason = interaction["status"], interaction["reason"]
+        content = interaction["content"].encode("utf-8", "surrogateescape")
+        if self.throttle is not None and not key[1].endswith("/graphql.json"):
+            with self.__lock:
+                wait_time = self.throttle.wait_time
+                if not wait_time:
+                    self.throttle.reserve()
+                level = math.ceil(self.throttle.level)
+            headers[CALL_LIMIT_HEADER] = f"{level}/{self.throttle.size}"
+            if wait_time:
+                status, reason, content = 429, "Too Many Requests", THROTTLED_BODY
+                headers["Retry-After"] = str(math.ceil(wait_time))
+
+        if self.__slots is not None:
+            self.__slots.acquire()
+        try:
+            latency = self.latency
+            if latency is None:
+                latency = interaction["elapsed"] / self.speed
+            if latency:
+                self.sleep(latency)
+        finally:
+            if self.__slots is not None:
+                self.__slots.release()
+
+        return HTTPResponse(
+            body=io.BytesIO(content),
+            headers=headers,
+            status=status,
+            reason=reason,
+            preload_content=False,
+            decode_content=False,
+            request_method=request.method,
+            request_url=request.url,
+        )
@@ -0,0 +1,179 @@
+from functools import cached_property
+
+from .endpoint import DraftOrdersEndpoint, Endpoint, OrdersEndpoint
+from .graphql import GraphQL
+
+
+class Resource:
+    """An endpoint of the client, built on first access and then cached.
+
+    ``endpoint_class`` names the attribute of the client holding the class to
+    build, so the asyncio client can plug in its own endpoints.
+    ``sub_endpoints`` are nested endpoints set on the endpoint, such as
+    ``client.products.images``.
+    """
+
+    def __init__(
+        self,
+        endpoint,
+        metafields=False,
+        endpoint_class="endpoint_class",
+        sub_endpoints=(),
+    ):
+        self.endpoint = endpoint
+        self.metafields = metafields
+        self.endpoint_class = endpoint_class
+        self.sub_endpoints = sub_endpoints
+        self.name = None
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, client, owner=None):
+        if client is None:
+            return self
+
+        endpoint_class = getattr(client, self.endpoint_class)
+        if self.metafields:
+            endpoint = endpoint_class(
+                client=client, endpoint=self.endpoint, metafields=True
+            )
+        else:
+            endpoint = endpoint_class(client=client, endpoint=self.endpoint)
+
+        for sub_endpoint in self.sub_endpoints:
+            setattr(
+                endpoint,
+                sub_endpoint,
+                client.endpoint_class(
+                    client=client, endpoint=self.endpoint, sub_endpoint=sub_endpoint
+                ),
+            )
+
+        # Cached on the instance, which takes precedence over this descriptor
+        client.__dict__[self.name] = endpoint
+        return endpoint
+
+
+class ShopifyResourcesMixin:
+    """Declares the REST endpoint tree and the GraphQL entrypoint of a client.
+
+    Shared by the blocking and the asyncio clients, which only differ in the
+    endpoint classes they plug in. Endpoints are only built when first used,
+    so creating a client stays cheap.
+    """
+
+    endpoint_class = Endpoint
+    orders_endpoint_class = OrdersEndpoint
+    draft_orders_endpoint_class = DraftOrdersEndpoint
+    graphql_class = GraphQL
+
+    # Access
+    storefront_access_tokens = Resource("storefront_access_tokens")
+
+    # Billing
+    application_charges = Resource("application_charges")
+    application_credits = Resource("application_credits")
+    recurring_application_charges = Resource("recurring_application_charges")
+
+    # Customers
+    customers = Resource("customers", metafields=True)
+    # customer_addresses = Resource("customer_addresses")
+
+    # Discounts
+    price_rules = Resource("price_rules")
+    discount_codes = Resource("discount_codes")
+
+    # Events
+    events = Resource("events")
+
+    # Gift Cards
+    gift_cards = Resource("gift_cards")
+
+    # Inventory
+    inventory_items = Resource("inventory_items")
+    inventory_levels = Resource("inventory_levels")
+    locations = Resource("locations", metafields=True)
+
+    # Marketing Event
+    marketing_events = Resource("marketing_events")
+
+    # Mobile Support
+    mobile_platform_applications = Resource("mobile_platform_applications")
+
+    # Online Store
+    articles = Resource("articles", metafields=True)
+    blogs = Resource("blogs", metafields=True)
+    pages = Resource("pages", metafields=True)
+
+    # Orders
+    checkouts = Resource("checkouts")
+    draft_orders = Resource(
+        "draft_orders",
+        metafields=True,
+        endpoint_class="draft_orders_endpoint_class",
+    )
+    orders = Resource("orders", endpoint_class="orders_endpoint_class")
+
+    # Plus
+    users = Resource("users")
+
+    # Products
+    collects = Resource("collects")
+    collections = Resource("collections", metafields=True)
+    custom_collections = Resource("custom_collections")
+    products = Resource("products", metafields=True, sub_endpoints=("images",))
+    product_images = Resource("product_images", metafields=True)
+    smart_collections = Resource("smart_collections", metafields=True)
+    variants = Resource("variants", metafields=True)
+
+    # Sales Channels
+    collections_listings = Resource("collections_listings")
+    product_listings = Resource("product_listings")
+    resource_feedback = Resource("resource_feedback")
+
+    # Shipping and Fulfillment
+    assigned_fulfillment_orders = Resource("assigned_fulfillment_orders")
+    # TODO: Implement Fulfillment
+    fulfillment_orders = Resource("fulfillment_orders")
+    carrier_services = Resource("carrier_services")
+    fulfillments = Resource("fulfillments")
+    fulfillment_services = Resource("fulfillment_services")
+
+    # Shopify Payments
+    shopify_payments = Resource("shopify_payments")
+
+    # Store Properties
+    countries = Resource("countries")
+    currencies = Resource("currencies")
+    policies = Resource("policies")
+    shipping_zones = Resource("shipping_zones")
+    shop = Resource("shop", metafields=True)
+
+    # Tender Transactions
+    tender_transactions = Resource("tender_transactions")
+
+    # Webhooks
+    webhooks = Resource("webhooks")
+
+    def init_resources(
+        self, graphql_queries_dir=None, cost_limiter=None, query_registry=None
+    ):
+        self.__graphql_queries_dir = graphql_queries_dir
+        self.__cost_limiter = cost_limiter
+        self.__query_registry = query_registry
+
+    @classmethod
+    def resource_names(cls):
+        """Names of every endpoint a client exposes."""
+        return [name for name in dir(cls) if isinstance(getattr(cls, name), Resource)]
+
+    # GraphQL
+    @cached_property
+    def query(self):
+        return self.graphql_class(
+            client=self,
+            graphql_queries_dir=self.__graphql_queries_dir,
+            cost_limiter=self.__cost_limiter,
+            query_registry=self.__query_registry,
+        )
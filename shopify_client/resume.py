@@ -0,0 +1,28 @@
+# Token of a pagination that went through every page, resuming from it yields none
+FINISHED = "finished"
+
+
+def checkpointed(pages, checkpoint):
+    """Yield the pages of ``(page, token)`` pairs, reporting each token to ``checkpoint``.
+
+    A token is reported once the caller is done with its page, i.e. when the
+    next page is requested, so resuming from the last reported token never
+    skips a page the caller did not process. Tokens are strings, the URL or
+    cursor of the next page, and ``FINISHED`` once every page was processed.
+    """
+    try:
+        for page, token in pages:
+            yield page
+            checkpoint(token)
+    finally:
+        pages.close()
+
+
+async def acheckpointed(pages, checkpoint):
+    """Asyncio counterpart of ``checkpointed``."""
+    try:
+        async for page, token in pages:
+            yield page
+            checkpoint(token)
+    finally:
+        await pages.aclose()
@@ -0,0 +1,132 @@
+import json
+import re
+
+# Bytes that matter at each point of the document. Outside of the streamed
+# items keys and separators are tracked, inside an item only its nesting, and
+# inside a string only where it ends, so long values are skipped in C.
+_TOKENS = re.compile(rb'[{}\[\]",:]')
+_ITEM_TOKENS = re.compile(rb'[{}\[\]"]')
+_STRING_TOKENS = re.compile(rb'["\\]')
+
+# Size of the response chunks read while streaming records
+CHUNK_SIZE = 64 * 1024
+
+
+class ArrayStream:
+    """Incrementally parses a JSON document and yields the items of one array.
+
+    ``chunks`` is an iterable of bytes, e.g. ``response.iter_content()``, and
+    ``paths`` the key paths of the arrays to stream, such as
+    ``[("orders",)]`` or ``[("data", "products", "nodes")]``. Items are parsed
+    one by one as soon as their last byte arrives, so only a single item is
+    held in memory. Everything outside the array is kept and available as
+    ``rest`` once the stream is exhausted, with the array left empty. The
+    items of the array must be objects or arrays.
+    """
+
+    def __init__(self, chunks, paths):
+        self.chunks = chunks
+        self.paths = [list(path) for path in paths]
+        self.matched_path = None
+        self.rest = None
+
+    def __iter__(self):
+        stack = []  # b"{" or b"[" for every open container
+        keys = []  # current key of every open object, None for arrays
+        expect_key = []  # whether the next string of every open object is a key
+        in_string = False
+        key = None  # bytes of the key being read, None when not reading a key
+        skip_first = 0  # 1 when a chunk ended with a backslash inside a string
+        target_depth = None  # depth of the streamed array while inside it
+        item = None  # bytes of the item being read, None between items
+        rest = bytearray()
+
+        for chunk in self.chunks:
+            if not chunk:
+                continue
+
+            start = 0  # where the pending bytes of ``item`` or ``rest`` begin
+            key_start = 0
+            pos = skip_first
+            skip_first = 0
+
+            while True:
+                if in_string:
+                    pattern = _STRING_TOKENS
+                elif item is not None:
+                    pattern = _ITEM_TOKENS
+                else:
+                    pattern = _TOKENS
+
+                match = pattern.search(chunk, pos)
+                if match is None:
+                    break
+                i = match.start()
+                pos = i + 1
+                token = chunk[i : i + 1]
+
+                if in_string:
+                    if token == b"\\":
+                        if pos < len(chunk):
+                            pos += 1
+                        else:
+                            skip_first = 1
+                        continue
+
+                    in_string = False
+                    if key is not None:
+                        key += chunk[key_start:i]
+                        keys[-1] = json.loads(b'"' + bytes(key) + b'"')
+                        key = None
+                elif token == b'"':
+                    in_string = True
+                    if item is None and stack and stack[-1] == b"{" and expect_key[-1]:
+                        key = bytearray()
+                        key_start = pos
+                elif token == b":":
+                    expect_key[-1] = False
+                elif token == b",":
+                    if len(stack) == target_depth:
+                        # Separators between streamed items are dropped from rest
+                        rest += chunk[start:i]
+                        start = pos
+                    elif stack[-1] == b"{":
+                        expect_key[-1] = True
+                elif token in (b"{", b"["):
+                    if item is None and len(stack) == target_depth:
+                        rest += chunk[start:i]
+                        start = i
+                        item = bytearray()
+                    elif (
+                        item is None
+                        and token == b"["
+                        and all(container == b"{" for container in stack)
+                        and keys in self.paths
+                    ):
+                        self.matched_path = tuple(keys)
+                        target_depth = len(stack) + 1
+
+                    stack.append(token)
+                    keys.append(None)
+                    expect_key.append(token == b"{")
+                else:
+                    stack.pop()
+                    keys.pop()
+                    expect_key.pop()
+
+                    if item is not None and len(stack) == target_depth:
+                        item += chunk[start:pos]
+                        start = pos
+                        yield json.loads(bytes(item))
+                        item = None
+                    elif target_depth is not None and len(stack) < target_depth:
+                        target_depth = None
+
+            if item is not None:
+                item += chunk[start:]
+            else:
+                rest += chunk[start:]
+            if key is not None:
+                key += chunk[key_start:]
+
+        self.rest = json.loads(bytes(rest)) if rest.strip() else None
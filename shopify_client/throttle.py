@@ -0,0 +1,145 @@
+import threading
+import time
+
+CALL_LIMIT_HEADER = "X-Shopify-Shop-Api-Call-Limit"
+
+# Every REST plan drains its bucket in 20 seconds: 40 @ 2/s, 80 @ 4/s, 400 @ 20/s
+BUCKET_DRAIN_SECONDS = 20
+
+
+class LeakyBucket:
+    """Local model of Shopify's per-store REST leaky bucket.
+
+    Each request adds one unit to the bucket and the bucket leaks at a fixed
+    rate. ``reserve()`` books a slot and says how long to wait so the bucket
+    never overflows, and ``update()`` syncs the model with the call-limit header
+    Shopify sends back, which also accounts for other processes using the store.
+    One bucket can be shared by every client talking to the same store.
+    """
+
+    def __init__(self, size=40, leak_rate=None, clock=time.monotonic):
+        self.size = size
+        self.fixed_leak_rate = leak_rate
+        self.clock = clock
+        self.__fill = 0.0
+        self.__updated_at = clock()
+        self.__lock = threading.Lock()
+
+    @property
+    def leak_rate(self):
+        return self.fixed_leak_rate or self.size / BUCKET_DRAIN_SECONDS
+
+    def __leak(self, now):
+        elapsed = now - self.__updated_at
+        self.__fill = max(0.0, self.__fill - elapsed * self.leak_rate)
+        self.__updated_at = now
+
+    @property
+    def level(self):
+        """Current estimated bucket fill, including reserved requests."""
+        with self.__lock:
+            self.__leak(self.clock())
+            return self.__fill
+
+    @property
+    def wait_time(self):
+        """Seconds a request issued now would be delayed."""
+        with self.__lock:
+            self.__leak(self.clock())
+            return max(0.0, (self.__fill + 1 - self.size) / self.leak_rate)
+
+    def reserve(self):
+        """Book a slot for one request and return how long to wait before sending it."""
+        with self.__lock:
+            self.__leak(self.clock())
+            delay = max(0.0, (self.__fill + 1 - self.size) / self.leak_rate)
+            self.__fill += 1
+            return delay
+
+    def update(self, call_limit):
+        """Sync the model with a ``X-Shopify-Shop-Api-Call-Limit`` value like ``"32/40"``."""
+        if not call_limit:
+            return
+
+        used, size = (int(value) for value in call_limit.split("/"))
+        with self.__lock:
+            self.__leak(self.clock())
+            self.size = size
+            # Our own in-flight requests may not be reflected yet, so never
+            # lower the estimate below what was reserved locally.
+            self.__fill = max(self.__fill, float(used))
+
+
+class CostBucket:
+    """Local model of Shopify's per-store GraphQL cost bucket.
+
+    Points are spent by queries and restored at ``restore_rate`` per second up
+    to ``maximum``. ``reserve()`` books the requested cost of a query and says
+    how long to wait until the bucket can afford it, and ``update()`` syncs the
+    model with the ``extensions.cost`` block of the response, refunding the
+    difference between the requested and the actual cost. ``refund()`` gives
+    back the whole booking of a query that failed before a response came back.
+    """
+
+    def __init__(self, maximum=1000, restore_rate=50, clock=time.monotonic):
+        self.maximum = maximum
+        self.restore_rate = restore_rate
+        self.clock = clock
+        self.__available = float(maximum)
+        self.__updated_at = clock()
+        self.__lock = threading.Lock()
+
+    def __restore(self, now):
+        elapsed = now - self.__updated_at
+        self.__available = min(
+            float(self.maximum), self.__available + elapsed * self.restore_rate
+        )
+        self.__updated_at = now
+
+    @property
+    def available(self):
+        """Points currently available, net of reserved queries. May go negative."""
+        with self.__lock:
+            self.__restore(self.clock())
+            return self.__available
+
+    def wait_time(self, cost):
+        """Seconds a query of ``cost`` points issued now would be delayed."""
+        with self.__lock:
+            self.__restore(self.clock())
+            return max(0.0, (cost - self.__available) / self.restore_rate)
+
+    def reserve(self, cost):
+        """Book ``cost`` points and return how long to wait before sending the query."""
+        with self.__lock:
+            self.__restore(self.clock())
+            delay = max(0.0, (cost - self.__available) / self.restore_rate)
+            self.__available -= cost
+            return delay
+
+    def refund(self, cost):
+        """Give back ``cost`` booked points of a query that got no response."""
+        with self.__lock:
+            self.__restore(self.clock())
+            self.__available = min(float(self.maximum), self.__available + cost)
+
+    def update(self, cost, reserved=0):
+        """Sync the model with the ``extensions.cost`` block of a response.
+
+        ``reserved`` is what was booked for the query; whatever was not actually
+        spent is given back. Throttled queries have no actual cost and are
+        refunded in full.
+        """
+        throttle_status = cost["throttleStatus"]
+        actual = cost.get("actualQueryCost") or 0
+
+        with self.__lock:
+            self.__restore(self.clock())
+            self.maximum = throttle_status["maximumAvailable"]
+            self.restore_rate = throttle_status["restoreRate"]
+            # Other in-flight queries may not be reflected by Shopify yet, so
+            # never raise the estimate above what is left locally.
+            self.__available = min(
+                self.__available + reserved - actual,
+                float(throttle_status["currentlyAvailable"]),
+            )
@@ -0,0 +1,97 @@
+import logging
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .exceptions import BatchWriteError
+
+logger = logging.getLogger(__name__)
+
+# What to do when a write fails: raise it once the writes in flight are done,
+# report it and go on, or go on and raise every failure at the end
+ON_ERROR = frozenset(["stop", "continue", "collect"])
+
+
+class WriteResult:
+    """Outcome of one write: what ``write`` returned, or the error it raised."""
+
+    __slots__ = ("index", "item", "result", "error")
+
+    def __init__(self, index, item, result=None, error=None):
+        self.index = index
+        self.item = item
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        outcome = "ok" if self.ok else repr(self.error)
+        return f"<WriteResult {self.index}: {outcome}>"
+
+
+def attempt(write, index, item):
+    try:
+        return WriteResult(index, item, result=write(item))
+    except Exception as e:
+        return WriteResult(index, item, error=e)
+
+
+def write_many(write, items, workers=4, ordered=True, on_error="stop", progress=None):
+    """Call ``write`` on every item on a worker pool and yield a ``WriteResult`` each.
+
+    ``items`` may be any iterable, even a lazy one: only ``2 * workers`` items
+    are in flight at a time. Results are yielded in the order of ``items``
+    when ``ordered`` is set, otherwise as they complete. ``on_error`` is one of
+    ``ON_ERROR``, and ``progress`` is called with the number of completed and
+    failed writes after each one.
+
+    This is a generator: nothing is written until the results are iterated,
+    e.g. with ``list()`` or a ``for`` loop, and writes stop being submitted
+    when the iteration stops.
+    """
+    assert on_error in ON_ERROR, f"on_error must be one of {sorted(ON_ERROR)}"
+
+    items = enumerate(items)
+    pending = deque()
+    failures = []
+    completed = 0
+    stopped = False
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            while not stopped and len(pending) < 2 * workers:
+                next_item = next(items, None)
+                if next_item is None:
+                    break
+                pending.append(executor.submit(attempt, write, *next_item))
+            if not pending:
+                break
+
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending = deque(future for future in pending if future not in done)
+
+            for result in sorted(
+                (future.result() for future in done), key=lambda r: r.index
+            ):
+                completed += 1
+                if not result.ok:
+                    logger.warning(f"Write {result.index} failed: {result.error!r}")
+                    failures.append(result)
+                    # Writes already in flight still complete and are reported
+                    stopped = stopped or on_error == "stop"
+                if progress is not None:
+                    progress(completed, len(failures))
+                yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    if failures and on_error == "stop":
+        raise failures[0].error
+    if failures and on_error == "collect":
+        raise BatchWriteError(failures)
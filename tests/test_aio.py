@@ -0,0 +1,274 @@
+import asyncio
+import json
+import re
+
+import httpx
+import pytest
+
+from shopify_client.aio import (
+    AsyncEndpoint,
+    AsyncOrdersEndpoint,
+    AsyncShopifyClient,
+    RetryError,
+)
+from shopify_client.concurrency import CircuitBreaker
+from shopify_client.exceptions import GraphQLError
+
+
+API_URL = "https://test-shop.myshopify.com"
+
+
+def make_client(handler):
+    return AsyncShopifyClient(
+        api_url=API_URL,
+        api_token="test-token",
+        transport=httpx.MockTransport(handler),
+    )
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(mocker):
+    return mocker.patch("shopify_client.aio.asyncio.sleep")
+
+
+def test_endpoint_tree():
+    client = make_client(lambda request: httpx.Response(200, json={}))
+    assert isinstance(client.orders, AsyncOrdersEndpoint)
+    assert isinstance(client.orders.refunds, AsyncEndpoint)
+    assert isinstance(client.products.metafields, AsyncEndpoint)
+    assert client.products.images.sub_endpoint == "images"
+    # Helpers built on blocking I/O or threads only exist on the blocking client
+    assert not hasattr(client.products, "iter_records")
+    assert not hasattr(client.products, "partitioned")
+    assert not hasattr(client.products, "create_many")
+    assert not hasattr(client.query, "iter_nodes")
+    assert not hasattr(client.products, "export")
+    assert not hasattr(client.query, "export")
+    assert not hasattr(client.query, "bulk")
+
+
+def test_get():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"product": {"id": 1}})
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.products.get(1, fields="id")
+
+    assert run(main()) == {"product": {"id": 1}}
+    assert str(requests[0].url) == (
+        f"{API_URL}/admin/api/2024-10/products/1.json?fields=id"
+    )
+    assert requests[0].headers["X-Shopify-Access-Token"] == "test-token"
+
+
+def test_create_and_delete():
+    def handler(request):
+        if request.method == "POST":
+            return httpx.Response(201, json=json.loads(request.content))
+        return httpx.Response(200)
+
+    async def main():
+        async with make_client(handler) as client:
+            created = await client.products.create(json={"product": {"title": "A"}})
+            deleted = await client.products.delete(1)
+            return created, deleted
+
+    assert run(main()) == ({"product": {"title": "A"}}, True)
+
+
+def test_actions():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"count": 3})
+
+    async def main():
+        async with make_client(handler) as client:
+            await client.draft_orders.complete(1)
+            return await client.orders.count()
+
+    assert run(main()) == {"count": 3}
+    assert [(r.method, r.url.path) for r in requests] == [
+        ("PUT", "/admin/api/2024-10/draft_orders/1/complete.json"),
+        ("GET", "/admin/api/2024-10/orders/count.json"),
+    ]
+
+
+def test_paginate():
+    next_url = f"{API_URL}/admin/api/2024-10/orders.json?page_info=abc"
+
+    def handler(request):
+        if "page_info" in str(request.url):
+            return httpx.Response(200, json={"orders": [3]})
+        return httpx.Response(
+            200, json={"orders": [1, 2]}, headers={"Link": f'<{next_url}>; rel="next"'}
+        )
+
+    async def main():
+        async with make_client(handler) as client:
+            return [page async for page in client.orders.all(paginate=True)]
+
+    assert run(main()) == [{"orders": [1, 2]}, {"orders": [3]}]
+
+
+def test_graphql_paginate():
+    bodies = []
+    pages = [
+        {"data": {"pageInfo": {"hasNextPage": True, "endCursor": "c1"}}},
+        {"data": {"pageInfo": {"hasNextPage": False, "endCursor": "c2"}}},
+    ]
+
+    def handler(request):
+        bodies.append(json.loads(request.content))
+        return httpx.Response(200, json=pages[len(bodies) - 1])
+
+    async def main():
+        async with make_client(handler) as client:
+            query = "query { pageInfo { hasNextPage, endCursor } }"
+            return [page async for page in client.query(query, paginate=True)]
+
+    assert run(main()) == pages
+    assert [b["variables"]["cursor"] for b in bodies] == [None, "c1"]
+
+
+def test_graphql_errors_without_data():
+    def handler(request):
+        return httpx.Response(200, json={"errors": [{"message": "boom"}]})
+
+    async def main():
+        async with make_client(handler) as client:
+            await client.query("query { key }")
+
+    with pytest.raises(GraphQLError):
+        run(main())
+
+
+def test_graphql_does_not_complete_nested_connections():
+    client = make_client(lambda request: httpx.Response(200, json={}))
+    with pytest.raises(TypeError):
+        client.query("query { key }", complete_nested=True)
+
+
+def test_graphql_batch():
+    bodies = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        bodies.append(body)
+        data = {
+            alias: {"name": body["variables"][f"{alias[:-4]}name"]}
+            for alias in re.findall(r"(b\d+__shop):", body["query"])
+        }
+        return httpx.Response(
+            200,
+            json={
+                "data": data,
+                "extensions": {"cost": {"requestedQueryCost": 2 * len(data)}},
+            },
+        )
+
+    query = "query shop($name: String) { shop { name } }"
+
+    async def main():
+        async with make_client(handler) as client:
+            async with client.query.batch(max_cost=20, workers=2) as batch:
+                items = [batch.add(query, variables={"name": n}) for n in "abc"]
+            return client.query.query_costs, [item.result()["data"] for item in items]
+
+    costs, results = run(main())
+    assert results == [{"shop": {"name": name}} for name in "abc"]
+    # Two queries fit in each request
+    assert len(bodies) == 2
+    assert costs == {query: 2}
+
+
+def test_retry_on_status_respects_retry_after(no_sleep):
+    statuses = iter([429, 503, 200])
+
+    def handler(request):
+        status = next(statuses)
+        headers = {"Retry-After": "2"} if status == 429 else {}
+        return httpx.Response(status, json={"ok": status == 200}, headers=headers)
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.shop.all()
+
+    assert run(main()) == {"ok": True}
+    assert no_sleep.call_args_list[0].args == (2.0,)
+
+
+def test_gives_up_after_status_retries():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500)
+
+    async def main():
+        async with make_client(handler) as client:
+            await client.shop.all()
+
+    # Like the blocking client, which raises requests' RetryError
+    with pytest.raises(RetryError):
+        run(main())
+    assert len(calls) == 6
+
+
+def test_exhausted_retries_count_as_failures():
+    breaker = CircuitBreaker(failure_threshold=1)
+
+    async def main():
+        async with AsyncShopifyClient(
+            api_url=API_URL,
+            api_token="test-token",
+            transport=httpx.MockTransport(lambda request: httpx.Response(429)),
+            circuit_breaker=breaker,
+        ) as client:
+            with pytest.raises(RetryError):
+                await client.shop.all()
+
+    run(main())
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_retry_on_connection_error():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) < 4:
+            raise httpx.ConnectError("Connection error")
+        return httpx.Response(200, json={"result": "success"})
+
+    async def main():
+        async with make_client(handler) as client:
+            return await client.shop.all()
+
+    assert run(main()) == {"result": "success"}
+    assert len(calls) == 4
+
+
+def test_fails_after_retry_on_read_timeout():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.ReadTimeout("Read timed out")
+
+    async def main():
+        async with make_client(handler) as client:
+            await client.shop.all()
+
+    with pytest.raises(httpx.ReadTimeout):
+        run(main())
+    assert len(calls) == 4
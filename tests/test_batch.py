@@ -0,0 +1,198 @@
+import re
+import threading
+
+import pytest
+
+from shopify_client.batch import prefix_document
+from shopify_client.exceptions import GraphQLError
+from shopify_client.graphql import GraphQL
+
+PRODUCT_BY_HANDLE = """
+query productByHandle($handle: String!) {
+  product: productByHandle(handle: $handle) {
+    ...ProductFields
+  }
+}
+
+fragment ProductFields on Product {
+  id
+  title
+}
+"""
+
+CUSTOMER_BY_EMAIL = """
+query customers($query: String) {
+  customers(first: 1, query: $query) @include(if: true) {
+    nodes { id }
+  }
+}
+"""
+
+
+@pytest.fixture
+def graphql(mock_client):
+    return GraphQL(client=mock_client)
+
+
+def test_prefix_document():
+    operation, variables, selections, fragments = prefix_document(
+        PRODUCT_BY_HANDLE, "b0__"
+    )
+    assert operation == "query"
+    assert variables == "$b0__handle: String!"
+    assert selections.startswith(
+        "b0__product: productByHandle(handle: $b0__handle) {\n    ...b0__ProductFields"
+    )
+    assert fragments == ["fragment b0__ProductFields on Product {\n  id\n  title\n}"]
+
+
+def test_prefix_document_aliases_root_fields():
+    _, variables, selections, _ = prefix_document(CUSTOMER_BY_EMAIL, "b1__")
+    assert variables == "$b1__query: String"
+    assert selections.startswith(
+        "b1__customers: customers(first: 1, query: $b1__query) @include(if: true) {"
+    )
+    assert prefix_document("{ shop { name } }", "b2__") == (
+        "query",
+        "",
+        "b2__shop: shop { name }",
+        [],
+    )
+
+
+def test_batch_merges_queries_into_one_request(graphql, mock_client):
+    mock_client.post.return_value = {
+        "data": {
+            "b0__product": {"id": "gid://shopify/Product/1", "title": "A"},
+            "b1__customers": None,
+        },
+        "errors": [{"message": "Access denied", "path": ["b1__customers"]}],
+        "extensions": {"cost": {"requestedQueryCost": 4}},
+    }
+
+    with graphql.batch() as batch:
+        product = batch.add(query=PRODUCT_BY_HANDLE, variables={"handle": "a"})
+        customer = batch.add(query=CUSTOMER_BY_EMAIL, variables={"query": "b@c.d"})
+
+    assert mock_client.post.call_count == 1
+    payload = mock_client.post.call_args.kwargs["json"]
+    assert payload["query"].startswith(
+        "query($b0__handle: String!, $b1__query: String) {"
+    )
+    assert payload["variables"] == {"b0__handle": "a", "b1__query": "b@c.d"}
+
+    assert product.result()["data"] == {
+        "product": {"id": "gid://shopify/Product/1", "title": "A"}
+    }
+    assert "errors" not in product.response
+    assert customer.response["data"] == {"customers": None}
+    assert customer.response["errors"] == [
+        {"message": "Access denied", "path": ["customers"]}
+    ]
+
+
+def test_batch_splits_requests_by_cost_and_operation(graphql, mock_client):
+    mock_client.post.return_value = {"data": {}}
+    batch = graphql.batch(max_cost=25, default_cost=10)
+    for handle in "abc":
+        batch.add(query=PRODUCT_BY_HANDLE, variables={"handle": handle})
+    batch.add(query="mutation { tagsAdd(id: 1, tags: []) { node { id } } }")
+
+    batch.send()
+
+    documents = [
+        call.kwargs["json"]["query"] for call in mock_client.post.call_args_list
+    ]
+    assert len(documents) == 3
+    assert documents[0].count("productByHandle") == 2
+    assert documents[1].count("productByHandle") == 1
+    assert documents[2].startswith("mutation {")
+    assert batch.items == []
+
+
+def test_batch_request_errors_reach_every_query(graphql, mock_client):
+    mock_client.post.return_value = {
+        "data": None,
+        "errors": [{"message": "Internal error"}],
+    }
+    batch = graphql.batch()
+    items = [batch.add(query="{ shop { name } }") for _ in range(2)]
+
+    batch.send()
+
+    for item in items:
+        with pytest.raises(GraphQLError):
+            item.result()
+
+
+def test_batch_books_estimated_cost(graphql, mock_client, mocker):
+    graphql.cost_limiter = mocker.Mock()
+    graphql.cost_limiter.reserve.return_value = 0
+    graphql.query_costs["{ shop { name } }"] = 30
+    mock_client.post.return_value = {"data": {}}
+
+    batch = graphql.batch()
+    batch.add(query="{ shop { name } }")
+    batch.add(query="{ shop { id } }")
+    batch.send()
+
+    graphql.cost_limiter.reserve.assert_called_once_with(40)
+    assert list(graphql.query_costs) == ["{ shop { name } }"]
+
+
+def test_batch_records_observed_costs(graphql, mock_client):
+    mock_client.post.return_value = {
+        "data": {},
+        "extensions": {"cost": {"requestedQueryCost": 30}},
+    }
+    graphql.query_costs["{ shop { name } }"] = 20
+
+    batch = graphql.batch()
+    batch.add(query="{ shop { name } }")
+    batch.add(query="{ shop { id } }")
+    batch.send()
+
+    # Shared in proportion to the estimates, 20 and the default 10
+    assert graphql.query_costs == {"{ shop { name } }": 20, "{ shop { id } }": 10}
+
+    mock_client.post.return_value = {
+        "data": {},
+        "extensions": {
+            "cost": {
+                "requestedQueryCost": 30,
+                "fields": [
+                    {"path": ["b2__shop"], "requestedTotalCost": 4},
+                    {"path": ["b2__shop", "name"], "requestedTotalCost": 0},
+                    {"path": ["b3__shop"], "requestedTotalCost": 26},
+                ],
+            }
+        },
+    }
+    batch.add(query="{ shop { name } }")
+    batch.add(query="{ shop { id } }")
+    batch.send()
+
+    # Debug costs give each query its own
+    assert graphql.query_costs == {"{ shop { name } }": 4, "{ shop { id } }": 26}
+
+
+def test_batch_sends_requests_concurrently(graphql, mock_client):
+    barrier = threading.Barrier(2, timeout=5)
+
+    def post(url, json):
+        # Only returns once both requests are in flight
+        barrier.wait()
+        (alias,) = re.findall(r"(b\d+__shop):", json["query"])
+        return {"data": {alias: {"name": "Shop"}}}
+
+    mock_client.post.side_effect = post
+    batch = graphql.batch(max_cost=10, workers=2)
+    items = [batch.add(query="{ shop { name } }") for _ in range(2)]
+
+    batch.send()
+
+    assert mock_client.post.call_count == 2
+    assert [item.result()["data"] for item in items] == [
+        {"shop": {"name": "Shop"}},
+        {"shop": {"name": "Shop"}},
+    ]
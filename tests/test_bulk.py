@@ -0,0 +1,169 @@
+import json
+
+import pytest
+
+from shopify_client import RETRY_STRATEGY
+from shopify_client.bulk import DOWNLOAD_TIMEOUT, BulkQuery, reassemble
+from shopify_client.exceptions import BulkOperationError, GraphQLError
+from shopify_client.graphql import GraphQL
+
+JSONL = [
+    {"id": "gid://shopify/Product/1", "title": "A"},
+    {"id": "gid://shopify/ProductVariant/11", "__parentId": "gid://shopify/Product/1"},
+    {
+        "id": "gid://shopify/InventoryLevel/111",
+        "__parentId": "gid://shopify/ProductVariant/11",
+    },
+    {"id": "gid://shopify/ProductVariant/12", "__parentId": "gid://shopify/Product/1"},
+    {"id": "gid://shopify/Product/2", "title": "B"},
+    {
+        "__typename": "Image",
+        "src": "b.png",
+        "__parentId": "gid://shopify/Product/2",
+    },
+]
+
+
+@pytest.fixture
+def graphql(mock_client):
+    return GraphQL(client=mock_client)
+
+
+@pytest.fixture
+def jsonl_file(tmp_path):
+    path = tmp_path / "result.jsonl"
+    path.write_text("\n".join(json.dumps(line) for line in JSONL) + "\n")
+    return path
+
+
+def operation(status, url=None, id="gid://shopify/BulkOperation/1"):
+    return {
+        "data": {
+            "currentBulkOperation": {
+                "id": id,
+                "status": status,
+                "errorCode": "ACCESS_DENIED" if status == "FAILED" else None,
+                "objectCount": "6",
+                "url": url,
+                "partialDataUrl": None,
+            }
+        }
+    }
+
+
+STARTED = {
+    "data": {
+        "bulkOperationRunQuery": {
+            "bulkOperation": {
+                "id": "gid://shopify/BulkOperation/1",
+                "status": "CREATED",
+            },
+            "userErrors": [],
+        }
+    }
+}
+
+
+def test_reassemble_nests_children_onto_parents():
+    lines = [json.dumps(line) for line in JSONL]
+    records = list(reassemble(lines))
+
+    assert records == [
+        {
+            "id": "gid://shopify/Product/1",
+            "title": "A",
+            "ProductVariant": [
+                {
+                    "id": "gid://shopify/ProductVariant/11",
+                    "InventoryLevel": [{"id": "gid://shopify/InventoryLevel/111"}],
+                },
+                {"id": "gid://shopify/ProductVariant/12"},
+            ],
+        },
+        {
+            "id": "gid://shopify/Product/2",
+            "title": "B",
+            "Image": [{"__typename": "Image", "src": "b.png"}],
+        },
+    ]
+
+
+def test_reassemble_yields_records_as_soon_as_complete():
+    lines = iter([json.dumps(line) for line in JSONL])
+    records = reassemble(lines)
+    first = next(records)
+    assert first["id"] == "gid://shopify/Product/1"
+    # Only the lines up to the next top-level record have been consumed
+    assert json.loads(next(lines))["__typename"] == "Image"
+
+
+def test_bulk_query_polls_and_streams_results(graphql, mock_client, jsonl_file, mocker):
+    sleep = mocker.patch("shopify_client.bulk.time.sleep")
+    mock_client.post.side_effect = [
+        STARTED,
+        operation("CREATED"),
+        operation("RUNNING"),
+        operation("COMPLETED", url=jsonl_file.as_uri()),
+    ]
+
+    records = list(graphql.bulk(query="{ products { edges { node { id } } } }"))
+
+    assert [record["id"] for record in records] == [
+        "gid://shopify/Product/1",
+        "gid://shopify/Product/2",
+    ]
+    assert mock_client.post.call_args_list[0].kwargs["json"]["variables"] == {
+        "query": "{ products { edges { node { id } } } }"
+    }
+    assert [c.args for c in sleep.call_args_list] == [(1,), (2,)]
+
+
+def test_bulk_query_without_results(graphql, mock_client):
+    mock_client.post.side_effect = [STARTED, operation("COMPLETED")]
+    assert list(graphql.bulk(query="{ products { edges { node { id } } } }")) == []
+
+
+def test_bulk_query_raises_on_failed_operation(graphql, mock_client):
+    mock_client.post.side_effect = [STARTED, operation("FAILED")]
+    with pytest.raises(BulkOperationError, match="ACCESS_DENIED"):
+        list(graphql.bulk(query="{ products { edges { node { id } } } }"))
+
+
+def test_bulk_query_only_waits_for_its_operation(graphql, mock_client):
+    mock_client.post.side_effect = [
+        STARTED,
+        operation("COMPLETED", id="gid://shopify/BulkOperation/2"),
+    ]
+    with pytest.raises(AssertionError, match="BulkOperation/1"):
+        list(graphql.bulk(query="{ products { edges { node { id } } } }"))
+
+
+def test_bulk_query_raises_on_user_errors(graphql, mock_client):
+    mock_client.post.return_value = {
+        "data": {
+            "bulkOperationRunQuery": {
+                "bulkOperation": None,
+                "userErrors": [{"field": ["query"], "message": "Invalid"}],
+            }
+        }
+    }
+    with pytest.raises(GraphQLError, match="Invalid"):
+        BulkQuery(graphql).run("{ bad }")
+
+
+def test_bulk_query_downloads_over_http(graphql, mocker):
+    response = mocker.MagicMock()
+    response.__enter__.return_value = response
+    response.iter_lines.return_value = iter([json.dumps(line) for line in JSONL])
+    session = mocker.patch("shopify_client.bulk.requests.Session").return_value
+    session.__enter__.return_value = session
+    session.get.return_value = response
+
+    records = list(BulkQuery(graphql).records("https://storage.example.com/result"))
+
+    session.get.assert_called_once_with(
+        "https://storage.example.com/result", stream=True, timeout=DOWNLOAD_TIMEOUT
+    )
+    adapter = session.mount.call_args.args[1]
+    assert adapter.max_retries is RETRY_STRATEGY
+    assert len(records) == 2
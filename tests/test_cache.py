@@ -0,0 +1,142 @@
+import pytest
+
+from shopify_client import ShopifyClient
+from shopify_client.cache import ResponseCache, resource_name
+
+BASE_URL = "https://test-shop.myshopify.com/admin/api/2024-10"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def response(mocker, status_code=200, headers=None, body=None):
+    return mocker.Mock(status_code=status_code, headers=headers or {}, body=body)
+
+
+@pytest.mark.parametrize(
+    "url, name",
+    [
+        (f"{BASE_URL}/products/1.json?fields=id", "products"),
+        (f"{BASE_URL}/shop.json", "shop"),
+        ("products/1/metafields.json", "products"),
+    ],
+)
+def test_resource_name(url, name):
+    assert resource_name(url) == name
+
+
+def test_cache_hit_and_expiry(clock, mocker):
+    cache = ResponseCache(ttl=10, clock=clock)
+    cached = response(mocker)
+    cache.store("shop.json", cached)
+
+    assert cache.lookup("shop.json") == (cached, True)
+    clock.now = 11
+    assert cache.lookup("shop.json") == (None, False)
+    assert cache.stats == {
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+        "revalidations": 0,
+        "size": 0,
+    }
+
+
+def test_cache_per_resource_ttl(clock, mocker):
+    cache = ResponseCache(ttl=10, ttls={"shop": 3600, "orders": 0}, clock=clock)
+    cache.store("shop.json", response(mocker))
+    cache.store("orders.json", response(mocker))
+    clock.now = 100
+
+    assert cache.lookup("shop.json")[1] is True
+    assert len(cache) == 1
+
+
+def test_cache_evicts_least_recently_used(mocker):
+    cache = ResponseCache(max_entries=2)
+    cache.store("a.json", response(mocker))
+    cache.store("b.json", response(mocker))
+    cache.lookup("a.json")
+    cache.store("c.json", response(mocker))
+
+    assert cache.lookup("b.json") == (None, False)
+    assert cache.lookup("a.json")[1] is True
+    assert cache.evictions == 1
+
+
+def test_cache_ignores_errors(mocker):
+    cache = ResponseCache()
+    cache.store("a.json", response(mocker, status_code=404))
+    assert len(cache) == 0
+
+
+def test_cache_invalidates_resource(mocker):
+    cache = ResponseCache()
+    cache.store(f"{BASE_URL}/products/1.json", response(mocker))
+    cache.store(f"{BASE_URL}/products.json?limit=5", response(mocker))
+    cache.store(f"{BASE_URL}/shop.json", response(mocker))
+
+    cache.invalidate(f"{BASE_URL}/products/1/metafields.json")
+
+    assert len(cache) == 1
+
+
+@pytest.fixture
+def cached_client():
+    return ShopifyClient(
+        api_url="https://test-shop.myshopify.com",
+        api_token="test-token",
+        cache=ResponseCache(ttl=60),
+    )
+
+
+def test_client_serves_repeated_gets_from_cache(cached_client, mocker):
+    session_request = mocker.patch(
+        "requests.Session.request", return_value=response(mocker, body="shop")
+    )
+
+    first = cached_client.get("shop.json")
+    second = cached_client.get("shop.json")
+
+    assert first is second
+    assert session_request.call_count == 1
+    assert cached_client.cache.hits == 1
+
+
+def test_client_invalidates_cache_on_write(cached_client, mocker):
+    session_request = mocker.patch(
+        "requests.Session.request", return_value=response(mocker)
+    )
+
+    cached_client.get("products/1.json")
+    cached_client.put("products/1.json", json={"product": {}})
+    cached_client.get("products/1.json")
+
+    assert session_request.call_count == 3
+
+
+def test_client_revalidates_with_etag(cached_client, mocker, clock):
+    cached_client.cache.clock = clock
+    original = response(mocker, headers={"ETag": '"abc"'}, body="product")
+    session_request = mocker.patch(
+        "requests.Session.request",
+        side_effect=[original, response(mocker, status_code=304)],
+    )
+
+    cached_client.get("products/1.json")
+    clock.now = 120
+    revalidated = cached_client.get("products/1.json")
+
+    assert revalidated is original
+    assert session_request.call_args.kwargs["headers"] == {"If-None-Match": '"abc"'}
+    assert cached_client.cache.revalidations == 1
@@ -20,7 +20,7 @@ def test_request_with_versioning(shopify_client, mocker):
 
 
 def test_parse_response_success(shopify_client, mocker):
-    mock_response = mocker.Mock(status_code=200, json=lambda: {"key": "value"})
+    mock_response = mocker.Mock(status_code=200, content=b'{"key": "value"}')
     parsed = shopify_client.parse_response(mock_response)
     assert parsed == {"key": "value"}
 
@@ -33,3 +33,28 @@ def test_parse_response_error(shopify_client, mocker):
 
     with pytest.raises(requests.exceptions.HTTPError):
         shopify_client.parse_response(mock_response)
+
+
+def test_endpoints_are_built_on_first_access(shopify_client):
+    assert "orders" not in vars(shopify_client)
+    assert "query" not in vars(shopify_client)
+
+    orders = shopify_client.orders
+
+    assert shopify_client.orders is orders
+    assert orders.endpoint == "orders"
+    assert orders.refunds.sub_endpoint == "refunds"
+    assert "products" not in vars(shopify_client)
+
+
+def test_nested_endpoints(shopify_client):
+    assert shopify_client.products.images.sub_endpoint == "images"
+    assert shopify_client.products.metafields.sub_endpoint == "metafields"
+    assert shopify_client.draft_orders.metafields.endpoint == "draft_orders"
+    assert not hasattr(shopify_client.webhooks, "metafields")
+
+
+def test_resource_names(shopify_client):
+    names = shopify_client.resource_names()
+    assert len(names) == 44
+    assert "products" in names and "query" not in names
@@ -0,0 +1,100 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from shopify_client import ShopifyClient
+from shopify_client.coalesce import RequestCoalescer, coalescing_key
+
+
+def wait_until(condition, timeout=1):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out"
+        time.sleep(0.001)
+
+
+def concurrently(coalescer, key, function, callers=3):
+    # Starts every caller while the first call is held in flight
+    release = threading.Event()
+
+    def held():
+        release.wait(1)
+        return function()
+
+    with ThreadPoolExecutor(max_workers=callers) as executor:
+        futures = [executor.submit(coalescer.call, key, held) for _ in range(callers)]
+        wait_until(lambda: coalescer.deduplicated == callers - 1)
+        release.set()
+    return futures
+
+
+def test_coalescer_shares_one_call():
+    coalescer = RequestCoalescer()
+    results = [object()]
+
+    futures = concurrently(coalescer, "key", results.pop)
+
+    assert len({id(future.result()) for future in futures}) == 1
+    assert coalescer.stats == {"calls": 1, "deduplicated": 2, "in_flight": 0}
+
+    # Nothing is kept once the call returned
+    assert coalescer.call("key", lambda: "again") == "again"
+    assert coalescer.calls == 2
+
+
+def test_coalescer_shares_errors():
+    coalescer = RequestCoalescer()
+
+    def fail():
+        raise ValueError("boom")
+
+    for future in concurrently(coalescer, "key", fail):
+        with pytest.raises(ValueError, match="boom"):
+            future.result()
+    assert coalescer.stats["in_flight"] == 0
+
+
+def test_coalescing_key():
+    query = {"query": "query { shop { name } }", "variables": None}
+    mutation = {"query": "mutation { tagsAdd(id: 1, tags: []) { node { id } } }"}
+
+    assert coalescing_key("GET", "shop.json", {}, "graphql.json") is not None
+    assert coalescing_key("GET", "shop.json", {"params": {"a": 1}}, "graphql.json") != (
+        coalescing_key("GET", "shop.json", {"params": {"a": 2}}, "graphql.json")
+    )
+    assert coalescing_key("POST", "graphql.json", {"json": query}, "graphql.json")
+    assert (
+        coalescing_key("POST", "graphql.json", {"json": mutation}, "graphql.json")
+        is None
+    )
+    assert (
+        coalescing_key("POST", "orders.json", {"json": query}, "graphql.json") is None
+    )
+    assert coalescing_key("PUT", "shop.json", {}, "graphql.json") is None
+    assert coalescing_key("GET", "shop.json", {"stream": True}, "graphql.json") is None
+
+
+def test_client_coalesces_identical_reads(mocker):
+    response = mocker.Mock(status_code=200, headers={})
+    session_request = mocker.patch("requests.Session.request", return_value=response)
+    client = ShopifyClient(
+        api_url="https://test-shop.myshopify.com",
+        api_token="test-token",
+        coalescer=RequestCoalescer(),
+    )
+    release = threading.Event()
+    session_request.side_effect = lambda *args, **kwargs: release.wait(1) and response
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [executor.submit(client.get, "products/1.json") for _ in range(3)]
+        wait_until(lambda: client.coalescer.deduplicated == 2)
+        release.set()
+
+    assert [future.result() for future in futures] == [response] * 3
+    assert session_request.call_count == 1
+
+    client.put("products/1.json", json={"product": {}})
+    assert session_request.call_count == 2
+    assert client.coalescer.calls == 1
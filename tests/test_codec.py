@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from shopify_client import ShopifyClient
+from shopify_client.aio import AsyncShopifyClient
+from shopify_client.codec import JSONCodec, OrjsonCodec, get_codec
+from shopify_client.concurrency import AdaptiveLimiter
+
+CODEC_NAMES = ["json", "orjson", "msgspec"]
+
+
+@pytest.fixture(params=CODEC_NAMES)
+def codec(request):
+    if request.param != "json":
+        pytest.importorskip(request.param)
+    return get_codec(request.param)
+
+
+def test_codec_round_trip(codec):
+    payload = {"order": {"id": 1, "note": "Café ☕", "tags": [], "total": 4.5}}
+    encoded = codec.dumps(payload)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == payload
+    assert codec.loads(json.dumps(payload).encode()) == payload
+
+
+def test_codec_raises_json_decode_error(codec):
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads(b"<html>Bad gateway</html>")
+
+
+def test_get_codec():
+    assert isinstance(get_codec(), JSONCodec)
+    custom = JSONCodec()
+    assert get_codec(custom) is custom
+    with pytest.raises(AssertionError):
+        get_codec("yaml")
+
+    pytest.importorskip("orjson")
+    assert isinstance(get_codec("auto"), OrjsonCodec)
+
+
+def test_client_encodes_and_decodes_with_codec(mocker):
+    codec = mocker.Mock(wraps=JSONCodec())
+    session_request = mocker.patch(
+        "requests.Session.request",
+        return_value=mocker.Mock(status_code=201, headers={}, content=b'{"id":1}'),
+    )
+    client = ShopifyClient(
+        api_url="https://test-shop.myshopify.com", api_token="test-token", codec=codec
+    )
+
+    assert client.products.create(json={"product": {"title": "Soap"}}) == {"id": 1}
+    assert session_request.call_args.kwargs["data"] == b'{"product":{"title":"Soap"}}'
+    assert "json" not in session_request.call_args.kwargs
+    codec.loads.assert_called_once_with(b'{"id":1}')
+
+
+def test_async_client_encodes_with_codec():
+    bodies = []
+
+    def handler(request):
+        bodies.append(request.content)
+        return httpx.Response(200, content=b'{"data": {"shop": {"name": "A"}}}')
+
+    async def main():
+        async with AsyncShopifyClient(
+            api_url="https://test-shop.myshopify.com",
+            api_token="test-token",
+            transport=httpx.MockTransport(handler),
+            codec="json",
+        ) as client:
+            return await client.query(query="{ shop { name } }")
+
+    assert asyncio.run(main()) == {"data": {"shop": {"name": "A"}}}
+    assert bodies == [
+        b'{"query":"{ shop { name } }","variables":null,"operationName":null}'
+    ]
+
+
+def test_client_does_not_take_a_slot_for_bodies_failing_to_encode(mocker):
+    session_request = mocker.patch("requests.Session.request")
+    client = ShopifyClient(
+        api_url="https://test-shop.myshopify.com",
+        api_token="test-token",
+        concurrency_limiter=AdaptiveLimiter(initial=1),
+    )
+
+    for _ in range(2):
+        # Would block forever on the second call if the first kept its slot
+        with pytest.raises(TypeError):
+            client.products.create({"product": {"x": object()}})
+
+    assert client.concurrency_limiter.in_flight == 0
+    session_request.assert_not_called()
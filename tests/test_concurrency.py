@@ -0,0 +1,234 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from shopify_client import ShopifyClient
+from shopify_client.aio import AsyncShopifyClient
+from shopify_client.concurrency import (
+    AdaptiveLimiter,
+    AsyncAdaptiveLimiter,
+    CircuitBreaker,
+)
+from shopify_client.exceptions import CassetteMissError, CircuitOpenError
+from shopify_client.pool import ShopifyClientPool
+from shopify_client.replay import Cassette, ReplayAdapter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def complete(limiter, clock, latency=0.1, statuses=(200,)):
+    token = limiter.acquire()
+    clock.now += latency
+    limiter.release(token, statuses)
+
+
+def test_limiter_increases_additively(clock):
+    limiter = AdaptiveLimiter(initial=4, maximum=6, clock=clock)
+    # About one more request in flight per round of requests
+    for _ in range(5):
+        complete(limiter, clock)
+    assert limiter.limit == 5
+
+    for _ in range(20):
+        complete(limiter, clock)
+    assert limiter.limit == 6
+    assert limiter.in_flight == 0
+
+
+def test_limiter_backs_off_once_per_overload(clock):
+    limiter = AdaptiveLimiter(initial=8, clock=clock)
+    tokens = [limiter.acquire() for _ in range(3)]
+    clock.now += 0.1
+
+    # Requests sent before the first back-off don't back off again
+    limiter.release(tokens[0], [429, 200])
+    limiter.release(tokens[1], [503])
+    limiter.release(tokens[2], failed=True)
+    assert limiter.limit == 4
+
+    complete(limiter, clock, statuses=(429,))
+    assert limiter.limit == 2
+    for _ in range(5):
+        complete(limiter, clock, statuses=(500,))
+    assert limiter.limit == 1
+
+
+def test_limiter_backs_off_on_latency_spikes(clock):
+    limiter = AdaptiveLimiter(initial=10, maximum=10, warmup=5, clock=clock)
+    for _ in range(5):
+        complete(limiter, clock, latency=0.1)
+    assert limiter.latency == pytest.approx(0.1)
+
+    complete(limiter, clock, latency=0.2)
+    assert limiter.limit == 10
+    complete(limiter, clock, latency=1.0)
+    assert limiter.limit == 5
+
+
+def test_limiter_blocks_at_limit():
+    limiter = AdaptiveLimiter(initial=1)
+    token = limiter.acquire()
+    acquired = threading.Event()
+
+    def acquire():
+        limiter.acquire()
+        acquired.set()
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    assert not acquired.wait(0.05)
+
+    limiter.release(token, [200])
+    assert acquired.wait(1)
+    thread.join()
+    assert limiter.in_flight == 1
+
+
+def test_async_limiter_blocks_at_limit():
+    limiter = AsyncAdaptiveLimiter(initial=1)
+    order = []
+
+    async def request(name):
+        token = await limiter.acquire()
+        order.append(f"{name} started")
+        await asyncio.sleep(0.01)
+        order.append(f"{name} done")
+        await limiter.release(token, [200])
+
+    async def main():
+        await asyncio.gather(request("a"), request("b"))
+
+    asyncio.run(main())
+
+    assert order == ["a started", "a done", "b started", "b done"]
+
+
+def test_circuit_breaker_opens_and_recovers(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+    for _ in range(3):
+        breaker.check()
+        breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError, match="retry in 30.0s"):
+        breaker.check()
+
+    # A single trial request is let through once the timeout elapsed
+    clock.now = 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.check()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    breaker.record(False)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock.now = 60
+    breaker.check()
+    breaker.record(True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.check()
+
+
+def test_client_reports_outcomes(mocker):
+    send = mocker.patch(
+        "requests.Session.request",
+        return_value=mocker.Mock(
+            status_code=503,
+            headers={},
+            raw=mocker.Mock(retries=mocker.Mock(history=[mocker.Mock(status=429)])),
+        ),
+    )
+    limiter = mocker.Mock(spec=AdaptiveLimiter)
+    limiter.acquire.return_value = 1.0
+    client = ShopifyClient(
+        api_url="https://test-shop.myshopify.com",
+        api_token="test-token",
+        concurrency_limiter=limiter,
+        circuit_breaker=CircuitBreaker(failure_threshold=2),
+    )
+
+    client.request("GET", "products.json")
+    client.request("POST", "graphql.json")
+    with pytest.raises(CircuitOpenError):
+        client.request("GET", "products.json")
+
+    assert send.call_count == 2
+    limiter.release.assert_called_with(1.0, [429, 503], failed=False)
+
+
+def half_open_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.check()
+    breaker.record(False)
+    clock.now = 30
+    return breaker
+
+
+def test_client_frees_slot_and_trial_on_other_errors(clock, tmp_path):
+    (tmp_path / "empty.jsonl").touch()
+    client = ShopifyClient(
+        api_url="https://test-shop.myshopify.com",
+        api_token="test-token",
+        adapter=ReplayAdapter(Cassette(tmp_path / "empty.jsonl")),
+        concurrency_limiter=AdaptiveLimiter(initial=1),
+        circuit_breaker=half_open_breaker(clock),
+    )
+
+    for _ in range(2):
+        # The second request would block, or fail fast, if the first leaked
+        with pytest.raises(CassetteMissError):
+            client.products.all()
+
+    assert client.concurrency_limiter.in_flight == 0
+    assert client.concurrency_limiter.limit == 1
+    assert client.circuit_breaker.failures == 1
+    assert client.circuit_breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_async_client_frees_slot_and_trial_on_cancellation(clock):
+    async def handler(request):
+        await asyncio.sleep(60)
+
+    async def main():
+        async with AsyncShopifyClient(
+            api_url="https://test-shop.myshopify.com",
+            api_token="test-token",
+            transport=httpx.MockTransport(handler),
+            concurrency_limiter=AsyncAdaptiveLimiter(initial=1),
+            circuit_breaker=half_open_breaker(clock),
+        ) as client:
+            for _ in range(2):
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(client.products.all(), timeout=0.01)
+            return client
+
+    client = asyncio.run(main())
+    assert client.concurrency_limiter.in_flight == 0
+    assert client.circuit_breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_pool_gives_each_shop_a_limiter_and_breaker():
+    pool = ShopifyClientPool(adaptive=True)
+    pool.add("a.myshopify.com", api_token="token-a")
+    pool.add("b.myshopify.com", api_token="token-b")
+    a, b = pool["a.myshopify.com"], pool["b.myshopify.com"]
+
+    assert isinstance(a.concurrency_limiter, AdaptiveLimiter)
+    assert isinstance(a.circuit_breaker, CircuitBreaker)
+    assert a.concurrency_limiter is not b.concurrency_limiter
+
+    # New credentials keep the state learned about the shop
+    pool.add("a.myshopify.com", api_token="token-c")
+    assert pool["a.myshopify.com"].circuit_breaker is a.circuit_breaker
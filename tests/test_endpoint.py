@@ -14,47 +14,47 @@ def test_prepare_params(endpoint):
         ("list[]", "item1"),
         ("list[]", "item2"),
     ]
-    result = endpoint._Endpoint__prepare_params(**params)
+    result = endpoint._prepare_params(**params)
     assert result == expected
 
 
 def test_build_url_basic(endpoint):
-    url = endpoint._Endpoint__build_url(resource_id=1)
+    url = endpoint._build_url(resource_id=1)
     assert url == "test_endpoint/1.json"
 
 
 def test_build_url_with_params(endpoint):
-    url = endpoint._Endpoint__build_url(resource_id=1, action="test", param="value")
+    url = endpoint._build_url(resource_id=1, action="test", param="value")
     assert url == "test_endpoint/1/test.json?param=value"
 
 
 def test_build_url_for_sub_endpoint_create(endpoint):
     endpoint.sub_endpoint = "metafields"
-    url = endpoint._Endpoint__build_url(resource_id=1)
+    url = endpoint._build_url(resource_id=1)
     assert url == "test_endpoint/1/metafields.json"
 
 
 def test_build_url_for_sub_endpoint_get(endpoint):
     endpoint.sub_endpoint = "metafields"
-    url = endpoint._Endpoint__build_url(resource_id=1, sub_resource_id=2)
+    url = endpoint._build_url(resource_id=1, sub_resource_id=2)
     assert url == "test_endpoint/1/metafields/2.json"
 
 
 def test_build_url_for_sub_endpoint_all(endpoint):
     endpoint.sub_endpoint = "metafields"
-    url = endpoint._Endpoint__build_url(resource_id=1)
+    url = endpoint._build_url(resource_id=1)
     assert url == "test_endpoint/1/metafields.json"
 
 
 def test_build_url_for_sub_endpoint_update(endpoint):
     endpoint.sub_endpoint = "metafields"
-    url = endpoint._Endpoint__build_url(resource_id=1, sub_resource_id=2)
+    url = endpoint._build_url(resource_id=1, sub_resource_id=2)
     assert url == "test_endpoint/1/metafields/2.json"
 
 
 def test_build_url_for_sub_endpoint_delete(endpoint):
     endpoint.sub_endpoint = "metafields"
-    url = endpoint._Endpoint__build_url(resource_id=1, sub_resource_id=2)
+    url = endpoint._build_url(resource_id=1, sub_resource_id=2)
     assert url == "test_endpoint/1/metafields/2.json"
 
 
@@ -0,0 +1,103 @@
+import csv
+import io
+
+import pytest
+
+from shopify_client.export import export, extract, parse_path
+from shopify_client.models import Order
+from tests.test_stream import streamed_response
+
+ORDERS = [
+    {
+        "id": i,
+        "customer": {"email": f"c{i}@example.com"} if i % 2 else None,
+        "line_items": [{"sku": f"SKU-{i}-{n}"} for n in range(i % 3)],
+        "note": None,
+    }
+    for i in range(5)
+]
+COLUMNS = {"id": "id", "email": "customer.email", "skus": "line_items[].sku"}
+
+
+def test_extract_paths():
+    order = ORDERS[1]
+    assert extract(order, parse_path("customer.email")) == "c1@example.com"
+    assert extract(order, parse_path("line_items[].sku")) == ["SKU-1-0"]
+    assert extract(ORDERS[0], parse_path("customer.email")) is None
+    assert extract(order, parse_path("unknown.key")) is None
+
+    # Models, and GraphQL connections in place of lists
+    assert extract(Order.from_dict(order), parse_path("line_items[].sku")) == [
+        "SKU-1-0"
+    ]
+    node = {"lineItems": {"edges": [{"node": {"sku": "A"}}, {"node": {"sku": "B"}}]}}
+    assert extract(node, parse_path("lineItems[].sku")) == ["A", "B"]
+
+
+def test_export_csv_in_batches():
+    sink = io.StringIO()
+    assert export(iter(ORDERS), COLUMNS, sink, format="csv", batch_size=2) == 5
+
+    rows = list(csv.reader(io.StringIO(sink.getvalue())))
+    assert rows[0] == ["id", "email", "skus"]
+    assert rows[1] == ["0", "", "[]"]
+    assert rows[2] == ["1", "c1@example.com", '["SKU-1-0"]']
+    assert len(rows) == 6
+
+
+def test_export_writes_header_of_empty_export(tmp_path):
+    path = tmp_path / "orders.csv"
+    assert export([], ["id", "name"], path) == 0
+    assert path.read_text().splitlines() == ["id,name"]
+
+
+def test_export_requires_known_format(tmp_path):
+    with pytest.raises(AssertionError):
+        export(ORDERS, ["id"], tmp_path / "orders.xlsx")
+    with pytest.raises(AssertionError):
+        export(ORDERS, ["id"], io.StringIO())
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_export_arrow_formats(tmp_path, suffix):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    path = tmp_path / f"orders{suffix}"
+    columns = dict(COLUMNS, note="note")
+    assert export(ORDERS, columns, path, batch_size=2) == 5
+
+    if suffix == ".parquet":
+        assert pyarrow.parquet.ParquetFile(path).metadata.num_row_groups == 3
+        table = pyarrow.parquet.read_table(path)
+    else:
+        table = pyarrow.ipc.open_file(path).read_all()
+    # Only nulls in the first batch: typed as strings from there on
+    assert table.schema.field("email").type == pa.string()
+    assert table.schema.field("note").type == pa.string()
+    assert table.schema.field("skus").type == pa.list_(pa.string())
+    assert table.column("email").to_pylist() == [
+        None,
+        "c1@example.com",
+        None,
+        "c3@example.com",
+        None,
+    ]
+    assert table.column("skus").to_pylist()[2] == ["SKU-2-0", "SKU-2-1"]
+
+
+def test_endpoint_export_streams_records(endpoint, mock_client, mocker):
+    mock_client.get.side_effect = [
+        streamed_response(
+            mocker,
+            {"test_endpoint": ORDERS[:3]},
+            links={"next": {"url": "test_endpoint.json?page_info=2"}},
+        ),
+        streamed_response(mocker, {"test_endpoint": ORDERS[3:]}),
+    ]
+    sink = io.StringIO()
+
+    assert endpoint.export(["id"], sink, format="csv", limit=3) == 5
+    assert sink.getvalue().split() == ["id", "0", "1", "2", "3", "4"]
+    assert mock_client.get.call_args_list[0].args == ("test_endpoint.json?limit=3",)
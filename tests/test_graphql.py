@@ -4,6 +4,7 @@ import requests
 import pytest
 from shopify_client.exceptions import GraphQLError
 from shopify_client.graphql import GraphQL
+from shopify_client.throttle import CostBucket
 from tests.conftest import CopyingMock
 
 
@@ -147,6 +148,22 @@ def test_graphql_query_paginated(graphql, mock_client, mocker):
     )
 
 
+def test_graphql_query_paginated_with_prefetch(graphql, mock_client):
+    pages = [
+        {"data": {"pageInfo": {"hasNextPage": True, "endCursor": "cursor-1"}}},
+        {"data": {"pageInfo": {"hasNextPage": False, "endCursor": "cursor-2"}}},
+    ]
+    mock_client.post = CopyingMock(side_effect=pages)
+    response = list(
+        graphql(
+            query="query { pageInfo { hasNextPage, endCursor } }",
+            paginate=True,
+            prefetch=1,
+        )
+    )
+    assert response == pages
+
+
 def test_paginated_query_requires_page_info(graphql, mock_client):
     with pytest.raises(AssertionError):
         list(graphql(query="query { items { id } }", paginate=True))
@@ -217,3 +234,61 @@ def test_graphql_query_handles_none_data_with_errors(graphql, mock_client):
         mock_logger.error.assert_called_once_with(
             "GraphQL errors: [{'message': 'Some error occurred'}]"
         )
+
+
+def cost_extension(requested, actual, available):
+    return {
+        "cost": {
+            "requestedQueryCost": requested,
+            "actualQueryCost": actual,
+            "throttleStatus": {
+                "maximumAvailable": 1000.0,
+                "currentlyAvailable": available,
+                "restoreRate": 50.0,
+            },
+        }
+    }
+
+
+def test_graphql_query_waits_for_requested_cost(mock_client, mocker):
+    sleep = mocker.patch("shopify_client.graphql.time.sleep")
+    clock = mocker.Mock(return_value=0.0)
+    graphql = GraphQL(client=mock_client, cost_limiter=CostBucket(clock=clock))
+    mock_client.post.side_effect = [
+        {"data": {"key": 1}, "extensions": cost_extension(600, 500, 500)},
+        {"data": {"key": 2}, "extensions": cost_extension(600, 500, 0)},
+    ]
+
+    graphql(query="query { key }")
+    sleep.assert_not_called()
+
+    graphql(query="query { key }")
+    # 500 points left and 600 requested: wait for 100 points at 50/s
+    sleep.assert_called_once_with(pytest.approx(2.0))
+    assert graphql.query_costs == {"query { key }": 600}
+    assert graphql.cost_limiter.available == 0
+
+
+def test_graphql_query_refunds_failed_queries(mock_client):
+    graphql = GraphQL(client=mock_client, cost_limiter=CostBucket())
+    graphql.query_costs["query { key }"] = 300
+    mock_client.post.side_effect = requests.ConnectionError
+
+    with pytest.raises(requests.ConnectionError):
+        graphql(query="query { key }")
+    assert graphql.cost_limiter.available == 1000
+
+
+def test_graphql_query_retries_throttled_queries(mock_client, mocker):
+    mocker.patch("shopify_client.graphql.time.sleep")
+    graphql = GraphQL(client=mock_client, cost_limiter=CostBucket())
+    throttled = {
+        "data": None,
+        "errors": [{"message": "Throttled", "extensions": {"code": "THROTTLED"}}],
+        "extensions": cost_extension(100, None, 50),
+    }
+    success = {"data": {"key": "value"}, "extensions": cost_extension(100, 10, 40)}
+    mock_client.post.side_effect = [throttled, success]
+
+    assert graphql(query="query { key }") == success
+    assert mock_client.post.call_count == 2
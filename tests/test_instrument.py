@@ -0,0 +1,182 @@
+import asyncio
+import datetime
+import json
+
+import httpx
+import pytest
+from urllib3.util.retry import RequestHistory
+
+from shopify_client.aio import AsyncShopifyClient
+from shopify_client.instrument import (
+    Histogram,
+    RequestEvent,
+    RequestStats,
+    endpoint_name,
+    graphql_cost,
+)
+
+COST = {
+    "requestedQueryCost": 12,
+    "actualQueryCost": 4,
+    "throttleStatus": {
+        "maximumAvailable": 2000.0,
+        "currentlyAvailable": 1996,
+        "restoreRate": 100.0,
+    },
+}
+
+
+@pytest.mark.parametrize(
+    "url, name",
+    [
+        ("orders.json?limit=250", "orders"),
+        ("orders/450789469/refunds/1.json", "orders/:id/refunds/:id"),
+        ("orders/1/cancel.json", "orders/:id/cancel"),
+        ("https://shop.myshopify.com/admin/api/2024-10/shop.json", "shop"),
+        ("graphql.json", "graphql"),
+    ],
+)
+def test_endpoint_name(url, name):
+    assert endpoint_name(url) == name
+
+
+def test_graphql_cost():
+    body = json.dumps({"data": {"cost": 1}, "extensions": {"cost": COST}}).encode()
+    assert graphql_cost(body) == COST
+    assert graphql_cost(b'{"data": {"cost": {"amount": 1}}}') is None
+    assert graphql_cost(b'{"data": {}}') is None
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for millisecond in range(1, 1001):
+        histogram.add(millisecond / 1000)
+
+    assert histogram.percentile(50) == pytest.approx(0.5, rel=0.1)
+    assert histogram.percentile(99) == pytest.approx(0.99, rel=0.1)
+    assert histogram.percentile(100) == 1.0
+    assert histogram.mean == pytest.approx(0.5005)
+    assert Histogram().percentile(50) is None
+
+
+def test_request_stats_summary():
+    stats = RequestStats()
+    for total_time in (0.1, 0.2, 0.3):
+        stats(
+            RequestEvent(
+                "request",
+                "GET",
+                f"orders/{total_time * 10:.0f}.json",
+                status=200,
+                total_time=total_time,
+                response_bytes=100,
+                call_limit="30/40",
+            )
+        )
+    stats(
+        RequestEvent("retry", "GET", "shop.json", status=429, retry_reason="status 429")
+    )
+    stats(
+        RequestEvent(
+            "request", "GET", "shop.json", status=500, retries=1, total_time=0.05
+        )
+    )
+
+    slowest, shop = stats.summary()
+
+    assert slowest["endpoint"] == "orders/:id"
+    assert slowest["count"] == 3
+    assert slowest["response_bytes"] == 300
+    assert slowest["min_headroom"] == 10
+    assert slowest["p99"] == pytest.approx(0.3, rel=0.1)
+    assert shop["errors"] == 1
+    assert shop["retries"] == 1
+    assert shop["retry_reasons"] == {"status 429": 1}
+
+
+def plain_response(mocker, content=b"{}"):
+    response = mocker.Mock(
+        status_code=200, headers={}, content=content, elapsed=datetime.timedelta()
+    )
+    response.request.body = None
+    response.raw.retries = None
+    return response
+
+
+def test_failing_observer_does_not_fail_requests(shopify_client, mocker):
+    mocker.patch("requests.Session.request", return_value=plain_response(mocker))
+    shopify_client.observers.append(mocker.Mock(side_effect=ValueError))
+
+    assert shopify_client.get("shop.json").status_code == 200
+
+
+def test_client_reports_requests_and_retries(shopify_client, mocker):
+    response = mocker.Mock(
+        status_code=200,
+        headers={"X-Shopify-Shop-Api-Call-Limit": "32/40"},
+        content=b'{"orders": []}',
+        elapsed=datetime.timedelta(milliseconds=40),
+    )
+    response.request.body = b'{"order": {}}'
+    response.raw.retries.history = (
+        RequestHistory("POST", "/orders.json", None, 429, None),
+        RequestHistory("POST", "/orders.json", ConnectionError(), None, None),
+    )
+    mocker.patch("requests.Session.request", return_value=response)
+    events = []
+    shopify_client.observers.append(events.append)
+
+    shopify_client.post("orders.json", json={"order": {}})
+
+    first_retry, second_retry, request = events
+    assert (first_retry.kind, first_retry.retry_reason) == ("retry", "status 429")
+    assert second_retry.retry_reason == "ConnectionError"
+    assert request.kind == "request"
+    assert request.endpoint == "orders"
+    assert request.retries == 2
+    assert request.ttfb == 0.04
+    assert request.total_time >= 0
+    assert (request.request_bytes, request.response_bytes) == (13, 14)
+    assert request.call_limit == "32/40"
+
+
+def test_client_reports_graphql_cost(shopify_client, mocker):
+    response = plain_response(
+        mocker, json.dumps({"data": {}, "extensions": {"cost": COST}}).encode()
+    )
+    response.json.return_value = {"data": {}}
+    mocker.patch("requests.Session.request", return_value=response)
+    stats = RequestStats()
+    shopify_client.observers.append(stats)
+
+    shopify_client.query(query="{ shop { name } }")
+
+    assert stats["POST", "graphql"].graphql_cost == 4
+
+
+def test_async_client_reports_requests_and_retries(mocker):
+    mocker.patch("shopify_client.aio.asyncio.sleep")
+    statuses = iter([503, 200])
+
+    def handler(request):
+        return httpx.Response(next(statuses), json={"shop": {}})
+
+    events = []
+
+    async def main():
+        async with AsyncShopifyClient(
+            api_url="https://test-shop.myshopify.com",
+            api_token="test-token",
+            transport=httpx.MockTransport(handler),
+            observers=[events.append],
+        ) as client:
+            await client.shop.all()
+
+    asyncio.run(main())
+
+    retry, request = events
+    assert retry.retry_reason == "status 503"
+    assert request.status == 200
+    assert request.retries == 1
+    assert request.response_bytes == len(b'{"shop":{}}')
+    assert request.connect_time is None
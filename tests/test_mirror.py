@@ -0,0 +1,147 @@
+import threading
+
+import pytest
+import requests
+
+from shopify_client.endpoint import Endpoint
+from shopify_client.mirror import Mirror
+from shopify_client.models import Variant
+
+
+def product(product_id, updated_at, skus):
+    return {
+        "id": product_id,
+        "handle": f"product-{product_id}",
+        "updated_at": f"2024-01-01T{updated_at}-05:00",
+        "variants": [
+            {"id": product_id * 10 + index, "sku": sku, "barcode": None}
+            for index, sku in enumerate(skus)
+        ],
+    }
+
+
+@pytest.fixture
+def client(mock_client, mocker):
+    mock_client.parse_response.side_effect = lambda response: response.json()
+    client = mocker.Mock()
+    client.products = Endpoint(client=mock_client, endpoint="products")
+    client.orders = Endpoint(client=mock_client, endpoint="orders")
+    return client
+
+
+@pytest.fixture
+def mirror(tmp_path, client):
+    return Mirror(str(tmp_path / "mirror.db"), client)
+
+
+def serve(mock_client, mocker, key, *pages):
+    responses = []
+    for index, records in enumerate(pages):
+        response = mocker.Mock(spec=requests.Response)
+        response.json.return_value = {key: records}
+        last = index == len(pages) - 1
+        response.links = {} if last else {"next": {"url": f"page-{index + 1}"}}
+        responses.append(response)
+    mock_client.get.side_effect = responses
+
+
+def test_sync_populates_and_resumes(mirror, mock_client, mocker):
+    serve(
+        mock_client,
+        mocker,
+        "products",
+        [product(1, "10:00:00", ["A", "B"])],
+        [product(2, "11:00:00", ["C"])],
+    )
+    assert mirror.sync("products") == 2
+
+    assert mirror.variant_by_sku("C") == {
+        "id": 20,
+        "product_id": 2,
+        "sku": "C",
+        "barcode": None,
+    }
+    assert mirror.find("products", handle="product-1")[0]["id"] == 1
+    assert isinstance(mirror.variant_by_sku("A", model=Variant), Variant)
+    assert mirror.variant_by_sku("Z") is None
+
+    # The next sync lists what changed since the checkpoint, variants included
+    serve(mock_client, mocker, "products", [product(1, "12:00:00", ["A"])])
+    assert mirror.sync("products") == 1
+    url = mock_client.get.call_args.args[0]
+    assert "updated_at_min=2024-01-01T10%3A55%3A00-05%3A00" in url
+    assert mirror.variant_by_sku("B") is None
+    assert mirror.get("variants", 10)["sku"] == "A"
+
+
+def test_older_versions_are_not_applied(mirror):
+    assert mirror.apply_webhook("products/update", product(1, "12:00:00", ["A"]))
+    # Same instant in another offset is not older
+    newer = dict(product(1, "12:00:00", ["B"]), updated_at="2024-01-01T17:00:00Z")
+    assert mirror.apply_webhook("products/update", newer)
+
+    assert not mirror.apply_webhook("products/update", product(1, "11:00:00", ["C"]))
+    assert mirror.variant_by_sku("B")["id"] == 10
+    assert mirror.variant_by_sku("C") is None
+
+
+def test_records_of_unknown_version_do_not_replace_stored_ones(mirror):
+    assert mirror.apply_webhook("products/update", product(1, "12:00:00", ["A"]))
+    unversioned = product(1, "13:00:00", ["B"])
+    del unversioned["updated_at"]
+
+    assert not mirror.apply_webhook("products/update", unversioned)
+    assert mirror.variant_by_sku("A")["id"] == 10
+
+
+def test_partial_webhooks_are_ignored(mirror):
+    customer = {"id": 1, "email": "a@example.com", "updated_at": "2024-01-01T10:00:00Z"}
+    assert mirror.apply_webhook("customers/create", customer)
+    consent = {"customer_id": 1, "email_address": "b@example.com"}
+    assert not mirror.apply_webhook("customers/marketing_consent_update", consent)
+    assert mirror.get("customers", 1) == customer
+
+    assert not mirror.apply_webhook("orders/edited", {"order_edit": {"id": 1}})
+
+
+def test_apply_webhooks(mirror):
+    order = {
+        "id": 5,
+        "name": "#1005",
+        "email": "a@example.com",
+        "customer": {"id": 9},
+        "updated_at": "2024-01-01T10:00:00Z",
+    }
+    assert mirror.apply_webhook("orders/create", order)
+    assert mirror.order_by_name("#1005") == order
+    assert mirror.find("orders", customer_id=9) == [order]
+    assert not mirror.apply_webhook("app/uninstalled", {"id": 1})
+
+    paid = dict(order, financial_status="paid", updated_at="2024-01-01T11:00:00Z")
+    assert mirror.apply_webhook("orders/paid", paid)
+    assert mirror.get("orders", 5) == paid
+
+    mirror.apply_webhook("products/create", product(1, "10:00:00", ["A"]))
+    assert mirror.apply_webhook("products/delete", {"id": 1})
+    assert mirror.get("products", 1) is None
+    assert mirror.variant_by_sku("A") is None
+
+
+def test_lookups_from_threads(mirror):
+    mirror.apply_webhook("customers/create", {"id": 1, "email": "a@example.com"})
+    found = []
+    thread = threading.Thread(
+        target=lambda: found.append(mirror.customer_by_email("a@example.com"))
+    )
+    thread.start()
+    thread.join()
+    assert found == [{"id": 1, "email": "a@example.com"}]
+
+
+def test_invalid_lookups(mirror):
+    with pytest.raises(AssertionError):
+        mirror.find("orders", total_price="1.00")
+    with pytest.raises(AssertionError):
+        mirror.find("webhooks", id=1)
+    with pytest.raises(AssertionError):
+        mirror.sync("variants")
@@ -0,0 +1,143 @@
+import pytest
+
+from shopify_client.endpoint import Endpoint
+from shopify_client.graphql import GraphQL
+from shopify_client.models import (
+    Customer,
+    InventoryLevel,
+    LineItem,
+    Order,
+    Product,
+    projection,
+)
+
+REST_ORDER = {
+    "id": 1,
+    "name": "#1001",
+    "currency": "USD",
+    "total_price": "9.98",
+    "client_details": {"browser_ip": "203.0.113.7"},
+    "customer": {"id": 7, "email": "a@example.com"},
+    "line_items": [{"id": 10, "sku": "SOAP", "quantity": 2}],
+}
+
+
+@pytest.fixture
+def orders(mock_client):
+    return Endpoint(client=mock_client, endpoint="orders")
+
+
+def test_from_dict_decodes_nested_records():
+    order = Order.from_dict(REST_ORDER)
+    assert order.name == "#1001"
+    assert order.customer == Customer.from_dict({"id": 7, "email": "a@example.com"})
+    assert order.line_items[0].sku == "SOAP"
+    assert order.email is None
+    assert not hasattr(order, "client_details")
+    with pytest.raises(AttributeError):
+        order.client_details = {}
+
+
+def test_decode_graphql_connection():
+    data = {
+        "edges": [
+            {
+                "node": {
+                    "id": "gid://shopify/Order/1",
+                    "financialStatus": "PAID",
+                    "lineItems": {"nodes": [{"id": "gid://shopify/LineItem/10"}]},
+                }
+            }
+        ]
+    }
+    [order] = Order.decode(data)
+    assert order.financial_status == "PAID"
+    assert order.line_items == [LineItem.from_dict({"id": "gid://shopify/LineItem/10"})]
+
+
+def test_projection():
+    assert projection(None) is None
+    assert projection("id, name") == projection(["id", "name"]) == {"id", "name"}
+
+    order = Order.from_dict(REST_ORDER, projection("id,name"))
+    assert (order.id, order.name, order.total_price, order.line_items) == (
+        1,
+        "#1001",
+        None,
+        None,
+    )
+
+
+def test_as_dict_round_trips():
+    order = Order.from_dict(REST_ORDER)
+    assert order.as_dict()["customer"]["email"] == "a@example.com"
+    assert Order.from_dict(order.as_dict()) == order
+    assert order != Product.from_dict({"id": 1})
+    assert repr(order) == "<Order 1>"
+
+
+def test_models_are_hashable():
+    order = Order.from_dict(REST_ORDER)
+    assert {order, Order.from_dict(REST_ORDER)} == {order}
+    assert len({order, Product.from_dict({"id": 1})}) == 2
+    assert len({order.customer, *order.line_items}) == 2
+
+    level = {"inventory_item_id": 1, "location_id": 2, "available": 3}
+    levels = {InventoryLevel.from_dict(level), InventoryLevel.from_dict(level)}
+    assert levels == {InventoryLevel.from_dict(level)}
+    assert len(levels | {InventoryLevel.from_dict({**level, "location_id": 3})}) == 2
+
+
+def test_endpoint_decodes_pages_into_models(orders, mock_client, mocker):
+    mock_client.get.side_effect = [
+        mocker.Mock(links={"next": {"url": "orders.json?page_info=2"}}),
+        mocker.Mock(links={}),
+    ]
+    mock_client.parse_response.side_effect = [
+        {"orders": [REST_ORDER]},
+        {"orders": [dict(REST_ORDER, id=2)]},
+    ]
+
+    pages = list(orders.all(paginate=True, model=Order, fields="id,name"))
+
+    assert [[order.id for order in page] for page in pages] == [[1], [2]]
+    assert pages[0][0].total_price is None
+    assert mock_client.get.call_args_list[0].args == ("orders.json?fields=id%2Cname",)
+
+
+def test_endpoint_get_decodes_model(orders, mock_client):
+    mock_client.get.return_value = {"order": REST_ORDER}
+    order = orders.get(1, model=Order)
+    assert isinstance(order, Order)
+    assert order.total_price == "9.98"
+
+
+def test_graphql_paginated_query_decodes_models(mock_client):
+    mock_client.post.side_effect = [
+        {
+            "data": {
+                "orders": {
+                    "nodes": [{"id": "gid://shopify/Order/1", "name": "#1001"}],
+                    "pageInfo": {"hasNextPage": True, "endCursor": "c1"},
+                }
+            }
+        },
+        {
+            "data": {
+                "orders": {
+                    "nodes": [{"id": "gid://shopify/Order/2", "name": "#1002"}],
+                    "pageInfo": {"hasNextPage": False, "endCursor": "c2"},
+                }
+            }
+        },
+    ]
+    query = (
+        "query ($cursor: String, $page_size: Int) { orders(first: $page_size, "
+        "after: $cursor) { nodes { id name } pageInfo { hasNextPage endCursor } } }"
+    )
+
+    pages = list(GraphQL(client=mock_client)(query=query, paginate=True, model=Order))
+
+    assert [[order.name for order in page] for page in pages] == [["#1001"], ["#1002"]]
+    with pytest.raises(AssertionError):
+        GraphQL(client=mock_client)(query=query, model=Order)
@@ -0,0 +1,207 @@
+import pytest
+
+from shopify_client.graphql import GraphQL
+from shopify_client.nested import parse_connection
+
+ORDERS = """
+query orders($page_size: Int = 100, $cursor: String, $sku: String, $unused: Int) {
+  orders(first: $page_size, after: $cursor) {
+    nodes {
+      id
+      items: lineItems(first: 2, query: $sku) @include(if: true) {
+        nodes { ...LineItemFields }
+        pageInfo { hasNextPage endCursor }
+      }
+    }
+    pageInfo { hasNextPage endCursor }
+  }
+}
+
+fragment LineItemFields on LineItem { id sku }
+fragment Unused on Order { id }
+"""
+
+
+def line_items(*ids, has_next_page=False):
+    return {
+        "nodes": [{"id": id} for id in ids],
+        "pageInfo": {"hasNextPage": has_next_page, "endCursor": ids[-1]},
+    }
+
+
+def order(id, items):
+    return {"id": f"gid://shopify/Order/{id}", "items": items}
+
+
+@pytest.fixture
+def graphql(mock_client):
+    return GraphQL(client=mock_client)
+
+
+def test_parse_connection():
+    connection = parse_connection(ORDERS, ("orders", "nodes", "items"))
+    assert connection.field == "lineItems"
+    assert connection.arguments == "query: $sku"
+    assert connection.variable_definitions == {"sku": "$sku: String"}
+    assert connection.fragments == ["fragment LineItemFields on LineItem { id sku }"]
+
+    query = connection.query("Order")
+    assert "node(id: $nested_id) {\n    ... on Order {" in query
+    assert (
+        "connection: lineItems(query: $sku, first: $nested_page_size, "
+        "after: $nested_cursor) {" in query
+    )
+    assert "fragment Unused" not in query
+
+
+def test_paginate_completes_nested_connections(graphql, mock_client):
+    mock_client.post.side_effect = [
+        {
+            "data": {
+                "orders": {
+                    "nodes": [
+                        order(1, line_items("a", "b", has_next_page=True)),
+                        order(2, line_items("c")),
+                        order(3, line_items("d", "e", has_next_page=True)),
+                    ],
+                    "pageInfo": {"hasNextPage": False, "endCursor": "3"},
+                }
+            }
+        },
+        # Both truncated connections are completed by one merged request
+        {
+            "data": {
+                "b0__node": {"connection": line_items("b2", has_next_page=True)},
+                "b1__node": {"connection": line_items("e2")},
+            }
+        },
+        {"data": {"b0__node": {"connection": line_items("b3")}}},
+    ]
+
+    pages = list(
+        graphql(
+            query=ORDERS,
+            variables={"sku": "SOAP"},
+            paginate=True,
+            complete_nested=True,
+            nested_page_size=50,
+        )
+    )
+
+    assert len(pages) == 1
+    orders = pages[0]["data"]["orders"]["nodes"]
+    assert [item["id"] for item in orders[0]["items"]["nodes"]] == [
+        "a",
+        "b",
+        "b2",
+        "b3",
+    ]
+    assert orders[0]["items"]["pageInfo"] == {"hasNextPage": False, "endCursor": "b3"}
+    assert [item["id"] for item in orders[2]["items"]["nodes"]] == ["d", "e", "e2"]
+
+    assert mock_client.post.call_count == 3
+    payload = mock_client.post.call_args_list[1].kwargs["json"]
+    assert payload["variables"] == {
+        "b0__sku": "SOAP",
+        "b0__nested_id": "gid://shopify/Order/1",
+        "b0__nested_page_size": 50,
+        "b0__nested_cursor": "b",
+        "b1__sku": "SOAP",
+        "b1__nested_id": "gid://shopify/Order/3",
+        "b1__nested_page_size": 50,
+        "b1__nested_cursor": "e",
+    }
+    assert (
+        mock_client.post.call_args_list[2].kwargs["json"]["variables"][
+            "b0__nested_cursor"
+        ]
+        == "b2"
+    )
+
+
+def test_query_completes_nested_connections(graphql, mock_client):
+    query = """
+    query order($id: ID!) {
+      order(id: $id) {
+        id
+        items: lineItems(first: 2) { nodes { id } pageInfo { hasNextPage endCursor } }
+      }
+    }
+    """
+    mock_client.post.side_effect = [
+        {"data": {"order": order(1, line_items("a", "b", has_next_page=True))}},
+        {"data": {"b0__node": None}},
+    ]
+
+    response = graphql(query=query, variables={"id": 1}, complete_nested=True)
+
+    # The order was deleted in between, the connection is left as it was
+    assert response["data"]["order"]["items"]["pageInfo"]["hasNextPage"] is True
+    assert [item["id"] for item in response["data"]["order"]["items"]["nodes"]] == [
+        "a",
+        "b",
+    ]
+
+
+def test_query_leaves_top_level_connections_to_pagination(graphql, mock_client):
+    mock_client.post.side_effect = [
+        {
+            "data": {
+                "orders": {
+                    "nodes": [order(1, line_items("a", has_next_page=True))],
+                    "pageInfo": {"hasNextPage": True, "endCursor": "1"},
+                }
+            }
+        },
+        {"data": {"b0__node": {"connection": line_items("a2")}}},
+    ]
+
+    response = graphql(query=ORDERS, complete_nested=True)
+
+    orders = response["data"]["orders"]
+    assert [item["id"] for item in orders["nodes"][0]["items"]["nodes"]] == [
+        "a",
+        "a2",
+    ]
+    assert orders["pageInfo"] == {"hasNextPage": True, "endCursor": "1"}
+    assert mock_client.post.call_count == 2
+
+
+def test_completing_nested_connections_requires_parent_id(graphql, mock_client):
+    mock_client.post.return_value = {
+        "data": {
+            "orders": {
+                "nodes": [{"items": line_items("a", has_next_page=True)}],
+                "pageInfo": {"hasNextPage": False, "endCursor": "1"},
+            }
+        }
+    }
+    with pytest.raises(AssertionError, match="must select their 'id'"):
+        list(graphql(query=ORDERS, paginate=True, complete_nested=True))
+
+
+def test_paginate_reads_page_info_of_outer_connection(graphql, mock_client):
+    mock_client.post.side_effect = [
+        {
+            "data": {
+                "orders": {
+                    "nodes": [order(1, line_items("a", has_next_page=True))],
+                    "pageInfo": {"hasNextPage": True, "endCursor": "1"},
+                }
+            }
+        },
+        {
+            "data": {
+                "orders": {
+                    "nodes": [],
+                    "pageInfo": {"hasNextPage": False, "endCursor": None},
+                }
+            }
+        },
+    ]
+
+    pages = list(graphql(query=ORDERS, paginate=True))
+
+    # Inner connections are left truncated unless asked to complete them
+    assert len(pages) == 2
+    assert mock_client.post.call_count == 2
@@ -14,6 +14,13 @@ def test_cancel_order(orders_endpoint, mock_client):
     assert response == {"result": "cancelled"}
 
 
+def test_cancel_order_with_body(orders_endpoint, mock_client):
+    orders_endpoint.cancel(1, json={"reason": "customer"}, email=True)
+    mock_client.request.assert_called_once_with(
+        "POST", "orders/1/cancel.json?email=True", json={"reason": "customer"}
+    )
+
+
 def test_transactions_sub_endpoint(orders_endpoint):
     assert isinstance(orders_endpoint.transactions, Endpoint)
     assert orders_endpoint.transactions.endpoint == "orders"
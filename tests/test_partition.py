@@ -0,0 +1,162 @@
+import json
+from datetime import datetime, timezone
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from shopify_client import ShopifyClient
+from shopify_client.partition import (
+    balance_windows,
+    id_ranges,
+    merge,
+    time_windows,
+)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def query_params(url):
+    return {k: v[0] for k, v in parse_qs(urlparse(url).query).items()}
+
+
+def test_time_windows_are_disjoint():
+    windows = time_windows("2024-01-01T00:00:00Z", "2024-01-01T00:00:30Z", 3)
+    assert windows == [
+        (utc(2024, 1, 1, 0, 0, 0), utc(2024, 1, 1, 0, 0, 9)),
+        (utc(2024, 1, 1, 0, 0, 10), utc(2024, 1, 1, 0, 0, 19)),
+        (utc(2024, 1, 1, 0, 0, 20), utc(2024, 1, 1, 0, 0, 30)),
+    ]
+
+
+def test_id_ranges_are_disjoint():
+    assert id_ranges(0, 100, 4) == [(0, 25), (25, 50), (50, 75), (75, 100)]
+
+
+def test_balance_windows_by_count():
+    windows = [(i, i) for i in range(8)]
+    counts = [100, 0, 0, 0, 0, 0, 50, 50]
+    assert balance_windows(windows, counts, 2) == [(0, 0), (1, 7)]
+
+
+def test_merge_ordered_keeps_partition_order():
+    partitions = [iter([1, 2]), iter([3]), iter([4, 5, 6])]
+    generators = [(page for page in pages) for pages in partitions]
+    assert list(merge(generators, workers=3, ordered=True)) == [1, 2, 3, 4, 5, 6]
+
+
+def test_merge_unordered_yields_every_page():
+    generators = [(page for page in range(i * 10, i * 10 + 3)) for i in range(4)]
+    assert sorted(merge(generators, workers=2)) == sorted(
+        page for i in range(4) for page in range(i * 10, i * 10 + 3)
+    )
+
+
+def test_merge_reraises_errors():
+    def failing():
+        raise ValueError("boom")
+        yield
+
+    with pytest.raises(ValueError):
+        list(merge([failing()], workers=1))
+
+
+def test_partitioned_by_time(endpoint, mock_client, mocker):
+    mock_client.get.side_effect = lambda url: mocker.Mock(
+        links={}, json=query_params(url)
+    )
+    mock_client.parse_response.side_effect = lambda response: response.json
+
+    pages = list(
+        endpoint.partitioned(
+            2,
+            created_at_min="2024-01-01T00:00:00Z",
+            created_at_max="2024-01-02T00:00:00Z",
+            status="any",
+            ordered=True,
+        )
+    )
+
+    assert pages == [
+        {
+            "created_at_min": "2024-01-01T00:00:00+00:00",
+            "created_at_max": "2024-01-01T11:59:59+00:00",
+            "status": "any",
+        },
+        {
+            "created_at_min": "2024-01-01T12:00:00+00:00",
+            "created_at_max": "2024-01-02T00:00:00+00:00",
+            "status": "any",
+        },
+    ]
+
+
+def test_partitioned_by_time_balanced_with_count(mocker):
+    counted = []
+
+    def send(request, **kwargs):
+        params = query_params(request.url)
+        if urlparse(request.url).path.endswith("/orders/count.json"):
+            counted.append(params)
+            # Most orders were created in the first window
+            body = {
+                "count": 10 if params["created_at_min"].endswith(":00+00:00") else 1
+            }
+        else:
+            window = [params["created_at_min"], params["created_at_max"]]
+            body = {"orders": [{"window": window}]}
+        response = requests.Response()
+        response.status_code = 200
+        response.url = request.url
+        response._content = json.dumps(body).encode()
+        return response
+
+    mocker.patch("requests.adapters.HTTPAdapter.send", side_effect=send)
+    client = ShopifyClient(api_url="https://test-shop.myshopify.com", api_token="t")
+
+    pages = list(
+        client.orders.partitioned(
+            2,
+            created_at_min="2024-01-01T00:00:00Z",
+            created_at_max="2024-01-01T00:01:00Z",
+            balance=True,
+            ordered=True,
+            status="any",
+        )
+    )
+
+    assert len(counted) == 8
+    assert all(params["status"] == "any" for params in counted)
+    assert [page["orders"][0]["window"] for page in pages] == [
+        ["2024-01-01T00:00:00+00:00", "2024-01-01T00:00:06+00:00"],
+        ["2024-01-01T00:00:07+00:00", "2024-01-01T00:01:00+00:00"],
+    ]
+
+
+def test_partitioned_by_id_stops_at_range_end(endpoint, mock_client, mocker):
+    def get(url):
+        since_id = int(query_params(url)["since_id"])
+        records = [{"id": since_id + 1}, {"id": since_id + 60}]
+        return mocker.Mock(
+            links={"next": {"url": "more"}}, json={"test_endpoint": records}
+        )
+
+    mock_client.get.side_effect = get
+    mock_client.parse_response.side_effect = lambda response: response.json
+
+    pages = list(endpoint.partitioned(2, by="id", max_id=100, ordered=True))
+
+    assert pages == [
+        {"test_endpoint": [{"id": 1}]},
+        {"test_endpoint": [{"id": 51}]},
+    ]
+    assert mock_client.get.call_count == 2
+
+
+def test_partitioned_requires_bounds(endpoint):
+    with pytest.raises(AssertionError):
+        endpoint.partitioned(2, created_at_min="2024-01-01T00:00:00Z")
+    with pytest.raises(AssertionError):
+        endpoint.partitioned(2, by="id")
@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from shopify_client import ShopifyClient
+from shopify_client.pool import ShopifyClientPool, shop_domain
+
+
+@pytest.fixture
+def pool():
+    pool = ShopifyClientPool(max_clients=2)
+    for shop in ("a", "b", "c"):
+        pool.add(f"{shop}.myshopify.com", api_token=f"token-{shop}")
+    return pool
+
+
+def test_shop_domain():
+    assert shop_domain("https://Shop.myshopify.com/") == "shop.myshopify.com"
+    assert shop_domain("shop.myshopify.com") == "shop.myshopify.com"
+
+
+def test_pool_hands_out_configured_clients(pool):
+    client = pool.get("https://a.myshopify.com")
+
+    assert isinstance(client, ShopifyClient)
+    assert client.api_url == "https://a.myshopify.com"
+    assert client.headers["X-Shopify-Access-Token"] == "token-a"
+    assert pool["a.myshopify.com"] is client
+    assert client.products.endpoint == "products"
+
+
+def test_pool_shares_one_adapter(pool):
+    first, second = pool.get("a.myshopify.com"), pool.get("b.myshopify.com")
+    assert first.get_adapter("https://") is pool.adapter
+    assert second.get_adapter("https://") is pool.adapter
+
+
+def test_pool_evicts_least_recently_used_clients(pool):
+    a = pool.get("a.myshopify.com")
+    b = pool.get("b.myshopify.com")
+    pool.get("a.myshopify.com")
+    pool.get("c.myshopify.com")
+
+    assert len(pool) == 2
+    assert pool.get("a.myshopify.com") is a
+    assert pool.get("b.myshopify.com") is not b
+
+
+def test_pool_keeps_rate_state_of_evicted_shops(pool):
+    limiter = pool.get("a.myshopify.com").rate_limiter
+    pool.get("b.myshopify.com")
+    pool.get("c.myshopify.com")
+
+    rebuilt = pool.get("a.myshopify.com")
+    assert rebuilt.rate_limiter is limiter
+    assert (
+        rebuilt.query.cost_limiter is not pool.get("b.myshopify.com").query.cost_limiter
+    )
+
+
+def test_pool_registers_shops_on_get():
+    pool = ShopifyClientPool(throttle=False)
+    client = pool.get("d.myshopify.com", api_token="token-d", api_version="2025-01")
+
+    assert client.api_version == "2025-01"
+    assert client.rate_limiter is None
+    assert pool.get("d.myshopify.com", api_token="token-d") is client
+
+    rotated = pool.get("d.myshopify.com", api_token="token-e")
+    assert rotated is not client
+    assert rotated.api_version == "2025-01"
+
+
+def test_pool_unknown_shop():
+    with pytest.raises(KeyError):
+        ShopifyClientPool().get("unknown.myshopify.com")
+
+
+def test_pool_is_thread_safe(pool):
+    clients = []
+
+    def get():
+        clients.append(pool.get("a.myshopify.com"))
+
+    threads = [threading.Thread(target=get) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(client) for client in clients}) == 1
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+
+import pytest
+import requests
+
+from shopify_client.prefetch import aprefetch, prefetch
+
+
+def test_prefetch_yields_pages_in_order():
+    pages = (page for page in range(10))
+    assert list(prefetch(pages, 2)) == list(range(10))
+
+
+def test_prefetch_fetches_ahead_within_buffer():
+    fetched = []
+    buffer_full = threading.Event()
+
+    def pages():
+        for page in range(10):
+            fetched.append(page)
+            if page == 3:
+                buffer_full.set()
+            yield page
+
+    iterator = prefetch(pages(), 2)
+    assert next(iterator) == 0
+    # Page 0 was consumed, pages 1-2 fill the buffer and page 3 waits for room
+    assert buffer_full.wait(timeout=1)
+    assert fetched == [0, 1, 2, 3]
+    iterator.close()
+
+
+def test_prefetch_reraises_errors():
+    def pages():
+        yield 1
+        raise requests.exceptions.HTTPError("boom")
+
+    iterator = prefetch(pages(), 2)
+    assert next(iterator) == 1
+    with pytest.raises(requests.exceptions.HTTPError):
+        next(iterator)
+
+
+def test_prefetch_stops_producer_on_close():
+    closed = threading.Event()
+
+    def pages():
+        try:
+            page = 0
+            while True:
+                yield page
+                page += 1
+        finally:
+            closed.set()
+
+    iterator = prefetch(pages(), 1)
+    next(iterator)
+    iterator.close()
+    assert closed.wait(timeout=1)
+
+
+def test_aprefetch_yields_pages_in_order():
+    async def pages():
+        for page in range(5):
+            yield page
+
+    async def main():
+        return [page async for page in aprefetch(pages(), 2)]
+
+    assert asyncio.run(main()) == list(range(5))
+
+
+def test_endpoint_all_with_prefetch(endpoint, mock_client, mocker):
+    mock_client.parse_response.side_effect = lambda x: x.json()
+    first = mocker.Mock(spec=requests.Response)
+    first.json.return_value = {"items": [1]}
+    first.links = {"next": {"url": "test_endpoint.json?page_info=2"}}
+    second = mocker.Mock(spec=requests.Response)
+    second.json.return_value = {"items": [2]}
+    second.links = {}
+    mock_client.get.side_effect = [first, second]
+
+    pages = list(endpoint.all(paginate=True, prefetch=2, limit=1))
+
+    assert pages == [{"items": [1]}, {"items": [2]}]
+    assert mock_client.get.call_args_list[0].args == ("test_endpoint.json?limit=1",)
@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from shopify_client import ShopifyClient
+from shopify_client.graphql import GraphQL
+from shopify_client.pool import ShopifyClientPool
+from shopify_client.registry import QueryRegistry, parse_document
+
+LIST_PRODUCTS = """
+# Products with their variants
+query listProducts($page_size: Int = 100, $cursor: String) {
+  products(first: $page_size, after: $cursor, query: "status:{active}") {
+    nodes {
+      id
+      firstVariants: variants(first: 10) @include(if: true) {
+        nodes { id }
+        pageInfo { hasNextPage endCursor }
+      }
+      ... on Product {
+        title
+      }
+    }
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+  }
+}
+"""
+
+
+@pytest.fixture
+def queries_dir(tmp_path):
+    (tmp_path / "listProducts.graphql").write_text(LIST_PRODUCTS)
+    (tmp_path / "shop.graphql").write_text("query shop { shop { name } }")
+    return tmp_path
+
+
+def test_parse_document():
+    operations, connections = parse_document(LIST_PRODUCTS)
+    assert operations == ["listProducts"]
+    assert connections == [("products", "nodes", "firstVariants"), ("products",)]
+
+
+def test_parse_anonymous_document():
+    assert parse_document("{ orders(first: 5) { edges { node { id } } } }") == (
+        [],
+        [],
+    )
+
+
+def test_registry_reads_each_query_once(queries_dir, mocker):
+    registry = QueryRegistry(str(queries_dir))
+    spy = mocker.spy(registry, "_QueryRegistry__load")
+
+    first = registry.get("listProducts")
+    second = registry.get("listProducts")
+
+    assert first is second
+    assert spy.call_count == 1
+    assert first.operations == ["listProducts"]
+    assert first.paginated is True
+
+
+def test_registry_preload(queries_dir):
+    registry = QueryRegistry(str(queries_dir)).preload()
+    assert "listProducts" in registry
+    assert "shop" in registry
+    assert registry.get("shop").paginated is False
+
+
+def test_registry_reloads_changed_files(queries_dir):
+    registry = QueryRegistry(str(queries_dir), reload=True)
+    assert registry.get("shop").operations == ["shop"]
+
+    path = queries_dir / "shop.graphql"
+    path.write_text("query shopName { shop { name } }")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert registry.get("shop").operations == ["shopName"]
+
+
+def test_graphql_query_from_name_uses_registry(queries_dir, mock_client):
+    graphql = GraphQL(client=mock_client, graphql_queries_dir=str(queries_dir))
+    assert graphql.query_from_name("shop") == "query shop { shop { name } }"
+    assert graphql.registry.get("shop") is graphql.registry.get("shop")
+
+
+def test_client_takes_a_query_registry(queries_dir, mocker):
+    registry = QueryRegistry(str(queries_dir), reload=True).preload()
+    client = ShopifyClient(
+        api_url="https://test-shop.myshopify.com",
+        api_token="test-token",
+        query_registry=registry,
+    )
+
+    assert client.query.registry is registry
+    assert client.query.graphql_queries_dir == str(queries_dir)
+    assert client.query.query_from_name("shop") == "query shop { shop { name } }"
+    with pytest.raises(AssertionError):
+        GraphQL(mocker.Mock(), graphql_queries_dir="other", query_registry=registry)
+
+
+def test_pool_shares_a_query_registry(queries_dir):
+    pool = ShopifyClientPool(graphql_queries_dir=str(queries_dir))
+    a = pool.get("a.myshopify.com", api_token="token-a")
+    b = pool.get("b.myshopify.com", api_token="token-b")
+
+    assert a.query.registry is b.query.registry is pool.query_registry
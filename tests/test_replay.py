@@ -0,0 +1,160 @@
+import gzip
+import json
+
+import pytest
+import requests
+
+from shopify_client import ShopifyClient
+from shopify_client.exceptions import CassetteMissError
+from shopify_client.replay import Cassette, RecordingAdapter, ReplayAdapter
+from shopify_client.throttle import LeakyBucket
+
+API_URL = "https://test-shop.myshopify.com"
+ORDERS_URL = f"{API_URL}/admin/api/2024-10/orders.json?limit=1"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def live_response(content, links=None, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response.reason = "OK"
+    response.headers["Content-Type"] = "application/json"
+    response.headers["X-Shopify-Shop-Api-Call-Limit"] = "1/40"
+    response.headers["X-Request-Id"] = "abc"
+    if links:
+        response.headers["Link"] = links
+    response._content = content
+    return response
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    return Cassette(tmp_path / "shop.jsonl")
+
+
+def record(cassette, mocker):
+    mocker.patch(
+        "requests.adapters.HTTPAdapter.send",
+        side_effect=[
+            live_response(
+                b'{"orders": [{"id": 1}]}',
+                links=f'<{API_URL}/admin/api/2024-10/orders.json?page_info=2>; rel="next"',
+            ),
+            live_response(b'{"orders": [{"id": 2}]}'),
+        ],
+    )
+    client = ShopifyClient(
+        api_url=API_URL, api_token="secret-token", adapter=RecordingAdapter(cassette)
+    )
+    pages = list(client.orders.all(paginate=True, limit=1))
+    cassette.close()
+    return pages
+
+
+def test_recording_keeps_responses_without_credentials(cassette, mocker):
+    assert record(cassette, mocker) == [
+        {"orders": [{"id": 1}]},
+        {"orders": [{"id": 2}]},
+    ]
+
+    [first, second] = cassette.load()
+    assert first["url"] == "/admin/api/2024-10/orders.json?limit=1"
+    assert second["url"] == "/admin/api/2024-10/orders.json?page_info=2"
+    assert first["headers"]["X-Shopify-Shop-Api-Call-Limit"] == "1/40"
+    assert "Link" in first["headers"]
+    assert "X-Request-Id" not in first["headers"]
+    assert "secret-token" not in open(cassette.path).read()
+
+
+def interaction(url, content, elapsed=0.1, headers=None):
+    return {
+        "method": "GET",
+        "url": url,
+        "body": None,
+        "status": 200,
+        "reason": "OK",
+        "headers": headers or {"X-Shopify-Shop-Api-Call-Limit": "1/40"},
+        "content": content,
+        "elapsed": elapsed,
+    }
+
+
+def test_replay_paginates_offline(cassette):
+    next_url = "/admin/api/2024-10/orders.json?page_info=2"
+    cassette.record(
+        interaction(
+            "/admin/api/2024-10/orders.json?limit=1",
+            '{"orders": [{"id": 1}]}',
+            elapsed=0.5,
+            headers={"Link": f'<{API_URL}{next_url}>; rel="next"'},
+        )
+    )
+    cassette.record(interaction(next_url, '{"orders": [{"id": 2}]}', elapsed=0.25))
+    clock = FakeClock()
+    client = ShopifyClient(
+        api_url="https://other-shop.myshopify.com",
+        api_token="token",
+        adapter=ReplayAdapter(cassette, speed=2, sleep=clock.sleep),
+    )
+
+    pages = list(client.orders.all(paginate=True, limit=1))
+
+    assert pages == [{"orders": [{"id": 1}]}, {"orders": [{"id": 2}]}]
+    # Recorded latencies, twice as fast
+    assert clock.sleeps == [0.25, 0.125]
+    with pytest.raises(CassetteMissError):
+        client.products.all()
+
+
+def test_replay_simulates_throttling(cassette):
+    cassette.record(
+        interaction("/admin/api/2024-10/orders.json?limit=1", '{"orders": []}')
+    )
+    clock = FakeClock()
+    adapter = ReplayAdapter(
+        cassette,
+        latency=0,
+        throttle=LeakyBucket(size=2, leak_rate=1, clock=clock),
+        sleep=clock.sleep,
+    )
+    client = ShopifyClient(api_url=API_URL, api_token="token", adapter=adapter)
+
+    responses = [client.get(ORDERS_URL) for _ in range(3)]
+
+    assert [r.headers["X-Shopify-Shop-Api-Call-Limit"] for r in responses] == [
+        "1/2",
+        "2/2",
+        "2/2",
+    ]
+    # The third request was rejected with a 429 and retried after Retry-After
+    assert clock.sleeps == [1]
+    assert [h.status for h in responses[2].raw.retries.history] == [429]
+    assert responses[2].json() == {"orders": []}
+
+
+def test_cassette_gzip_round_trip(tmp_path):
+    path = tmp_path / "shop.jsonl.gz"
+    content = b"\xff\xfe not utf-8".decode("utf-8", "surrogateescape")
+    with Cassette(path) as cassette:
+        cassette.record({"content": content})
+        cassette.record({"content": "{}"})
+
+    with gzip.open(path, "rt") as f:
+        assert json.loads(f.readline())["content"] == content
+    loaded = Cassette(path).load()
+    assert loaded[0]["content"].encode("utf-8", "surrogateescape") == (
+        b"\xff\xfe not utf-8"
+    )
+    assert loaded[1] == {"content": "{}"}
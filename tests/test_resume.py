@@ -0,0 +1,120 @@
+import asyncio
+
+import httpx
+import pytest
+import requests
+
+from shopify_client.aio import AsyncShopifyClient
+from shopify_client.graphql import GraphQL
+from shopify_client.resume import FINISHED
+
+QUERY = "query { products { nodes { id } pageInfo { hasNextPage endCursor } } }"
+
+
+@pytest.fixture
+def rest_pages(endpoint, mock_client, mocker):
+    """Serve a listing of three pages linked by page_info URLs."""
+    mock_client.parse_response.side_effect = lambda response: response.json()
+    urls = ["test_endpoint.json", "page-2", "page-3"]
+
+    def get(url):
+        index = urls.index(url)
+        response = mocker.Mock(spec=requests.Response)
+        response.json.return_value = {"test_endpoint": [index]}
+        next_urls = urls[index + 1 : index + 2]
+        response.links = {"next": {"url": next_urls[0]}} if next_urls else {}
+        return response
+
+    mock_client.get.side_effect = get
+
+
+@pytest.fixture
+def graphql(mock_client):
+    def post(url, json):
+        cursor = int(json["variables"]["cursor"] or 0)
+        return {
+            "data": {
+                "products": {
+                    "nodes": [{"id": cursor}],
+                    "pageInfo": {
+                        "hasNextPage": cursor < 2,
+                        "endCursor": str(cursor + 1),
+                    },
+                }
+            }
+        }
+
+    mock_client.post.side_effect = post
+    return GraphQL(client=mock_client)
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_endpoint_reports_tokens(endpoint, rest_pages, prefetch):
+    tokens = []
+    pages = endpoint.all(paginate=True, prefetch=prefetch, checkpoint=tokens.append)
+
+    assert [page["test_endpoint"] for page in pages] == [[0], [1], [2]]
+    assert tokens == ["page-2", "page-3", FINISHED]
+
+
+def test_endpoint_reports_processed_pages_only(endpoint, rest_pages):
+    tokens = []
+    for page in endpoint.all(paginate=True, checkpoint=tokens.append):
+        if page["test_endpoint"] == [1]:
+            break
+
+    # The second page was not processed, resuming fetches it again
+    assert tokens == ["page-2"]
+
+
+def test_endpoint_resumes(endpoint, mock_client, rest_pages):
+    pages = list(endpoint.all(paginate=True, resume="page-2", limit=1))
+
+    assert [page["test_endpoint"] for page in pages] == [[1], [2]]
+    assert mock_client.get.call_args_list[0].args == ("page-2",)
+
+
+def test_endpoint_resumes_finished_pagination(endpoint, mock_client, rest_pages):
+    # Not from the first page again
+    assert list(endpoint.all(paginate=True, resume=FINISHED)) == []
+    mock_client.get.assert_not_called()
+
+
+def test_graphql_reports_tokens_and_resumes(graphql, mock_client):
+    tokens = []
+    pages = graphql(query=QUERY, paginate=True, checkpoint=tokens.append)
+    assert len(list(pages)) == 3
+    assert tokens == ["1", "2", FINISHED]
+
+    pages = list(graphql(query=QUERY, paginate=True, resume="2"))
+    assert [page["data"]["products"]["nodes"] for page in pages] == [[{"id": 2}]]
+
+    assert list(graphql(query=QUERY, paginate=True, resume=FINISHED)) == []
+    assert mock_client.post.call_count == 4
+
+
+def test_async_endpoint_reports_tokens_and_resumes(mocker):
+    mocker.patch("shopify_client.aio.asyncio.sleep")
+    api_url = "https://test-shop.myshopify.com"
+    next_url = f"{api_url}/admin/api/2024-10/orders.json?page_info=abc"
+
+    def handler(request):
+        if "page_info" in str(request.url):
+            return httpx.Response(200, json={"orders": [3]})
+        return httpx.Response(
+            200, json={"orders": [1, 2]}, headers={"Link": f'<{next_url}>; rel="next"'}
+        )
+
+    async def main(**kwargs):
+        async with AsyncShopifyClient(
+            api_url=api_url,
+            api_token="test-token",
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            return [page async for page in client.orders.all(paginate=True, **kwargs)]
+
+    tokens = []
+    assert len(asyncio.run(main(checkpoint=tokens.append))) == 2
+    assert tokens == [next_url, FINISHED]
+    assert asyncio.run(main(resume=next_url)) == [{"orders": [3]}]
+    assert asyncio.run(main(resume=FINISHED)) == []
@@ -0,0 +1,132 @@
+import json
+
+import pytest
+import requests
+
+from shopify_client.exceptions import GraphQLError
+from shopify_client.graphql import GraphQL
+from shopify_client.stream import ArrayStream
+
+ORDERS = [
+    {
+        "id": i,
+        "note": 'said "hi" \\ {[,:]}',
+        "line_items": [{"sku": 'a\\"b', "props": [1, {"name": "]"}]}],
+        "café": None,
+    }
+    for i in range(20)
+]
+
+
+def chunked(document, size):
+    raw = json.dumps(document).encode()
+    return [raw[i : i + size] for i in range(0, len(raw), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 100, 1_000_000])
+def test_array_stream_yields_items_across_chunk_boundaries(size):
+    document = {"orders": ORDERS, "meta": {"values": [1, 2]}}
+    stream = ArrayStream(chunked(document, size), paths=[("orders",)])
+
+    assert list(stream) == ORDERS
+    assert stream.rest == {"orders": [], "meta": {"values": [1, 2]}}
+
+
+def test_array_stream_is_incremental():
+    chunks = iter(chunked({"orders": ORDERS}, 10))
+    first = next(iter(ArrayStream(chunks, paths=[("orders",)])))
+    assert first == ORDERS[0]
+    assert next(chunks, None) is not None
+
+
+def test_array_stream_only_streams_matching_path():
+    document = {"data": {"other": {"nodes": [{"id": 1}]}, "products": {"nodes": []}}}
+    stream = ArrayStream(chunked(document, 5), paths=[("data", "products", "nodes")])
+    assert list(stream) == []
+    assert stream.rest == document
+
+
+def test_array_stream_matched_path():
+    document = {"data": {"products": {"edges": [{"node": {"id": 1}}]}}}
+    stream = ArrayStream(
+        chunked(document, 5),
+        paths=[("data", "products", "nodes"), ("data", "products", "edges")],
+    )
+    assert list(stream) == [{"node": {"id": 1}}]
+    assert stream.matched_path == ("data", "products", "edges")
+
+
+def streamed_response(mocker, document, links=None):
+    response = mocker.MagicMock(spec=requests.Response)
+    response.__enter__.return_value = response
+    response.iter_content.return_value = iter(chunked(document, 16))
+    response.links = links or {}
+    return response
+
+
+def test_endpoint_iter_records(endpoint, mock_client, mocker):
+    mock_client.get.side_effect = [
+        streamed_response(
+            mocker,
+            {"test_endpoint": ORDERS[:2]},
+            links={"next": {"url": "test_endpoint.json?page_info=2"}},
+        ),
+        streamed_response(mocker, {"test_endpoint": ORDERS[2:3]}),
+    ]
+
+    records = list(endpoint.iter_records(limit=2))
+
+    assert records == ORDERS[:3]
+    assert mock_client.get.call_args_list[0].args == ("test_endpoint.json?limit=2",)
+    assert mock_client.get.call_args_list[0].kwargs == {"stream": True}
+
+
+def test_graphql_iter_nodes(mock_client, mocker):
+    graphql = GraphQL(client=mock_client)
+    query = "query { products { edges { node { id } } pageInfo { hasNextPage endCursor } } }"
+    pages = [
+        {
+            "data": {
+                "products": {
+                    "edges": [{"node": {"id": 1}}, {"node": {"id": 2}}],
+                    "pageInfo": {"hasNextPage": True, "endCursor": "c1"},
+                }
+            }
+        },
+        {
+            "data": {
+                "products": {
+                    "edges": [{"node": {"id": 3}}],
+                    "pageInfo": {"hasNextPage": False, "endCursor": "c2"},
+                }
+            }
+        },
+    ]
+    cursors = []
+
+    def post(url, json, stream):
+        cursors.append(json["variables"]["cursor"])
+        return streamed_response(mocker, pages[len(cursors) - 1])
+
+    mock_client.post.side_effect = post
+
+    assert list(graphql.iter_nodes("products", query=query)) == [
+        {"id": 1},
+        {"id": 2},
+        {"id": 3},
+    ]
+    assert cursors == [None, "c1"]
+
+
+def test_graphql_iter_nodes_raises_errors(mock_client, mocker):
+    graphql = GraphQL(client=mock_client)
+    mock_client.post.return_value = streamed_response(
+        mocker, {"data": None, "errors": [{"message": "boom"}]}
+    )
+    with pytest.raises(GraphQLError):
+        list(
+            graphql.iter_nodes(
+                "products",
+                query="{ products { nodes { id } pageInfo { hasNextPage endCursor } } }",
+            )
+        )
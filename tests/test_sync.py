@@ -0,0 +1,116 @@
+import pytest
+import requests
+
+from shopify_client.sync import (
+    FileCheckpointStore,
+    IncrementalSync,
+    SQLiteCheckpointStore,
+)
+
+
+def order(order_id, updated_at):
+    return {"id": order_id, "updated_at": f"2024-01-01T10:{updated_at}+00:00"}
+
+
+@pytest.fixture(params=["file", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "file":
+        return FileCheckpointStore(str(tmp_path / "checkpoints.json"))
+    return SQLiteCheckpointStore(str(tmp_path / "checkpoints.db"))
+
+
+@pytest.fixture
+def pages(endpoint, mock_client, mocker):
+    """Serve the given pages of orders on the next listing."""
+    mock_client.parse_response.side_effect = lambda response: response.json()
+
+    def serve(*pages):
+        responses = []
+        for index, orders in enumerate(pages):
+            response = mocker.Mock(spec=requests.Response)
+            response.json.return_value = {"test_endpoint": orders}
+            last = index == len(pages) - 1
+            response.links = {} if last else {"next": {"url": f"page-{index + 1}"}}
+            responses.append(response)
+        mock_client.get.side_effect = responses
+
+    return serve
+
+
+def test_store_round_trip(store):
+    assert store.load("orders") is None
+    store.save("orders", {"updated_at": "2024-01-01T00:00:00+00:00", "id": 1})
+    store.save("products", {"updated_at": "2024-01-02T00:00:00+00:00", "id": 2})
+    assert store.load("orders")["id"] == 1
+    assert store.load("products")["id"] == 2
+
+
+def test_default_key(endpoint):
+    sync = IncrementalSync(endpoint, store=None, status="any", fields="id")
+    assert sync.key == "test_endpoint?fields=id&status=any"
+
+
+def test_first_run_lists_everything(endpoint, mock_client, store, pages):
+    pages([order(1, "00:00"), order(2, "01:00")], [order(3, "02:00")])
+    sync = IncrementalSync(endpoint, store, status="any")
+
+    batches = list(sync)
+
+    assert [[record["id"] for record in batch] for batch in batches] == [[1, 2], [3]]
+    assert mock_client.get.call_args_list[0].args == (
+        "test_endpoint.json?order=updated_at+asc&limit=250&status=any",
+    )
+    # Nothing was acknowledged
+    assert store.load(sync.key) is None
+
+
+def test_checkpoint_moves_on_ack(endpoint, store, pages):
+    pages([order(1, "00:00"), order(2, "01:00")], [order(3, "02:00")])
+    sync = IncrementalSync(endpoint, store, overlap=90)
+
+    first, second = sync
+    first.ack()
+    assert store.load(sync.key)["id"] == 2
+    second.ack()
+
+    checkpoint = store.load(sync.key)
+    assert checkpoint["updated_at"] == "2024-01-01T10:02:00+00:00"
+    assert checkpoint["id"] == 3
+    # Order 1 is older than the overlap and will not be listed again
+    assert checkpoint["recent"] == [
+        [2, order(2, "01:00")["updated_at"]],
+        [3, order(3, "02:00")["updated_at"]],
+    ]
+
+
+def test_next_run_skips_records_seen_in_the_overlap(
+    endpoint, mock_client, store, pages
+):
+    pages([order(1, "00:00"), order(2, "01:00")])
+    sync = IncrementalSync(endpoint, store, overlap=300)
+    for batch in sync:
+        batch.ack()
+
+    # Order 2 comes back unchanged, order 1 was updated again, order 4 showed up late
+    pages([order(2, "01:00"), order(4, "00:30"), order(1, "03:00")])
+    (batch,) = sync
+
+    assert [record["id"] for record in batch] == [4, 1]
+    assert (
+        "updated_at_min=2024-01-01T09%3A56%3A00%2B00%3A00"
+        in (mock_client.get.call_args.args[0])
+    )
+    batch.ack()
+    assert store.load(sync.key)["id"] == 1
+
+
+def test_unacknowledged_batches_are_delivered_again(endpoint, store, pages):
+    pages([order(1, "00:00")], [order(2, "01:00")])
+    sync = IncrementalSync(endpoint, store)
+    first, _ = sync
+    first.ack()
+
+    pages([order(1, "00:00"), order(2, "01:00")])
+    (batch,) = sync
+
+    assert [record["id"] for record in batch] == [2]
@@ -0,0 +1,162 @@
+import pytest
+
+from shopify_client import ShopifyClient
+from shopify_client.throttle import CostBucket, LeakyBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_bucket_does_not_wait_below_capacity(clock):
+    bucket = LeakyBucket(size=40, clock=clock)
+    assert [bucket.reserve() for _ in range(40)] == [0.0] * 40
+    assert bucket.level == 40
+
+
+def test_bucket_waits_for_leak_when_full(clock):
+    bucket = LeakyBucket(size=40, clock=clock)
+    for _ in range(40):
+        bucket.reserve()
+
+    assert bucket.wait_time == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_bucket_leaks_over_time(clock):
+    bucket = LeakyBucket(size=40, clock=clock)
+    for _ in range(10):
+        bucket.reserve()
+    clock.now = 2.0
+    assert bucket.level == pytest.approx(6)
+
+
+def test_bucket_update_from_header(clock):
+    bucket = LeakyBucket(clock=clock)
+    bucket.update("78/80")
+    assert bucket.size == 80
+    assert bucket.leak_rate == 4
+    assert bucket.level == 78
+    assert bucket.wait_time == 0
+
+    bucket.reserve()
+    bucket.reserve()
+    assert bucket.wait_time == pytest.approx(0.25)
+
+
+def test_bucket_update_keeps_local_reservations(clock):
+    bucket = LeakyBucket(clock=clock)
+    for _ in range(5):
+        bucket.reserve()
+    bucket.update("1/40")
+    assert bucket.level == 5
+
+
+def test_bucket_update_ignores_missing_header(clock):
+    bucket = LeakyBucket(clock=clock)
+    bucket.update(None)
+    assert bucket.level == 0
+
+
+def test_client_throttles_rest_requests(mocker):
+    bucket = mocker.Mock(spec=LeakyBucket)
+    bucket.reserve.return_value = 1.5
+    sleep = mocker.patch("shopify_client.time.sleep")
+    mocker.patch(
+        "requests.Session.request",
+        return_value=mocker.Mock(
+            status_code=200, headers={"X-Shopify-Shop-Api-Call-Limit": "40/40"}
+        ),
+    )
+    client = ShopifyClient(
+        api_url="https://test-shop.myshopify.com",
+        api_token="test-token",
+        rate_limiter=bucket,
+    )
+
+    client.request("GET", "products.json")
+
+    sleep.assert_called_once_with(1.5)
+    bucket.update.assert_called_once_with("40/40")
+
+
+def test_client_does_not_throttle_graphql(mocker):
+    bucket = mocker.Mock(spec=LeakyBucket)
+    mocker.patch("requests.Session.request", return_value=mocker.Mock(headers={}))
+    client = ShopifyClient(
+        api_url="https://test-shop.myshopify.com",
+        api_token="test-token",
+        rate_limiter=bucket,
+    )
+
+    client.request("POST", "graphql.json")
+
+    bucket.reserve.assert_not_called()
+
+
+def cost_extension(requested, actual, available, maximum=1000, restore_rate=50):
+    return {
+        "requestedQueryCost": requested,
+        "actualQueryCost": actual,
+        "throttleStatus": {
+            "maximumAvailable": maximum,
+            "currentlyAvailable": available,
+            "restoreRate": restore_rate,
+        },
+    }
+
+
+def test_cost_bucket_waits_for_restore(clock):
+    bucket = CostBucket(maximum=1000, restore_rate=50, clock=clock)
+    assert bucket.reserve(900) == 0
+    assert bucket.wait_time(200) == pytest.approx(2.0)
+    assert bucket.reserve(200) == pytest.approx(2.0)
+    assert bucket.available == -100
+
+
+def test_cost_bucket_restores_up_to_maximum(clock):
+    bucket = CostBucket(maximum=1000, restore_rate=50, clock=clock)
+    bucket.reserve(500)
+    clock.now = 100.0
+    assert bucket.available == 1000
+
+
+def test_cost_bucket_refunds_unused_cost(clock):
+    bucket = CostBucket(clock=clock)
+    bucket.reserve(100)
+    bucket.update(cost_extension(100, 20, 980), reserved=100)
+    assert bucket.available == 980
+
+
+def test_cost_bucket_refunds_failed_queries(clock):
+    bucket = CostBucket(maximum=1000, clock=clock)
+    bucket.reserve(100)
+    bucket.refund(100)
+    assert bucket.available == 1000
+    bucket.refund(100)
+    assert bucket.available == 1000
+
+
+def test_cost_bucket_adopts_lower_server_availability(clock):
+    bucket = CostBucket(clock=clock)
+    bucket.update(cost_extension(10, 10, 200, maximum=2000, restore_rate=100))
+    assert bucket.available == 200
+    assert bucket.maximum == 2000
+    assert bucket.wait_time(300) == pytest.approx(1.0)
+
+
+def test_cost_bucket_refunds_throttled_queries(clock):
+    bucket = CostBucket(clock=clock)
+    bucket.reserve(100)
+    bucket.update(cost_extension(100, None, 950), reserved=100)
+    assert bucket.available == 950
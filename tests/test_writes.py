@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from shopify_client.exceptions import BatchWriteError
+from shopify_client.writes import write_many
+
+
+def failing_on(*failing):
+    def write(item):
+        if item in failing:
+            raise ValueError(item)
+        return item * 2
+
+    return write
+
+
+def test_write_many_ordered():
+    def write(item):
+        # Later items finish first
+        time.sleep((5 - item) / 1000)
+        return item * 2
+
+    results = list(write_many(write, range(5), workers=5))
+
+    assert [result.result for result in results] == [0, 2, 4, 6, 8]
+    assert [result.index for result in results] == [0, 1, 2, 3, 4]
+    assert all(result.ok for result in results)
+
+
+def test_write_many_as_completed():
+    results = list(write_many(failing_on(), range(20), workers=4, ordered=False))
+    assert sorted(result.result for result in results) == [i * 2 for i in range(20)]
+
+
+def test_write_many_bounds_items_in_flight():
+    consumed = []
+
+    def items():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    results = write_many(failing_on(), items(), workers=2)
+    next(results)
+
+    assert len(consumed) <= 5
+    results.close()
+
+
+def test_write_many_stops_on_first_error():
+    results = []
+    with pytest.raises(ValueError):
+        for result in write_many(failing_on(3), range(100), workers=2):
+            results.append(result)
+
+    assert not results[3].ok
+    assert len(results) < 100
+
+
+def test_write_many_continues_on_error():
+    results = list(write_many(failing_on(3, 5), range(10), on_error="continue"))
+
+    assert len(results) == 10
+    assert [result.index for result in results if not result.ok] == [3, 5]
+    assert isinstance(results[3].error, ValueError)
+
+
+def test_write_many_collects_errors():
+    results = []
+    with pytest.raises(BatchWriteError) as error:
+        for result in write_many(failing_on(3, 5), range(10), on_error="collect"):
+            results.append(result)
+
+    assert len(results) == 10
+    assert [failure.item for failure in error.value.failures] == [3, 5]
+
+
+def test_write_many_reports_progress():
+    calls = []
+    lock = threading.Lock()
+
+    def progress(completed, failed):
+        with lock:
+            calls.append((completed, failed))
+
+    list(write_many(failing_on(1), range(3), on_error="continue", progress=progress))
+
+    assert calls == [(1, 0), (2, 1), (3, 1)]
+
+
+def test_endpoint_create_many(endpoint, mock_client):
+    mock_client.post.side_effect = lambda url, json: {"test_endpoint": json}
+
+    results = list(endpoint.create_many([{"id": 1}, {"id": 2}], workers=2))
+
+    assert [result.result for result in results] == [
+        {"test_endpoint": {"id": 1}},
+        {"test_endpoint": {"id": 2}},
+    ]
+    assert mock_client.post.call_args.args == ("test_endpoint.json",)
+
+
+def test_endpoint_writes_on_iteration(endpoint, mock_client):
+    results = endpoint.create_many([{"id": 1}])
+    mock_client.post.assert_not_called()
+
+    list(results)
+    mock_client.post.assert_called_once()
+
+
+def test_endpoint_update_many(endpoint, mock_client):
+    mock_client.put.side_effect = lambda url, json: url
+
+    results = list(endpoint.update_many([(1, {}), (2, {})], fields="id"))
+
+    assert [result.result for result in results] == [
+        "test_endpoint/1.json?fields=id",
+        "test_endpoint/2.json?fields=id",
+    ]
+
+
+def test_endpoint_delete_many(endpoint, mock_client, mocker):
+    def delete(url):
+        response = mocker.Mock()
+        if url == "test_endpoint/2.json":
+            response.raise_for_status.side_effect = requests.exceptions.HTTPError()
+        return response
+
+    mock_client.delete.side_effect = delete
+
+    results = list(endpoint.delete_many([1, 2, 3], on_error="continue"))
+
+    assert [result.ok for result in results] == [True, False, True]